@@ -3,14 +3,91 @@
 
 Adafruit_ADS1115 ads;  // Use this for the 16-bit version
 
+// 0: human-readable "AIN0: ...\tVoltage: ..." lines at 9600 baud (default)
+// 1: compact binary frames at 250000 baud, decoded by utils/binproto.py
+#define BINARY_MODE 0
+
+#if BINARY_MODE
+// 250000 baud divides the 16 MHz clock exactly (0% error)
+const unsigned long BAUD = 250000;
+// Microseconds between samples; 0 = as fast as the ADC converts (~860 SPS)
+const unsigned long SAMPLE_INTERVAL_US = 0;
+
+// Frame payload, little-endian, 10 bytes:
+//   uint8  type       0x01 = ADS1115 AIN0 sample
+//   uint8  seq        increments by 1 per frame (lost frames are detectable)
+//   uint32 t_us       micros() at the conversion
+//   int16  adc        raw ADC count
+//   uint16 crc        CRC-16/CCITT-FALSE of the 8 bytes above
+// COBS-encoded (no zero bytes inside) and terminated by a 0x00 byte.
+const uint8_t FRAME_ADS1115 = 0x01;
+uint8_t seq = 0;
+unsigned long nextSampleUs = 0;
+
+uint16_t crc16(const uint8_t *data, uint8_t len) {
+  uint16_t crc = 0xFFFF;
+  while (len--) {
+    crc ^= (uint16_t)(*data++) << 8;
+    for (uint8_t i = 0; i < 8; i++)
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
+
+// COBS-encode len bytes (len < 254) and write the frame with its delimiter
+void sendFrame(const uint8_t *data, uint8_t len) {
+  uint8_t out[len + 2];
+  uint8_t codeIdx = 0, code = 1, o = 1;
+  for (uint8_t i = 0; i < len; i++) {
+    if (data[i] == 0) {
+      out[codeIdx] = code;
+      codeIdx = o++;
+      code = 1;
+    } else {
+      out[o++] = data[i];
+      code++;
+    }
+  }
+  out[codeIdx] = code;
+  out[o++] = 0x00;
+  Serial.write(out, o);
+}
+
+void sendSample(int16_t adc, unsigned long tUs) {
+  uint8_t p[10];
+  p[0] = FRAME_ADS1115;
+  p[1] = seq++;
+  p[2] = tUs; p[3] = tUs >> 8; p[4] = tUs >> 16; p[5] = tUs >> 24;
+  p[6] = adc; p[7] = adc >> 8;
+  uint16_t crc = crc16(p, 8);
+  p[8] = crc; p[9] = crc >> 8;
+  sendFrame(p, sizeof(p));
+}
+#else
+const unsigned long BAUD = 9600;
 float Voltage = 0.0;
+#endif
 
 void setup(void) {
-  Serial.begin(9600);
+  Serial.begin(BAUD);
   ads.begin();  // Initialize the ADS1115
+#if BINARY_MODE
+  ads.setDataRate(RATE_ADS1115_860SPS);
+  nextSampleUs = micros();
+#endif
 }
 
 void loop(void) {
+#if BINARY_MODE
+  // Absolute deadlines, so the period doesn't drift with the loop's own cost
+  if (SAMPLE_INTERVAL_US) {
+    while ((long)(micros() - nextSampleUs) < 0) {}
+    nextSampleUs += SAMPLE_INTERVAL_US;
+  }
+  unsigned long tUs = micros();
+  int16_t adc0 = ads.readADC_SingleEnded(0);
+  sendSample(adc0, tUs);
+#else
   int16_t adc0 = ads.readADC_SingleEnded(0);  // Read from channel 0
   Voltage = (adc0 * 0.1875) / 1000;  // Convert ADC value to voltage
 
@@ -21,7 +98,5 @@ void loop(void) {
   Serial.println();
 
   delay(1000);  // Wait 1 second before reading again
+#endif
 }
-
-
-
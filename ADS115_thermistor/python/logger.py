@@ -1,29 +1,54 @@
-import time
-import math
-import csv
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime
-import os  # For checking the presence of the "STOP" file
-import pandas as pd
-
-# Constants (same as the Arduino code)
-R_FIXED = 10000.0  # Fixed resistor in the voltage divider (10kΩ)
-Vcc = 5.0  # Supply voltage (usually 5V for most Arduino boards)
-A = 0.001129148  # Steinhart-Hart coefficient A
-B = 0.000234125  # Steinhart-Hart coefficient B
-C = 0.0000000876741  # Steinhart-Hart coefficient C
-R0 = 10000.0  # Thermistor nominal resistance at T0 (25°C)
-T0 = 298.15  # Reference temperature (25°C in Kelvin)
-BETA = 3950.0  # Beta constant
+import os
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))  # repo root, for utils/
+from utils.thermistor import convert_batch, convert_lut
+from utils.stats import RunningStats, cumulative_mean_std
+from utils.decimate import decimate_indices
+from utils.samplestore import SampleStore
+from utils.liveplot import GrowingErrorbar, GrowingLine, IncrementalHistogram, update_histograms
+from utils.scheduler import DeadlineScheduler
+from utils.metrics import Metrics
+from utils.headless import pyplot, deferred
+from utils.compress import Compressor
+from utils.control import Control
+from utils.pipeline import (Pipeline, scheduled_source, convert_adc, ingest_steps, control_settings,
+                            ADSSink, ColumnarSink, PrintSink, PlotSink)
 
 
 # Control parameters
-measurement_interval = 1  # seconds between measurements
-measurements_per_plot = 5  # Number of measurements before plotting and saving
+measurement_interval = 1  # seconds between measurements (drift-free, may be < 1e-3, see utils/scheduler.py)
+measurements_per_plot = 5  # Number of measurements per burst, converted, saved and plotted as one batch
+control_socket = "thermistor_data.ctl"  # python -m utils.control thermistor_data.ctl stop|stats|get|set NAME VALUE
+                                        # (save_interval: rows per save/plot, the burst stays; plot_interval);
+                                        # None: only the STOP file, watched once a second
+skip_missed_deadlines = True  # when more than one interval late, skip (and count) deadlines instead of catching up
+use_lut = True  # Convert through the precomputed ADC code -> temperature table
+lut_cache_dir = ".lut_cache"  # Where the table is cached between runs (None to disable)
+max_rows_in_memory = 500_000  # older raw samples are spilled to spill_dir; None keeps everything in memory
+spill_dir = "spill"
+storage = 'csv'  # 'csv', 'columnar' (chunked .npy, see utils/colstore.py) or 'both'
+columnar_dir = "thermistor_data.cols"
+columnar_chunk_rows = 1000
+# 'deadband' or 'swinging_door' (see utils/compress.py): store/plot only the samples needed to redraw the
+# signal. The plots then show the kept samples only (cumulative averages, error bars, histograms); the
+# running stats (metrics, 'stats' queries, exit summary) stay over every sample. None stores everything.
+compression = None
+compression_tolerance = {'adc': 2}  # ADC counts (0.1875 mV each); everything else is derived from them
 
 # CSV File
 csv_filename = "thermistor_data.csv"
+plot_filename = "temperature_plot.png"
+fsync_policy = 'flush'  # 'never', 'flush' or 'close' (see utils/csvlog.py)
+plot_min_interval = 10  # seconds between plot renders; older requests are dropped
+live_plot = True  # keep one figure, fed from memory, instead of re-reading the CSV (see LivePlot)
+headless = False  # no plots while logging (matplotlib/pandas aren't even imported), only one at exit
+max_plot_points = 2000  # points drawn per time series (~plot width in pixels); None draws all
+decimate_method = 'minmax'  # or 'lttb', see utils/decimate.py
+print_readings = False  # print every measurement; the periodic metrics summary replaces it
+metrics_interval = 10  # seconds between metrics summaries (stage latencies, rate, missed deadlines)
+metrics_filename = "thermistor_data.metrics.jsonl"  # every summary as a JSON line; None to not export
 
 # Function to simulate sensor reading (replace with actual ADC reading code in production)
 def read_sensor():
@@ -31,45 +56,19 @@ def read_sensor():
     # For demonstration, simulate a value within an expected range
     return np.random.randint(0, 32767)  # Simulate a 16-bit ADC reading
 
-# Function to calculate voltage from ADC reading
-def adc_to_voltage(adc_value):
-    return (adc_value * 0.1875) / 1000.0  # Calculate voltage in Volts
-
-# Function to calculate thermistor resistance
-def calculate_R_therm(voltage):
-    if voltage >= Vcc:
-        return float('inf')  # If voltage is equal or greater than supply, resistance is effectively infinity
-    return (R_FIXED * voltage) / (Vcc - voltage)
-
-# Function to calculate temperature using Steinhart-Hart equation
-def calculate_temp_SH(R_therm):
-    if R_therm <= 0:
-        print(f"Invalid R_therm value: {R_therm}. Skipping this measurement.")
-        return float('nan'), float('nan')  # Return NaN for invalid R_therm
-    
-    logR = math.log(R_therm)
-    inv_T = A + B * logR + C * logR**3
-    T_K = 1.0 / inv_T
-    T_C = T_K - 273.15
-    T_F = T_C * 9.0 / 5.0 + 32.0
-    return T_K, T_F, T_C
-
-# Function to calculate temperature using Beta equation
-def calculate_temp_Beta(R_therm):
-    if R_therm <= 0:
-        print(f"Invalid R_therm value: {R_therm}. Skipping this measurement.")
-        return float('nan'), float('nan'), float('nan')  # Return NaN for invalid R_therm
-    
-    T_K = 1.0 / ((1.0 / T0) + (1.0 / BETA) * math.log(R_therm / R0))
-    T_C = T_K - 273.15
-    T_F = T_C * 9.0 / 5.0 + 32.0
-    return T_K, T_F, T_C
 
 
 
+# Voltage, R_therm and both temperature models for a block of raw ADC counts
+def convert(adc_values):
+    if use_lut:
+        return convert_lut(adc_values, cache_dir=lut_cache_dir)
+    return convert_batch(adc_values)
 
 # Function to plot the data
-def plot_data_from_csv(csv_file):
+def plot_data_from_csv(csv_file, plot_filename="temperature_plot.png"):
+    import pandas as pd  # only when plotting from the CSV, not at startup
+
     # Read the CSV file into a DataFrame
     df_or = pd.read_csv(csv_file)
     df_or = df_or.dropna()
@@ -84,40 +83,27 @@ def plot_data_from_csv(csv_file):
     col_name = 'Voltage (V)'
     data = df[col_name].to_numpy()
 
-    # Initialize lists for cumulative averages and std
-    avg_temp_SH_K = []
-    std_temp_SH_K = []
-    avg_temp_Beta_K = []
-    std_temp_Beta_K = []
-    avg_data = []
-    std_data = []
-
-    # Cumulative calculations
-    for i in range(len(time)):
-        # Get the subset of data up to current index (i)
-        temp_SH_K_sub = temp_SH_K[:i+1]
-        temp_Beta_K_sub = temp_Beta_K[:i+1]
-        temp_data_sub = data[:i+1]
-        # Cumulative average and std
-        avg_temp_SH_K.append(np.mean(temp_SH_K_sub))
-        std_temp_SH_K.append(np.std(temp_SH_K_sub))
-
-        avg_temp_Beta_K.append(np.mean(temp_Beta_K_sub))
-        std_temp_Beta_K.append(np.std(temp_Beta_K_sub))
+    # Cumulative average and std at each point, O(n) over the whole series
+    avg_temp_SH_K, std_temp_SH_K = cumulative_mean_std(temp_SH_K)
+    avg_temp_Beta_K, std_temp_Beta_K = cumulative_mean_std(temp_Beta_K)
+    avg_data, std_data = cumulative_mean_std(data)
 
-        avg_data.append(np.mean(temp_data_sub))
-        std_data.append(np.mean(temp_data_sub))
+    # Draw a shape-preserving subset of each time series; the histograms below use everything
+    time = time.to_numpy()
+    temp_SH_K, temp_Beta_K = temp_SH_K.to_numpy(), temp_Beta_K.to_numpy()
+    i_SH = decimate_indices(time, temp_SH_K, max_plot_points, decimate_method)
+    i_Beta = decimate_indices(time, temp_Beta_K, max_plot_points, decimate_method)
+    i_data = decimate_indices(time, data, max_plot_points, decimate_method)
 
-
-    
     # Plotting
+    plt = pyplot()
     fig, axs = plt.subplots(2, 2, figsize=(10, 10))
 
     # Plot 1: Temperature in K (both methods) with cumulative average and error bars
-    axs[0, 0].errorbar(time, avg_temp_SH_K, yerr=std_temp_SH_K, label="Acc. Ave.", fmt='o', color='blue', alpha = 0.5)
-    axs[0, 0].errorbar(time, avg_temp_Beta_K, yerr=std_temp_Beta_K, label="Acc. Ave.", fmt='o', color='green', alpha = 0.5)
-    axs[0, 0].plot(time, temp_SH_K, label="Temp(SH) K", linestyle='--', color='blue')
-    axs[0, 0].plot(time, temp_Beta_K, label="Temp(Beta) K", linestyle='--', color='green')
+    axs[0, 0].errorbar(time[i_SH], avg_temp_SH_K[i_SH], yerr=std_temp_SH_K[i_SH], label="Acc. Ave.", fmt='o', color='blue', alpha = 0.5)
+    axs[0, 0].errorbar(time[i_Beta], avg_temp_Beta_K[i_Beta], yerr=std_temp_Beta_K[i_Beta], label="Acc. Ave.", fmt='o', color='green', alpha = 0.5)
+    axs[0, 0].plot(time[i_SH], temp_SH_K[i_SH], label="Temp(SH) K", linestyle='--', color='blue')
+    axs[0, 0].plot(time[i_Beta], temp_Beta_K[i_Beta], label="Temp(Beta) K", linestyle='--', color='green')
     #axs[0, 0].set_title("Cumulative Temperature in K (SH & Beta)")
     axs[0, 0].set_xlabel("Elapsed Time (min)")
     axs[0, 0].set_ylabel("Temperature (K)")
@@ -132,8 +118,8 @@ def plot_data_from_csv(csv_file):
     axs[0, 1].legend()
 
     # Plot 3: R_therm with cumulative average and error bars
-    axs[1, 0].errorbar(time, avg_data, yerr=std_data, fmt='o', color='purple',alpha =0.5)
-    axs[1, 0].plot(time, data, linestyle='--', color='purple')
+    axs[1, 0].errorbar(time[i_data], avg_data[i_data], yerr=std_data[i_data], fmt='o', color='purple',alpha =0.5)
+    axs[1, 0].plot(time[i_data], data[i_data], linestyle='--', color='purple')
     #axs[1, 0].set_title("Cumulative R_therm (Ohms)")
     axs[1, 0].set_xlabel("Elapsed Time (min)")
     axs[1, 0].set_ylabel(col_name)
@@ -147,102 +133,165 @@ def plot_data_from_csv(csv_file):
     axs[1, 1].legend()
 
     plt.tight_layout()
-    plt.savefig("temperature_plot.png")
+    plt.savefig(plot_filename)
     plt.clf();plt.close('all') # Closes all currently open figures
 #    plt.show()
 
 
-
-
-
-# Main loop
-measurement_count = 0
-start_time = time.time()
-
-csv_header = ['Elapsed Time (min)', 'Date', 'Voltage (V)', 'R_therm (Ohms)', 'Temp_SH (K)', 'Temp_SH (F)', 'Temp_SH (C)', 'Temp_Beta (K)', 'Temp_Beta (F)', 'Temp_Beta (C)']
-
-# Create a new CSV file and write the header
-with open(csv_filename, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(csv_header)
-
-buffer_data = []
-
-while True:
-    # Get the current elapsed time (convert from seconds to minutes)
-    elapsed_time = (time.time() - start_time) / 60.0  # Convert seconds to minutes
-
-    # Read the sensor (ADC value)
-    adc_value = read_sensor()
-
-    # Convert the ADC value to voltage
-    voltage = adc_to_voltage(adc_value)
-
-    # Calculate the thermistor resistance
-    R_therm = calculate_R_therm(voltage)
-
-    # Calculate temperatures using both methods
-    temp_SH_K_value, temp_SH_F_value, temp_SH_C_value = calculate_temp_SH(R_therm)
-    temp_Beta_K_value, temp_Beta_F_value, temp_Beta_C_value = calculate_temp_Beta(R_therm)
-
+class LivePlot:
+    # Same 2x2 layout as plot_data_from_csv, but fed from the in-memory raw
+    # samples: the figure is built once and each update only converts and
+    # pushes the new samples.
+    def __init__(self, filename="temperature_plot.png"):
+        self.fig, self.axs = pyplot().subplots(2, 2, figsize=(10, 10))
+        self.filename = filename
+        self.n = 0
+        axs = self.axs
+        dec = dict(max_points=max_plot_points, method=decimate_method)  # time series only
+
+        # Plot 1: Temperature in K (both methods) with cumulative average and error bars
+        self.stats_SH, self.stats_Beta, self.stats_data = RunningStats(), RunningStats(), RunningStats()
+        self.avg_SH = GrowingErrorbar(axs[0, 0], fmt='o', color='blue', alpha=0.5, label="Acc. Ave.", **dec)
+        self.avg_Beta = GrowingErrorbar(axs[0, 0], fmt='o', color='green', alpha=0.5, label="Acc. Ave.", **dec)
+        self.line_SH = GrowingLine(axs[0, 0], label="Temp(SH) K", linestyle='--', color='blue', **dec)
+        self.line_Beta = GrowingLine(axs[0, 0], label="Temp(Beta) K", linestyle='--', color='green', **dec)
+        axs[0, 0].set_xlabel("Elapsed Time (min)")
+        axs[0, 0].set_ylabel("Temperature (K)")
+        axs[0, 0].legend()
+
+        # Plot 2: Histogram of instantaneous temperature measurements in K (SH & Beta)
+        self.hist_SH, self.hist_Beta = IncrementalHistogram(bins=20), IncrementalHistogram(bins=20)
+        self.bars_SH = axs[0, 1].stairs([0], [0, 1], fill=True, alpha=0.5, color='blue', label='Temp(SH) K')
+        self.bars_Beta = axs[0, 1].stairs([0], [0, 1], fill=True, alpha=0.5, color='green', label='Temp(Beta) K')
+        axs[0, 1].set_xlabel("Temperature (K)")
+        axs[0, 1].set_ylabel("Frequency")
+        self.legend_temp = axs[0, 1].legend()
+
+        # Plot 3: Voltage with cumulative average and error bars
+        self.avg_data = GrowingErrorbar(axs[1, 0], fmt='o', color='purple', alpha=0.5, **dec)
+        self.line_data = GrowingLine(axs[1, 0], linestyle='--', color='purple', **dec)
+        axs[1, 0].set_xlabel("Elapsed Time (min)")
+        axs[1, 0].set_ylabel('Voltage (V)')
+
+        # Plot 4: Histogram of instantaneous voltage values
+        self.hist_data = IncrementalHistogram(bins=20)
+        self.bars_data = axs[1, 1].stairs([0], [0, 1], fill=True, alpha=0.5, color='purple', label=' ')
+        axs[1, 1].set_xlabel('Voltage (V)')
+        axs[1, 1].set_ylabel("counts")
+        self.legend_data = axs[1, 1].legend()
+
+        self.fig.tight_layout()
+
+    def _cumulative(self, stats, values):
+        avg, std = np.empty(len(values)), np.empty(len(values))
+        for i, v in enumerate(values):
+            stats.update(v)
+            avg[i], std[i] = stats.mean, stats.std
+        return avg, std
+
+    def update(self, elapsed, adc_values, first=0):
+        # first: run-wide index of elapsed[0] (older rows may have been spilled to disk)
+        start = max(self.n - first, 0)
+        if start >= len(elapsed):
+            return
+        block = convert(adc_values[start:])
+        self.n = first + len(elapsed)
+
+        # same filter as plot_data_from_csv
+        valid = np.isfinite(block['Temp_SH (K)']) & np.isfinite(block['Temp_Beta (K)']) & (block['Temp_SH (C)'] > 0.)
+        t = np.asarray(elapsed[start:], dtype=float)[valid]
+        if len(t) == 0:
+            return
+        sh = block['Temp_SH (K)'][valid]
+        beta = block['Temp_Beta (K)'][valid]
+        d = block['Voltage (V)'][valid]
+
+        self.avg_SH.extend(t, *self._cumulative(self.stats_SH, sh))
+        self.avg_Beta.extend(t, *self._cumulative(self.stats_Beta, beta))
+        self.line_SH.extend(t, sh)
+        self.line_Beta.extend(t, beta)
+        self.axs[0, 0].autoscale_view()
+
+        self.hist_SH.add(sh)
+        self.hist_Beta.add(beta)
+        update_histograms(self.axs[0, 1], [(self.bars_SH, self.hist_SH), (self.bars_Beta, self.hist_Beta)])
+        texts = self.legend_temp.get_texts()
+        texts[0].set_text(f'Temp(SH) K: {self.stats_SH.mean:3.2f} +- {self.stats_SH.std:3.2f} ')
+        texts[1].set_text(f'Temp(Beta) K: {self.stats_Beta.mean:3.2f} +- {self.stats_Beta.std:3.2f} ')
+
+        self.avg_data.extend(t, *self._cumulative(self.stats_data, d))
+        self.line_data.extend(t, d)
+        self.axs[1, 0].autoscale_view()
+
+        self.hist_data.add(d)
+        update_histograms(self.axs[1, 1], [(self.bars_data, self.hist_data)])
+        self.legend_data.get_texts()[0].set_text(f"{self.stats_data.mean:3.2f} +- {self.stats_data.std:3.2f} ")
+
+        self.fig.savefig(self.filename)
+
+
+
+
+
+# Main loop: one burst of measurements_per_plot samples on the absolute
+# deadline grid, then converted, saved and plotted as one batch
+def main():
+    metrics = Metrics('ADS1115', interval=metrics_interval, export_file=metrics_filename)
+    # Raw samples: int64 epoch ns, elapsed minutes and the 16-bit ADC code. Everything
+    # else is derived from the code, a block at a time, when it is written out.
+    store = SampleStore({'elapsed_min': np.float64, 'adc': np.int16},
+                        max_rows=max_rows_in_memory, spill_dir=spill_dir, name='thermistor_data')
+    scheduler = DeadlineScheduler(measurement_interval, skip_missed=skip_missed_deadlines)
 
     # Print the current measurements to the screen (including elapsed time in minutes)
-    print(f"Time: {elapsed_time:.2f} min | Voltage: {voltage:.4f} V | R_therm: {R_therm:.1f} Ohms")
-    print(f"R_therm (Ohms): {R_therm:.1f}")
-    print(f"Temp(SH) (K): {temp_SH_K_value:.2f} | Temp(SH) (°F): {temp_SH_F_value:.2f} | Temp(SH) (°C): {temp_SH_C_value:.2f}")
-    print(f"Temp(Beta) (K): {temp_Beta_K_value:.2f} | Temp(Beta) (°F): {temp_Beta_F_value:.2f} | Temp(Beta) (°C): {temp_Beta_C_value:.2f}")
-    print()  # Empty line for better readability
-
-    # If we've reached the required number of measurements, save to CSV and update the plot
-    measurement_count += 1
-    buffer_data.append([elapsed_time, datetime.now().strftime("%m-%d-%Y %H:%M:%S"),
-    voltage, R_therm,
-    temp_SH_K_value, temp_SH_F_value, temp_SH_C_value,
-    temp_Beta_K_value, temp_Beta_F_value, temp_Beta_C_value])
-
-
-    if measurement_count >= measurements_per_plot:
-
-        
-        # Write data to CSV
-        # with open(csv_filename, mode='a', newline='') as file:
-        #     writer = csv.writer(file)
-        #
-        #     writer.writerow([
-        #         round(elapsed_time, 2),
-        #         datetime.now().strftime("%m-%d-%Y %H:%M:%S"),
-        #         round(voltage, 4),
-        #         round(R_therm, 1),
-        #         round(temp_SH_K_value, 2),
-        #         round(temp_SH_F_value , 2),
-        #         round(temp_SH_C_value , 2),
-        #         round(temp_Beta_K_value, 2),
-        #         round(temp_Beta_F_value, 2),
-        #         round(temp_Beta_C_value , 2)
-        #     ])
-        # Write data to CSV
-        with open(csv_filename, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            for k in range(len(buffer_data)):
-                        row = buffer_data[k]
-                        writer.writerow([round(row[0],2),row[1],
-                        round(row[2],4),round(row[3],4),
-                        round(row[4],1),round(row[5],2),round(row[6],2),
-                        round(row[7],2),round(row[8],2),round(row[9],2)])
-
-            file.flush()
-
-        # Plot the data
-        plot_data_from_csv(csv_filename)
-
-        # Reset the data lists for the next set of measurements
-        measurement_count = 0
-        buffer_data = []
-        if os.path.exists('STOP'):
-            print("STOP file detected, exiting...")
-            break
-
-
-    # Wait before taking the next measurement
-    time.sleep(measurement_interval)
-
+    def readings(t_ns, block):
+        for k in range(len(t_ns)):
+            yield (f"Time: {block['elapsed_min'][k]:.2f} min | Voltage: {block['Voltage (V)'][k]:.4f} V | "
+                   f"R_therm: {block['R_therm (Ohms)'][k]:.1f} Ohms")
+            yield (f"Temp(SH) (K): {block['Temp_SH (K)'][k]:.2f} | Temp(SH) (°F): {block['Temp_SH (F)'][k]:.2f} | "
+                   f"Temp(SH) (°C): {block['Temp_SH (C)'][k]:.2f}")
+            yield (f"Temp(Beta) (K): {block['Temp_Beta (K)'][k]:.2f} | Temp(Beta) (°F): {block['Temp_Beta (F)'][k]:.2f} | "
+                   f"Temp(Beta) (°C): {block['Temp_Beta (C)'][k]:.2f}")
+            yield ""  # Empty line for better readability
+
+    def snapshot():
+        if live_plot:
+            return (store.column('elapsed_min').copy(), store.column('adc').copy()), {'first': store.first}
+        return (csv_filename, plot_filename), {}
+
+    sinks = []
+    if storage in ('csv', 'both'):
+        # A new CSV file with the header; it stays open and only new rows are appended
+        sinks.append(ADSSink(csv_filename, convert=convert, flush_rows=measurements_per_plot,
+                             flush_interval=None, fsync=fsync_policy))
+    if storage in ('columnar', 'both'):
+        # The raw ADC counts too, so the columnar log can be reconverted exactly
+        sinks.append(ColumnarSink(columnar_dir, 'ADS1115', chunk_rows=columnar_chunk_rows, extra={'adc': np.int16}))
+    if print_readings:
+        sinks.append(PrintSink(readings))
+    # The LivePlot figure is built on the plot thread, when the first plot is due
+    plot_func = deferred(lambda: LivePlot(plot_filename), 'update') if live_plot else plot_data_from_csv
+    sinks.append(PlotSink(plot_func, snapshot,
+                          every=measurements_per_plot, min_interval=plot_min_interval,
+                          headless=headless, metrics=metrics))
+
+    compressor = Compressor(compression_tolerance, compression) if compression else None
+    # Over every sample (the plots only see the samples the compressor keeps), for the metrics, stats queries and summary
+    stats = {col: RunningStats() for col in ('Temp_SH (K)', 'Temp_Beta (K)', 'Voltage (V)')}
+    steps = [('convert', convert_adc(convert))] + ingest_steps(store, metrics, compressor, stats)
+    control = Control(control_socket, 'STOP', stats=stats, metrics=metrics, message="Stop requested, exiting...")
+    control_settings(control, sinks, measurements_per_plot, plot_min_interval)
+    source = scheduled_source(read_sensor, scheduler, measurements_per_plot, 'adc', dtype=np.int16, metrics=metrics,
+                              stop=control)
+    with control:
+        print(f"Logging to {csv_filename}... ({control.describe()})")
+        Pipeline(source, steps, sinks, metrics).run()
+    print(f"Scheduler: {scheduler.summary()}")
+    if compressor:
+        print(f"Compression {compressor.summary()}")
+        for col, col_stats in stats.items():
+            print(f"{col}: {col_stats.mean:3.2f} +- {col_stats.std:3.2f} over all {col_stats.n} samples")
+
+
+if __name__ == "__main__":
+    main()
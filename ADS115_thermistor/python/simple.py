@@ -41,7 +41,7 @@ def calculate_R_therm(voltage):
 def calculate_temp_SH(R_therm):
     if R_therm <= 0:
         print(f"Invalid R_therm value: {R_therm}. Skipping this measurement.")
-        return float('nan'), float('nan')  # Return NaN for invalid R_therm
+        return float('nan'), float('nan'), float('nan')  # Return NaN for invalid R_therm
     
     logR = math.log(R_therm)
     inv_T = A + B * logR + C * logR**3
@@ -1,29 +1,59 @@
-import serial
-import time
 import os
-import matplotlib.pyplot as plt
-import pandas as pd
-from datetime import datetime
+import numpy as np
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # repo root, for utils/
+from utils.decimate import decimate_indices
+from utils.liveplot import GrowingLine
+from utils.samplestore import SampleStore, format_timestamp
+from utils.serialreader import SerialReader
+from utils.parsers import get_parser
+from utils.metrics import Metrics
+from utils.headless import pyplot, deferred
+from utils.compress import Compressor
+from utils.control import Control
+from utils.pipeline import (Pipeline, open_serial, serial_source, parse_lines, host_elapsed, ingest_steps,
+                            control_settings, CSVSink, ColumnarSink, PrintSink, PlotSink)
 
 SERIAL_PORT = '/dev/ttyACM0'  # Change if needed
 BAUD_RATE = 9600
 FILENAME = 'datalog.csv'
 PLOT_FILENAME = 'datalog_plot.png'
-STOP_FILE = 'STOP'
-
-def save_to_csv(timestamps, elapsed_mins, temps, hums):
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'elapsed_time_min': elapsed_mins,
-        'temperature_degC': temps,
-        'humidity_percent': hums
-    })
-    df.to_csv(FILENAME, index=False)
+STOP_FILE = 'STOP'  # Only watched when the control socket can't be created
+CONTROL_SOCKET = 'datalog.ctl'  # python -m utils.control datalog.ctl stop|stats|get|set NAME VALUE; None: STOP file only
+SAVE_INTERVAL = 5  # Flush new rows and re-plot every N readings (live: set save_interval N)
+PRINT_RAW = False  # Echo every received line (debug)
+PRINT_READINGS = False  # One line per reading; the periodic metrics summary replaces it
+METRICS_INTERVAL = 10  # Seconds between metrics summaries (stage latencies, rate, drops)
+METRICS_FILENAME = 'datalog.metrics.jsonl'  # Every summary as a JSON line; None to not export
+PLOT_MIN_INTERVAL = 10  # Seconds between plot renders; older snapshots are dropped (live: set plot_interval S)
+LIVE_PLOT = True  # Keep one figure and only push new points into it (see LivePlot)
+HEADLESS = False  # No plots while logging (matplotlib isn't even imported), only one at exit
+CONNECT_TIMEOUT = 10  # Seconds to wait for the first valid line after opening the port
+MAX_PLOT_POINTS = 2000  # Points drawn per series (~plot width in pixels); None draws all
+DECIMATE_METHOD = 'minmax'  # or 'lttb', see utils/decimate.py
+FLUSH_SECONDS = 30  # Also flush at least this often (bounds data lost on a crash)
+FSYNC_POLICY = 'flush'  # 'never', 'flush' or 'close' (see utils/csvlog.py)
+MAX_ROWS_IN_MEMORY = 500_000  # Older rows are spilled to SPILL_DIR; None keeps everything in memory
+SPILL_DIR = 'spill'
+STORAGE = 'csv'  # 'csv', 'columnar' (chunked .npy, see utils/colstore.py) or 'both'
+COLUMNAR_DIR = 'datalog.cols'
+COLUMNAR_CHUNK_ROWS = 1000
+# 'deadband' or 'swinging_door' (see utils/compress.py): only the readings needed to redraw the
+# series within COMPRESSION_TOLERANCE are stored and plotted. The plots then show the kept
+# readings only (their N and the series); the running averages (metrics, 'stats' queries, exit
+# summary) stay over every reading. The DHT11 steps by whole units, so a deadband below 1 keeps just the changes.
+COMPRESSION = None
+COMPRESSION_TOLERANCE = {'temperature_C': 0.5, 'humidity': 0.5}
 
 def plot_data(elapsed_mins, temps, hums):
+    elapsed_mins, temps, hums = np.asarray(elapsed_mins), np.asarray(temps), np.asarray(hums)
+    t_idx = decimate_indices(elapsed_mins, temps, MAX_PLOT_POINTS, DECIMATE_METHOD)
+    h_idx = decimate_indices(elapsed_mins, hums, MAX_PLOT_POINTS, DECIMATE_METHOD)
+    plt = pyplot()
     plt.figure(figsize=(8,5), dpi=300)
-    plt.scatter(elapsed_mins, temps, label='Temperature (°C)', color='tab:red')
-    plt.scatter(elapsed_mins, hums, label='Humidity (%)', color='tab:blue')
+    plt.scatter(elapsed_mins[t_idx], temps[t_idx], label='Temperature (°C)', color='tab:red')
+    plt.scatter(elapsed_mins[h_idx], hums[h_idx], label='Humidity (%)', color='tab:blue')
     plt.xlabel('Elapsed Time (minutes)', fontsize=12)
     plt.ylabel('Measurement', fontsize=12)
     plt.title('DHT11 Temperature and Humidity over Time', fontsize=14, weight='bold')
@@ -33,72 +63,96 @@ def plot_data(elapsed_mins, temps, hums):
     plt.savefig(PLOT_FILENAME)
     plt.close()
 
-def main():
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE)
-    time.sleep(2)  # Wait for serial connection to settle
-
-    timestamps = []
-    elapsed_mins = []
-    temps = []
-    hums = []
-
-    start_time = time.time()
-    count = 0
-    save_interval = 5
-
-    print(f"Logging data to {FILENAME}... Create '{STOP_FILE}' file to stop.\n")
+class LivePlot:
+    # Same plot as plot_data, built once; each update only adds the new points
+    def __init__(self):
+        self.fig, self.ax = pyplot().subplots(figsize=(8,5), dpi=300)
+        self.n = 0
+        self.temps = GrowingLine(self.ax, 'o', label='Temperature (°C)', color='tab:red',
+                                 max_points=MAX_PLOT_POINTS, method=DECIMATE_METHOD)
+        self.hums = GrowingLine(self.ax, 'o', label='Humidity (%)', color='tab:blue',
+                                max_points=MAX_PLOT_POINTS, method=DECIMATE_METHOD)
+        self.ax.set_xlabel('Elapsed Time (minutes)', fontsize=12)
+        self.ax.set_ylabel('Measurement', fontsize=12)
+        self.ax.set_title('DHT11 Temperature and Humidity over Time', fontsize=14, weight='bold')
+        self.ax.legend()
+        self.ax.grid(True, linestyle='--', alpha=0.6)
+        self.fig.tight_layout()
+
+    def update(self, elapsed_mins, temps, hums, first=0):
+        # first: run-wide index of elapsed_mins[0] (older rows may have been spilled to disk)
+        start = max(self.n - first, 0)
+        new_elapsed = elapsed_mins[start:]
+        if not len(new_elapsed):
+            return
+        self.temps.extend(new_elapsed, temps[start:])
+        self.hums.extend(new_elapsed, hums[start:])
+        self.n = first + len(elapsed_mins)
+        self.ax.autoscale_view()
+        self.fig.savefig(PLOT_FILENAME)
 
+def main():
+    port = sys.argv[1] if len(sys.argv) > 1 else SERIAL_PORT  # e.g. a pty from utils/simulator.py
+    parser = get_parser('L12')
+    ser, initial = open_serial(port, BAUD_RATE, parser, timeout=1, connect_timeout=CONNECT_TIMEOUT)
+
+    metrics = Metrics('L12', interval=METRICS_INTERVAL, export_file=METRICS_FILENAME)
+    store = SampleStore({'elapsed_min': np.float64, 'temperature_C': np.float64, 'humidity': np.float64},
+                        stats=('temperature_C', 'humidity'),
+                        max_rows=MAX_ROWS_IN_MEMORY, spill_dir=SPILL_DIR, name='datalog')
+    temp_stats = store.stats['temperature_C']
+    hum_stats = store.stats['humidity']
+
+    def echo_raw(lines):
+        for raw in lines:
+            print(f"Received: '{raw.decode('utf-8', errors='replace')}'")
+        return lines
+
+    def readings(t_ns, cols):
+        timestamp_str = format_timestamp(t_ns[0])
+        for elapsed_min, temp, hum in zip(cols['elapsed_min'].tolist(), cols['temperature_C'].tolist(), cols['humidity'].tolist()):
+            yield (f"[{timestamp_str}] Elapsed: {elapsed_min:.2f} min, Temp: {temp} °C (avg {temp_stats.mean:.2f} ± {temp_stats.std:.2f}), "
+                   f"Humidity: {hum} % (avg {hum_stats.mean:.2f} ± {hum_stats.std:.2f})")
+
+    def snapshot():
+        # Copies of the in-memory rows, for the plot thread
+        args = tuple(store.column(col).copy() for col in ('elapsed_min', 'temperature_C', 'humidity'))
+        return args, ({'first': store.first} if LIVE_PLOT else {})
+
+    # Elapsed time comes from the host clock, the sketch only sends T and H
+    steps = [('raw', echo_raw)] if PRINT_RAW else []
+    compressor = Compressor(COMPRESSION_TOLERANCE, COMPRESSION) if COMPRESSION else None
+    steps += [('parse', parse_lines(parser, metrics)), ('convert', host_elapsed())]
+    steps += ingest_steps(store, metrics, compressor)
+    sinks = []
+    if STORAGE in ('csv', 'both'):
+        # Append-only: only new rows hit the disk, the history is never rewritten
+        sinks.append(CSVSink(FILENAME, 'L12', flush_rows=SAVE_INTERVAL, flush_interval=FLUSH_SECONDS,
+                             fsync=FSYNC_POLICY))
+    if STORAGE in ('columnar', 'both'):
+        sinks.append(ColumnarSink(COLUMNAR_DIR, 'L12', chunk_rows=COLUMNAR_CHUNK_ROWS))
+    if PRINT_READINGS:
+        sinks.append(PrintSink(readings))
+    plot_func = deferred(LivePlot, 'update') if LIVE_PLOT else plot_data  # figure built on the plot thread
+    sinks.append(PlotSink(plot_func, snapshot, every=SAVE_INTERVAL, min_interval=PLOT_MIN_INTERVAL,
+                          headless=HEADLESS, metrics=metrics))
+
+    control = Control(CONTROL_SOCKET, STOP_FILE, stats=store.stats, metrics=metrics, message="\nStop requested. Stopping...")
+    control_settings(control, sinks, SAVE_INTERVAL, PLOT_MIN_INTERVAL)
+
+    reader = SerialReader(ser).start(initial)
     try:
-        while True:
-            if os.path.isfile(STOP_FILE):
-                print(f"\nDetected '{STOP_FILE}'. Stopping...")
-                break
-
-            line = ser.readline().decode('utf-8').strip()
-            if not line:
-                continue
-
-            # Only print and parse lines containing both 'T =' and 'H ='
-            if "T =" in line and "H =" in line:
-                print(f"Received: '{line}'")
-                try:
-                    temp_part, hum_part = line.split(',')
-                    temp_str = temp_part.split('=')[1].strip().split(' ')[0]
-                    temp = float(temp_str)
-                    hum_str = hum_part.split('=')[1].strip().replace('%','')
-                    hum = float(hum_str)
-                except Exception as e:
-                    print(f"Parse error: {e} in line: {line}")
-                    continue
-
-                elapsed_sec = time.time() - start_time
-                elapsed_min = elapsed_sec / 60
-                timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                timestamps.append(timestamp_str)
-                elapsed_mins.append(elapsed_min)
-                temps.append(temp)
-                hums.append(hum)
-
-                print(f"[{timestamp_str}] Elapsed: {elapsed_min:.2f} min, Temp: {temp} °C, Humidity: {hum} %")
-
-                count += 1
-                if count % save_interval == 0:
-                    save_to_csv(timestamps, elapsed_mins, temps, hums)
-                    plot_data(elapsed_mins, temps, hums)
-
-            else:
-                # Ignore any lines without full temperature and humidity info
-                continue
-
-    except KeyboardInterrupt:
-        print("\nKeyboard interrupt, stopping...")
-
+        with control:
+            print(f"Logging data to {FILENAME}... ({control.describe()})\n")
+            Pipeline(serial_source(reader, control, metrics), steps, sinks, metrics).run()
     finally:
         ser.close()
-        save_to_csv(timestamps, elapsed_mins, temps, hums)
-        plot_data(elapsed_mins, temps, hums)
-        print(f"Serial closed. Final plot saved as {PLOT_FILENAME}")
+    if parser.malformed:
+        print(f"{parser.malformed} malformed lines skipped.")
+    if compressor:
+        print(f"Compression {compressor.summary()}. Over all readings: Temp {temp_stats.mean:.2f} ± {temp_stats.std:.2f} °C, "
+              f"Humidity {hum_stats.mean:.2f} ± {hum_stats.std:.2f} %")
+    print(f"Serial closed. Final plot saved as {PLOT_FILENAME}")
 
 if __name__ == "__main__":
     main()
@@ -2,43 +2,60 @@
 #  
 # Based on L22 off Elegoo 
 #  
-#  should create utils.py and etc
+#  The acquisition loop lives in utils/pipeline.py; this file is the
+#  configuration and the plots.
 
 import serial
-import time
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime
-from scipy.stats import gaussian_kde
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # repo root, for utils/
+from utils.stats import RunningStats, cumulative_mean_std
+from utils.decimate import decimate_indices
+from utils.liveplot import GrowingErrorbar, IncrementalHistogram, update_histograms
+from utils.kde import BinnedKDE
+from utils.samplestore import SampleStore, format_timestamp
+from utils.serialreader import SerialReader
+from utils.parsers import get_parser
+from utils.metrics import Metrics
+from utils.headless import pyplot, deferred
+from utils.compress import Compressor
+from utils.control import Control
+from utils.pipeline import (Pipeline, open_serial, serial_source, parse_lines, ingest_steps, control_settings,
+                            CSVSink, ColumnarSink, PrintSink, PlotSink)
 
 # === Config ===
 SERIAL_PORT = '/dev/ttyACM0'  # Adjust to your Arduino's port
 BAUD_RATE = 9600
 CSV_FILENAME = 'temp_log.csv'
 PLOT_FILENAME = 'temp_plot.png'
-STOP_FILENAME = 'STOP'
-SAVE_INTERVAL = 5  # Save and plot every N readings
-
-def connect_serial(port, baudrate):
-    try:
-        ser = serial.Serial(port, baudrate, timeout=2)
-        time.sleep(2)  # Wait for Arduino reset
-        print(f"Connected to {port} at {baudrate} baud.")
-        return ser
-    except serial.SerialException as e:
-        print(f"[ERROR] Could not open serial port {port}: {e}")
-        return None
-
-def save_data(timestamps, elapsed, temps):
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'elapsed_min': elapsed,
-        'temperature_F': temps
-    })
-    df.to_csv(CSV_FILENAME, index=False)
-    print(f"[INFO] Data saved to '{CSV_FILENAME}'.")
+STOP_FILENAME = 'STOP'  # Only watched when the control socket can't be created
+CONTROL_SOCKET = 'temp_log.ctl'  # python -m utils.control temp_log.ctl stop|stats|get|set NAME VALUE; None: STOP file only
+SAVE_INTERVAL = 5  # Save and plot every N readings (live: set save_interval N)
+PRINT_RAW = False  # Echo every raw serial line (debug)
+PRINT_READINGS = False  # One line per reading; the periodic metrics summary replaces it
+METRICS_INTERVAL = 10  # Seconds between metrics summaries (stage latencies, rate, drops)
+METRICS_FILENAME = 'temp_log.metrics.jsonl'  # Every summary as a JSON line; None to not export
+PLOT_MIN_INTERVAL = 10  # Seconds between plot renders; older snapshots are dropped (live: set plot_interval S)
+LIVE_PLOT = True  # Keep one figure and only push new points into it (see LivePlot)
+HEADLESS = False  # No plots while logging (matplotlib isn't even imported), only one at exit
+CONNECT_TIMEOUT = 10  # Seconds to wait for the first valid line after opening the port
+MAX_PLOT_POINTS = 2000  # Points drawn per time series (~plot width in pixels); None draws all
+DECIMATE_METHOD = 'minmax'  # or 'lttb', see utils/decimate.py
+FLUSH_SECONDS = 30  # Also flush new rows at least this often (bounds data lost on a crash)
+FSYNC_POLICY = 'flush'  # 'never', 'flush' or 'close' (see utils/csvlog.py)
+MAX_ROWS_IN_MEMORY = 500_000  # Older rows are spilled to SPILL_DIR; None keeps everything in memory
+SPILL_DIR = 'spill'
+STORAGE = 'csv'  # 'csv', 'columnar' (chunked .npy, see utils/colstore.py) or 'both'
+COLUMNAR_DIR = 'temp_log.cols'
+COLUMNAR_CHUNK_ROWS = 1000
+# 'deadband' or 'swinging_door' (see utils/compress.py): only the readings needed to redraw the
+# series within COMPRESSION_TOLERANCE are stored and plotted. The whole plot then shows the
+# kept readings only: its N, the cumulative error bars, the histogram and the KDE. The running
+# Avg ± std (metrics, 'stats' queries, exit summary) stays over every reading. None stores everything.
+COMPRESSION = None
+COMPRESSION_TOLERANCE = {'temperature_F': 0.1}  # °F
 
 def plot_data(elapsed, temps):
     if len(temps) == 0:
@@ -50,13 +67,17 @@ def plot_data(elapsed, temps):
 
     # Calculate running std dev for error bars at each point (simple moving std or cumulative std)
     # Here we use cumulative std dev up to each point for demonstration
-    stds = [np.std(temps[:i+1]) if i>0 else 0 for i in range(num_points)]
+    _, stds = cumulative_mean_std(temps)
+
+    # Only draw a shape-preserving subset of the time series; stats and the PDF use everything
+    idx = decimate_indices(elapsed, temps, MAX_PLOT_POINTS, DECIMATE_METHOD)
 
     # Set up plot with two subplots: time series with error bars and PDF
+    plt = pyplot()
     fig, axs = plt.subplots(2, 1, figsize=(8, 8), dpi=300)
 
     # --- Subplot 1: Temperature vs elapsed time with error bars ---
-    axs[0].errorbar(elapsed, temps, yerr=stds, fmt='-o', color='tab:red', ecolor='gray', alpha=0.7, label=f'Temperature (°F)\nN={num_points}')
+    axs[0].errorbar(np.asarray(elapsed)[idx], np.asarray(temps)[idx], yerr=stds[idx], fmt='-o', color='tab:red', ecolor='gray', alpha=0.7, label=f'Temperature (°F)\nN={num_points}')
     axs[0].set_xlabel("Elapsed Time (minutes)")
     axs[0].set_ylabel("Temperature (°F)")
     axs[0].set_title("Temperature Over Time")
@@ -67,11 +88,12 @@ def plot_data(elapsed, temps):
     # Histogram
     axs[1].hist(temps, bins='auto', density=True, alpha=0.5, color='tab:blue', label='Histogram')
 
-    # KDE (Kernel Density Estimate)
+    # KDE (Kernel Density Estimate), binned + FFT instead of gaussian_kde's O(n * grid)
     try:
-        kde = gaussian_kde(temps)
-        temp_range = np.linspace(min(temps), max(temps), 1000)
-        axs[1].plot(temp_range, kde(temp_range), color='tab:orange', label='KDE')
+        kde = BinnedKDE()
+        kde.add(temps)
+        temp_range, density = kde.evaluate()
+        axs[1].plot(temp_range, density, color='tab:orange', label='KDE')
     except Exception as e:
         print(f"[WARN] KDE plot error: {e}")
 
@@ -86,64 +108,125 @@ def plot_data(elapsed, temps):
     plt.close()
     print(f"[INFO] Plot saved to '{PLOT_FILENAME}'.")
 
+class LivePlot:
+    # Same layout as plot_data, but the figure and artists are built once and
+    # each update only adds the samples that arrived since the last one.
+    def __init__(self):
+        self.fig, self.axs = pyplot().subplots(2, 1, figsize=(8, 8), dpi=300)
+        self.n = 0
+        self.stats = RunningStats()
+        self.hist = IncrementalHistogram(bins='auto')
+        self.kde = BinnedKDE()
+
+        ax = self.axs[0]
+        self.series = GrowingErrorbar(ax, fmt='-o', color='tab:red', ecolor='gray', alpha=0.7, label='Temperature (°F)',
+                                      max_points=MAX_PLOT_POINTS, method=DECIMATE_METHOD)
+        ax.set_xlabel("Elapsed Time (minutes)")
+        ax.set_ylabel("Temperature (°F)")
+        ax.set_title("Temperature Over Time")
+        ax.grid(True, linestyle="--", alpha=0.5)
+        self.legend = ax.legend()
+
+        ax = self.axs[1]
+        self.hist_artist = ax.stairs([0], [0, 1], fill=True, alpha=0.5, color='tab:blue', label='Histogram')
+        (self.kde_line,) = ax.plot([], [], color='tab:orange', label='KDE')
+        ax.set_xlabel("Temperature (°F)")
+        ax.set_ylabel("Density")
+        ax.set_title("Temperature Distribution (PDF)")
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=0.5)
+
+        self.fig.tight_layout()
+
+    def update(self, elapsed, temps, first=0):
+        # first: run-wide index of elapsed[0] (rows before it may have been spilled to disk)
+        start = max(self.n - first, 0)
+        new_elapsed = np.asarray(elapsed[start:], dtype=float)
+        new_temps = np.asarray(temps[start:], dtype=float)
+        if len(new_temps) == 0:
+            return
+        self.n = first + len(temps)
+
+        # cumulative std up to each new point, continuing from the previous update
+        stds = np.empty(len(new_temps))
+        for i, t in enumerate(new_temps):
+            self.stats.update(t)
+            stds[i] = self.stats.std
+        self.series.extend(new_elapsed, new_temps, stds)
+        self.axs[0].autoscale_view()
+        self.legend.get_texts()[0].set_text(f'Temperature (°F)\nN={self.n}')
+
+        self.hist.add(new_temps)
+        update_histograms(self.axs[1], [(self.hist_artist, self.hist)], density=True)
+        self.kde.add(new_temps)
+        try:
+            self.kde_line.set_data(*self.kde.evaluate())
+        except Exception as e:
+            print(f"[WARN] KDE plot error: {e}")
+
+        self.fig.savefig(PLOT_FILENAME)
+        print(f"[INFO] Plot saved to '{PLOT_FILENAME}'.")
+
 def main():
-    ser = connect_serial(SERIAL_PORT, BAUD_RATE)
-    if not ser:
+    port = sys.argv[1] if len(sys.argv) > 1 else SERIAL_PORT  # e.g. a pty from utils/simulator.py
+    parser = get_parser('L23')
+    try:
+        ser, initial = open_serial(port, BAUD_RATE, parser, timeout=2, connect_timeout=CONNECT_TIMEOUT)
+    except serial.SerialException as e:
+        print(f"[ERROR] Could not open serial port {port}: {e}")
         return
 
-    timestamps = []
-    elapsed_mins = []
-    temps = []
-    count = 0
-
-    print(f"\n[LOGGING STARTED] Logging to '{CSV_FILENAME}'... (create file named '{STOP_FILENAME}' to stop)\n")
-
+    metrics = Metrics('L23', interval=METRICS_INTERVAL, export_file=METRICS_FILENAME)
+    store = SampleStore({'elapsed_min': np.float64, 'temperature_F': np.float64}, stats=('temperature_F',),
+                        max_rows=MAX_ROWS_IN_MEMORY, spill_dir=SPILL_DIR, name='temp_log')
+    temp_stats = store.stats['temperature_F']
+
+    def echo_raw(lines):
+        for raw in lines:
+            print(f"[RAW] {raw.decode('utf-8', errors='replace')}")  # Debug: show raw lines
+        return lines
+
+    def readings(t_ns, cols):
+        timestamp = format_timestamp(t_ns[0])
+        for e, t in zip(cols['elapsed_min'], cols['temperature_F']):
+            yield f"[{timestamp}] {e:.2f} min | {t:.2f} °F | Avg: {temp_stats.mean:.2f} ± {temp_stats.std:.2f}"
+
+    def snapshot():
+        # Copies of the in-memory rows, for the plot thread
+        elapsed, temps = store.column('elapsed_min').copy(), store.column('temperature_F').copy()
+        return (elapsed, temps), ({'first': store.first} if LIVE_PLOT else {})
+
+    steps = [('raw', echo_raw)] if PRINT_RAW else []
+    compressor = Compressor(COMPRESSION_TOLERANCE, COMPRESSION) if COMPRESSION else None
+    steps += [('parse', parse_lines(parser, metrics))] + ingest_steps(store, metrics, compressor)
+    sinks = []
+    if STORAGE in ('csv', 'both'):
+        # Append-only: only new rows hit the disk, the history is never rewritten
+        sinks.append(CSVSink(CSV_FILENAME, 'L23', flush_rows=SAVE_INTERVAL, flush_interval=FLUSH_SECONDS,
+                             fsync=FSYNC_POLICY))
+    if STORAGE in ('columnar', 'both'):
+        sinks.append(ColumnarSink(COLUMNAR_DIR, 'L23', chunk_rows=COLUMNAR_CHUNK_ROWS))
+    if PRINT_READINGS:
+        sinks.append(PrintSink(readings))
+    plot_func = deferred(LivePlot, 'update') if LIVE_PLOT else plot_data  # figure built on the plot thread
+    sinks.append(PlotSink(plot_func, snapshot, every=SAVE_INTERVAL, min_interval=PLOT_MIN_INTERVAL,
+                          headless=HEADLESS, metrics=metrics))
+
+    control = Control(CONTROL_SOCKET, STOP_FILENAME, stats=store.stats, metrics=metrics)
+    control_settings(control, sinks, SAVE_INTERVAL, PLOT_MIN_INTERVAL)
+
+    reader = SerialReader(ser).start(initial)
     try:
-        while True:
-            if os.path.exists(STOP_FILENAME):
-                print(f"\n[STOP] Detected '{STOP_FILENAME}'. Exiting loop...")
-                break
-
-            line = ser.readline().decode('utf-8').strip()
-            if not line:
-                continue
-
-            print(f"[RAW] {line}")  # Debug: show raw line
-
-            try:
-                parts = line.split(',')
-                if len(parts) != 2:
-                    continue
-
-                elapsed = float(parts[0])
-                temp_f = float(parts[1])
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                timestamps.append(timestamp)
-                elapsed_mins.append(elapsed)
-                temps.append(temp_f)
-
-                avg_temp = np.mean(temps)
-                std_temp = np.std(temps)
-
-                print(f"[{timestamp}] {elapsed:.2f} min | {temp_f:.2f} °F | Avg: {avg_temp:.2f} ± {std_temp:.2f}")
-
-                count += 1
-                if count % SAVE_INTERVAL == 0:
-                    save_data(timestamps, elapsed_mins, temps)
-                    plot_data(elapsed_mins, temps)
-
-            except ValueError as e:
-                print(f"[WARN] Failed to parse line: {line} | Error: {e}")
-
-    except KeyboardInterrupt:
-        print("\n[INTERRUPT] KeyboardInterrupt received. Exiting...")
-
+        with control:
+            print(f"\n[LOGGING STARTED] Logging to '{CSV_FILENAME}'... ({control.describe()})\n")
+            Pipeline(serial_source(reader, control, metrics), steps, sinks, metrics).run()
     finally:
         ser.close()
-        save_data(timestamps, elapsed_mins, temps)
-        plot_data(elapsed_mins, temps)
-        print(f"\n[INFO] Serial closed. Final data and plot saved.")
+    if parser.malformed:
+        print(f"[WARN] {parser.malformed} malformed lines skipped.")
+    if compressor:
+        print(f"[INFO] Compression {compressor.summary()}, Avg: {temp_stats.mean:.2f} ± {temp_stats.std:.2f} °F over all readings")
+    print(f"\n[INFO] Serial closed. Final data and plot saved.")
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,31 @@
 import serial
 import time
+import os
+import sys
 
-ser = serial.Serial('/dev/ttyACM0', 9600, timeout=2)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.serialreader import SerialReader
+
+port = sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyACM0'  # e.g. a pty from utils/simulator.py
+ser = serial.Serial(port, 9600, timeout=2)
 time.sleep(2)
 
+reader = SerialReader(ser).start()
 print("Starting to read lines:")
-while True:
-    line = ser.readline()
-    if line:
-        try:
-            print(line.decode('utf-8').strip())
-        except UnicodeDecodeError:
-            print("[ERROR] Could not decode line")
-    else:
-        print("[DEBUG] No data received")
+try:
+    while True:
+        batch = reader.get_batch(timeout=2.0)
+        if not batch:
+            print(f"[DEBUG] No data received (overruns: {reader.overruns})")
+            continue
+        for line in batch:
+            try:
+                print(line.decode('utf-8').strip())
+            except UnicodeDecodeError:
+                print("[ERROR] Could not decode line")
+        print(f"[DEBUG] batch of {len(batch)} lines, {reader.bytes_read} bytes read, overruns: {reader.overruns}")
+except (KeyboardInterrupt, EOFError) as e:
+    print(f"[DEBUG] Stopped: {e!r}")
+finally:
+    reader.stop()
+    ser.close()
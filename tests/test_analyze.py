@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from utils.analyze import analyze
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def log(tmp_path):
+    # An L23 log, one reading a second from 12:00:30, with a spike at row 1000
+    n = 3000
+    rng = np.random.default_rng(0)
+    temps = np.round(70 + np.sin(np.arange(n) / 300) + rng.normal(0, 0.05, n), 2)
+    temps[1000] = 90.0
+    dates = pd.Timestamp('2024-05-01 12:00:30') + pd.to_timedelta(np.arange(n), unit='s')
+    csv_file = tmp_path / 'temp_log.csv'
+    pd.DataFrame({'timestamp': dates.strftime('%Y-%m-%d %H:%M:%S'), 'elapsed_min': np.arange(n) / 60.0,
+                  'temperature_F': temps}).to_csv(csv_file, index=False)
+    return str(csv_file), dates, temps
+
+
+def test_chunked_cli_matches_whole_file(tmp_path, log):
+    csv_file, dates, temps = log
+    out = tmp_path / 'out'
+    out.mkdir()
+    subprocess.run([sys.executable, '-m', 'utils.analyze', csv_file, '--out-dir', str(out),
+                    '--chunk-rows', '97', '--no-plot'], cwd=ROOT, check=True, capture_output=True)
+    with open(out / 'temp_log.summary.json') as f:
+        summary = json.load(f)
+
+    assert summary['schema'] == 'L23' and summary['rows'] == 3000 and summary['chunks'] == 31
+    assert summary['first'] == '2024-05-01 12:00:30' and summary['last'] == '2024-05-01 12:50:29'
+    s = summary['columns']['temperature_F']
+    assert s['count'] == 3000 and s['min'] == temps.min() and s['max'] == 90.0
+    assert s['mean'] == pytest.approx(temps.mean(), rel=1e-12)
+    assert s['std'] == pytest.approx(temps.std(), rel=1e-9)
+    assert s['outliers'] >= 1
+
+    # The minute file has the same aggregates as grouping the whole file
+    minute = pd.read_csv(out / 'temp_log.minute.csv')
+    expected = pd.Series(temps).groupby(dates.floor('min')).agg(['size', 'mean', 'min', 'max'])
+    assert summary['intervals']['minute']['rows'] == len(minute) == len(expected) == 51
+    assert minute['interval_start'].iloc[0] == '2024-05-01 12:00:00'
+    np.testing.assert_array_equal(minute['rows'], expected['size'])
+    np.testing.assert_allclose(minute['temperature_F mean'], expected['mean'], rtol=1e-5)
+    np.testing.assert_array_equal(minute['temperature_F max'], expected['max'])
+
+
+def test_chunk_size_does_not_change_results(tmp_path, log):
+    csv_file = log[0]
+    results = []
+    for chunk_rows in (97, 1000, 100_000):
+        out = tmp_path / str(chunk_rows)
+        out.mkdir()
+        summary = analyze(csv_file, out_dir=str(out), chunk_rows=chunk_rows, plot=False)
+        with open(out / 'temp_log.hour.csv') as f:
+            results.append((summary['columns'], f.read()))
+    for columns, hours in results[1:]:
+        assert hours == results[0][1]
+        for col, s in columns.items():
+            for key, value in s.items():
+                assert value == pytest.approx(results[0][0][col][key], rel=1e-9), (col, key)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from utils.binproto import ENCODED_SIZE, FrameDecoder, cobs_decode, cobs_encode, encode_sample
+
+
+@pytest.mark.parametrize('data', [b'', b'\x00', b'\x00\x00', b'\x11\x00\x22', bytes(range(1, 255)),
+                                  bytes(range(256)) * 2, b'\xff' * 300])
+def test_cobs_round_trip(data):
+    encoded = cobs_encode(data)
+    assert b'\x00' not in encoded
+    assert cobs_decode(encoded) == data
+
+
+def test_frames_have_fixed_size():
+    assert len(encode_sample(0, 0, 0)) == ENCODED_SIZE + 1
+    assert len(encode_sample(255, 2**32 - 1, -32768)) == ENCODED_SIZE + 1
+
+
+def stream(n, start_us=0):
+    return b''.join(encode_sample(i, start_us + 1000 * i, i - 50) for i in range(n))
+
+
+def test_decoder_splits_anywhere():
+    data = b'\x00' + stream(100)  # a delimiter first: nothing in flight at open
+    decoder = FrameDecoder()
+    parts = [decoder.feed(data[i:i + 7]) for i in range(0, len(data), 7)]
+    adc = np.concatenate([p['adc'] for p in parts])
+    np.testing.assert_array_equal(adc, np.arange(100) - 50)
+    assert decoder.frames == 100 and decoder.malformed == 0 and decoder.lost == 0
+
+
+def test_corrupt_and_lost_frames_are_counted():
+    frames = [encode_sample(i, 1000 * i, i) for i in range(10)]
+    frames[3] = frames[3][:4] + bytes([frames[3][4] ^ 0x01]) + frames[3][5:]  # CRC mismatch
+    del frames[6]  # never arrived
+    decoder = FrameDecoder()
+    out = decoder.feed(b'\x00' + b''.join(frames))
+    assert out['adc'].tolist() == [0, 1, 2, 4, 5, 7, 8, 9]
+    assert decoder.malformed == 1
+    assert decoder.lost == 2
+
+
+def test_device_time_is_unwrapped():
+    decoder = FrameDecoder()
+    out = decoder.feed(b'\x00' + stream(4, start_us=2**32 - 2000))
+    assert np.all(np.diff(out['device_us']) == 1000)
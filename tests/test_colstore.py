@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+from utils.colstore import ColumnarReader, ColumnarWriter
+from utils.pipeline import ColumnarSink
+from utils.schemas import column_dtypes
+from utils.thermistor import CONVERTED_COLUMNS
+
+
+def write_log(path, n, chunk_rows=4, append=False, start=0):
+    t_ns = np.arange(start, start + n, dtype=np.int64) * 1_000_000_000
+    with ColumnarWriter(path, {'x': np.float64}, chunk_rows=chunk_rows, append=append) as writer:
+        writer.extend(t_ns, x=t_ns / 1e9)
+    return t_ns
+
+
+def test_round_trip_and_time_range(tmp_path):
+    path = str(tmp_path / 'log.cols')
+    t_ns = write_log(path, 10)
+    reader = ColumnarReader(path)
+    assert len(reader) == 10
+    assert [c['rows'] for c in reader.chunks] == [4, 4, 2]
+    out = reader.read(t_ns[3], t_ns[7])
+    np.testing.assert_array_equal(out['t_ns'], t_ns[3:7])
+    np.testing.assert_array_equal(out['x'], [3.0, 4.0, 5.0, 6.0])
+    np.testing.assert_array_equal(reader.last(2)['x'], [7.0, 8.0, 9.0])
+
+
+def test_append_continues_the_log(tmp_path):
+    path = str(tmp_path / 'log.cols')
+    write_log(path, 5)
+    write_log(path, 3, append=True, start=5)
+    np.testing.assert_array_equal(ColumnarReader(path).read()['x'], np.arange(8.0))
+
+
+def test_new_log_removes_old_chunks_only(tmp_path):
+    path = str(tmp_path / 'log.cols')
+    write_log(path, 10)
+    keep = os.path.join(path, 'notes.txt')
+    open(keep, 'w').close()
+    write_log(path, 3)
+    reader = ColumnarReader(path)
+    np.testing.assert_array_equal(reader.read()['x'], [0.0, 1.0, 2.0])
+    assert sorted(os.listdir(path)) == ['chunk_000000', 'index.json', 'notes.txt']
+
+
+def test_ads_sink_keeps_raw_adc(tmp_path):
+    path = str(tmp_path / 'ads.cols')
+    sink = ColumnarSink(path, 'ADS1115', extra={'adc': np.int16})
+    adc = np.array([100, 20000, 32767], dtype=np.int16)
+    columns = {'elapsed_min': np.arange(3.0), 'adc': adc}
+    columns.update((col, np.ones(3)) for col in CONVERTED_COLUMNS)
+    sink.write(np.arange(3, dtype=np.int64), columns)
+    sink.close()
+    reader = ColumnarReader(path)
+    assert set(reader.columns) == set(column_dtypes('ADS1115')) | {'adc'}
+    out = reader.read()
+    assert out['adc'].dtype == np.int16
+    np.testing.assert_array_equal(out['adc'], adc)
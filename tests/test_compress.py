@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from utils.compress import METHODS, Compressor
+
+TOLERANCE = 0.1
+
+
+def signal(n=2000, seed=0):
+    # a slow ramp, a flat stretch and noise: what the loggers see
+    rng = np.random.default_rng(seed)
+    elapsed = np.arange(n) / 60.0
+    y = np.concatenate([np.linspace(20, 30, n // 2), np.full(n - n // 2, 30.0)]) + rng.normal(0, 0.03, n)
+    y[n // 3:n // 3 + 50] += 1.0  # a step
+    return np.arange(n, dtype=np.int64), {'elapsed_min': elapsed, 'temperature_F': y}
+
+
+def compress(method, t_ns, columns, batch):
+    comp = Compressor({'temperature_F': TOLERANCE}, method)
+    parts = [comp((t_ns[i:i + batch], {col: v[i:i + batch] for col, v in columns.items()}))
+             for i in range(0, len(t_ns), batch)]
+    parts.append(comp.flush())
+    parts = [p for p in parts if p is not None]
+    t_out = np.concatenate([p[0] for p in parts])
+    return comp, t_out, {col: np.concatenate([p[1][col] for p in parts]) for col in columns}
+
+
+def reconstruct(method, t_kept, y_kept, t):
+    if method == 'deadband':  # the last kept value holds
+        return y_kept[np.searchsorted(t_kept, t, side='right') - 1]
+    return np.interp(t, t_kept, y_kept)
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('batch', [1, 7, 5000])
+def test_error_bound(method, batch):
+    t_ns, columns = signal()
+    comp, t_kept, kept = compress(method, t_ns, columns, batch)
+    assert comp.seen == len(t_ns) and comp.kept == len(t_kept) < len(t_ns) // 4
+    assert t_kept[0] == t_ns[0] and t_kept[-1] == t_ns[-1]
+    assert np.all(np.diff(t_kept) > 0)
+    y = reconstruct(method, kept['elapsed_min'], kept['temperature_F'], columns['elapsed_min'])
+    assert np.max(np.abs(y - columns['temperature_F'])) <= TOLERANCE + 1e-9
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_batching_does_not_change_the_result(method):
+    t_ns, columns = signal()
+    _, whole, _ = compress(method, t_ns, columns, len(t_ns))
+    for batch in (1, 3, 64):
+        np.testing.assert_array_equal(compress(method, t_ns, columns, batch)[1], whole)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_non_finite_rows_are_kept(method):
+    t_ns, columns = signal(200)
+    columns['temperature_F'][[50, 120]] = [np.nan, np.inf]
+    _, t_kept, _ = compress(method, t_ns, columns, 32)
+    assert {50, 120} <= set(t_kept.tolist())
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        Compressor({'x': 1.0}, 'gzip')
@@ -0,0 +1,93 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from utils.control import Control, send
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix domain sockets")
+
+
+def serve(control, until):
+    # The logger loop: runs the queued commands until it is told to stop
+    while not control() and time.monotonic() < until:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def control(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.control.WATCH_INTERVAL', 0.05)  # quicker shutdown of the socket thread
+    path = str(tmp_path / 'log.ctl')
+    ctl = Control(path, stop_file=str(tmp_path / 'STOP'), status=lambda: {'devices': {'a': {'samples': 3}}},
+                  message=None)
+    values = []
+    ctl.setting('save_interval', 5, values.append, minimum=1)
+    ctl.applied = values
+    with ctl:
+        loop = threading.Thread(target=serve, args=(ctl, time.monotonic() + 10))
+        loop.start()
+        yield ctl
+        ctl.stop()
+        loop.join()
+    assert not os.path.exists(path)
+
+
+def test_stats_and_settings(control):
+    reply = send(control.path, ['stats'])
+    assert reply['ok'] and reply['devices'] == {'a': {'samples': 3}}
+    assert reply['settings'] == {'save_interval': 5}
+    assert send(control.path, ['set', 'save_interval', '20']) == {'ok': True, 'settings': {'save_interval': 20}}
+    assert control.applied == [20]
+    assert send(control.path, ['get'])['settings'] == {'save_interval': 20}
+
+
+@pytest.mark.parametrize('words', [['set', 'save_interval', '0'], ['set', 'nope', '1'], ['set', 'save_interval'],
+                                   ['set', 'save_interval', 'x'], ['restart']])
+def test_bad_commands_are_refused(control, words):
+    assert send(control.path, words)['ok'] is False
+    assert control.applied == []
+
+
+def test_stop(control):
+    assert send(control.path, ['stop']) == {'ok': True, 'stopping': True}
+    assert control()
+
+
+def test_stop_file_without_socket(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.control.WATCH_INTERVAL', 0.05)
+    stop_file = tmp_path / 'STOP'
+    with Control(None, stop_file=str(stop_file), message=None) as ctl:
+        assert 'STOP' in ctl.describe()
+        assert not ctl()
+        stop_file.touch()
+        deadline = time.monotonic() + 5
+        while not ctl() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert ctl()
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf'])
+def test_non_finite_values_are_refused(tmp_path, value):
+    applied = []
+    ctl = Control(None, stop_file=None, message=None)
+    ctl.setting('plot_interval', 5.0, applied.append, minimum=0)
+    assert ctl._execute(['set', 'plot_interval', value])['ok'] is False
+    assert applied == [] and ctl.settings['plot_interval'][0] == 5.0
+
+
+def test_commands_left_at_close_are_answered(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.control.WATCH_INTERVAL', 0.05)
+    path = str(tmp_path / 'log.ctl')
+    ctl = Control(path, stop_file=None, message=None).start()  # the loop never calls it
+    replies = []
+    client = threading.Thread(target=lambda: replies.append(send(path, ['stats'], timeout=5)))
+    client.start()
+    while not ctl._pending:
+        time.sleep(0.01)
+    start = time.monotonic()
+    ctl.close()
+    client.join()
+    assert replies == [{'ok': False, 'error': 'stopping'}]
+    assert time.monotonic() - start < 2
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from utils.csvlog import AppendCSVWriter
+
+
+def lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_flushes_every_flush_rows(tmp_path):
+    path = tmp_path / 'log.csv'
+    with AppendCSVWriter(path, ['a', 'b'], flush_rows=3, fsync='never') as writer:
+        writer.write_rows([[1, 2], [3, 4]])
+        assert lines(path) == ['a,b']
+        writer.write_row([5, 6])
+        assert lines(path) == ['a,b', '1,2', '3,4', '5,6']
+
+
+def test_poll_flushes_while_idle(tmp_path):
+    path = tmp_path / 'log.csv'
+    with AppendCSVWriter(path, ['a'], flush_rows=100, flush_interval=0.05, fsync='never') as writer:
+        writer.write_row([1])
+        writer.poll()
+        assert lines(path) == ['a']
+        time.sleep(0.1)
+        writer.poll()  # no new row, the interval alone flushes
+        assert lines(path) == ['a', '1']
+
+
+def test_append_keeps_header_and_rows(tmp_path):
+    path = tmp_path / 'log.csv'
+    with AppendCSVWriter(path, ['a'], fsync='never') as writer:
+        writer.write_row([1])
+    with AppendCSVWriter(path, ['a'], fsync='never', append=True) as writer:
+        writer.write_row([2])
+    assert lines(path) == ['a', '1', '2']
+
+
+def test_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        AppendCSVWriter(tmp_path / 'log.csv', ['a'], fsync='sometimes')
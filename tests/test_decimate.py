@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from utils.decimate import IncrementalDecimator, decimate_indices, lttb_indices, minmax_indices
+
+
+@pytest.fixture
+def series():
+    x = np.arange(100_003, dtype=np.float64)
+    y = np.sin(x / 5000) + np.random.default_rng(2).normal(0, 0.01, x.size)
+    y[12_345] = 5.0  # a spike
+    y[77_777] = -5.0
+    return x, y
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_bounded_sorted_and_keeps_the_ends(series, method):
+    x, y = series
+    idx = decimate_indices(x, y, 1000, method)
+    assert len(idx) <= 1000 + 4  # minmax: plus the ends and the tail bucket
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_minmax_keeps_spikes(series):
+    x, y = series
+    idx = minmax_indices(y, 500)
+    assert {12_345, 77_777} <= set(idx.tolist())
+
+
+def test_minmax_nan():
+    y = np.arange(100, dtype=np.float64)
+    y[45:55] = np.nan  # partly NaN buckets: min/max of the rest
+    idx = minmax_indices(y, 10)
+    assert not np.isnan(y[idx]).any()
+    y[60:70] = np.nan  # an all-NaN bucket keeps a NaN, so the line shows the gap
+    assert np.isnan(y[minmax_indices(y, 10)]).any()
+
+
+def test_lttb_exact_size(series):
+    x, y = series
+    assert len(lttb_indices(x, y, 500)) == 500
+
+
+def test_short_series_are_untouched():
+    y = np.arange(10.0)
+    np.testing.assert_array_equal(decimate_indices(y, y, 100), np.arange(10))
+    np.testing.assert_array_equal(decimate_indices(y, y, None), np.arange(10))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        decimate_indices(np.arange(10.0), np.arange(10.0), 4, 'random')
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_incremental_bounded_and_split_independent(series, method):
+    x, y = series
+    whole = IncrementalDecimator(1000, method).update(x, y)
+    stepped = IncrementalDecimator(1000, method)
+    step = 1 if method == 'minmax' else 149  # an lttb pass costs ~max_points Python steps
+    for end in list(range(1, 3000, step)) + list(range(3000, len(y), 997 * step)) + [len(y)]:
+        idx = stepped.update(x[:end], y[:end])
+        assert len(idx) <= max(end, 1000)
+    np.testing.assert_array_equal(idx, whole)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1 and np.all(np.diff(idx) > 0)
+
+
+def test_incremental_minmax_keeps_extremes(series):
+    x, y = series
+    y = y.copy()
+    y[50_000:50_100] = np.nan
+    decimator = IncrementalDecimator(500)
+    for end in range(0, len(y) + 4001, 4000):
+        idx = decimator.update(x[:end], y[:end])
+    assert {12_345, 77_777} <= set(idx.tolist())
+    assert np.nanmin(y[idx]) == np.nanmin(y) and np.nanmax(y[idx]) == np.nanmax(y)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from utils.kde import BinnedKDE
+
+stats = pytest.importorskip('scipy.stats')
+
+
+@pytest.mark.parametrize('batch', [10_000, 37])
+def test_matches_gaussian_kde(batch):
+    rng = np.random.default_rng(3)
+    temps = np.concatenate([rng.normal(75, 1.5, 7000), rng.normal(80, 0.5, 3000)])  # two modes
+    kde = BinnedKDE()
+    for i in range(0, len(temps), batch):
+        kde.add(temps[i:i + batch])
+    reference = stats.gaussian_kde(temps)
+    assert kde.bandwidth() == pytest.approx(reference.factor * temps.std(ddof=1), rel=1e-9)
+    x, density = kde.evaluate()
+    assert x[0] >= temps.min() and x[-1] <= temps.max()
+    expected = reference(x)
+    assert np.max(np.abs(density - expected)) < 0.01 * expected.max()
+
+
+def test_needs_two_distinct_readings():
+    kde = BinnedKDE()
+    kde.add([75.0, 75.0, np.nan])
+    with pytest.raises(ValueError):
+        kde.evaluate()
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from utils.metrics import LatencyHistogram, Metrics
+
+
+def test_percentiles_within_a_bucket():
+    latencies = np.random.default_rng(4).lognormal(np.log(2e-3), 1.0, 10_000)
+    hist = LatencyHistogram()
+    for seconds in latencies:
+        hist.add(seconds)
+    for q in (50, 99):
+        exact = np.percentile(latencies, q)
+        assert exact <= hist.percentile(q) <= exact * 10 ** (1 / 20) * 1.001  # one bucket: ~12%
+    assert hist.max == latencies.max()
+    assert hist.snapshot()['mean'] == pytest.approx(latencies.mean())
+
+
+def test_reports_and_export(tmp_path):
+    lines = []
+    export = tmp_path / 'log.metrics.jsonl'
+    metrics = Metrics('L23', interval=10, export_file=str(export), out=lines.append)
+    metrics.record('parse', 0.001)
+    metrics.record('parse', 0.003)
+    metrics.add_samples(50)
+    metrics.counter('malformed', 2)
+    metrics.gauge('queue_depth', 1)
+    metrics.maybe_report(now=metrics._start + 5)  # not due yet
+    metrics.maybe_report(now=metrics._start + 10)
+    metrics.record('parse', 0.002)
+    metrics.add_samples(25)
+    metrics.counter('malformed', 3)
+    metrics.close()
+
+    assert len(lines) == 2
+    assert lines[0].startswith('[METRICS] L23: 50 samples in 10.0 s (5.0/s, total 50)')
+    assert 'parse p50 ' in lines[0] and 'max 3.00ms' in lines[0] and 'malformed +2' in lines[0]
+    assert lines[1].startswith('[METRICS FINAL] L23: 75 samples') and 'malformed 3' in lines[1]
+    first, final = [json.loads(line) for line in export.read_text().splitlines()]
+    assert first['samples'] == 50 and first['stages']['parse']['count'] == 2 and not first['final']
+    assert final['final'] and final['samples'] == 25 and final['total']['stages']['parse']['count'] == 3
+    assert final['counters'] == {'malformed': 3} and final['gauges'] == {'queue_depth': 1}
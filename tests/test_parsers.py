@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from utils.parsers import LineDecoder, get_parser, sample_lines
+
+
+@pytest.mark.parametrize('name', ['L23', 'L12', 'ADS1115'])
+def test_batch_matches_per_line(name):
+    lines = sample_lines(name, 500, malformed=0.05, seed=1)
+    parser = get_parser(name)
+    cols, bad = parser.parse_batch(lines)
+    rows = [parser.parse_line(line) for line in lines]
+    good = [row for row in rows if row is not None]
+    assert bad == len(rows) - len(good) > 0
+    for i, col in enumerate(cols):
+        np.testing.assert_array_equal(cols[col], np.array([row[i] for row in good], dtype=cols[col].dtype))
+
+
+def test_formats():
+    cols, bad = get_parser('L23').parse_batch([b'0.50,82.3\r', b' 1.00 , 82.4 '])
+    assert bad == 0
+    np.testing.assert_array_equal(cols['temperature_F'], [82.3, 82.4])
+    cols, _ = get_parser('L12').parse_batch([b'T = 23.0 C, H = 51.0 %'])
+    assert cols['temperature_C'][0] == 23.0 and cols['humidity'][0] == 51.0
+    cols, _ = get_parser('ADS1115').parse_batch([b'AIN0: -32768\tVoltage: 1.0', b'AIN0: 32767\tVoltage: 1.0'])
+    np.testing.assert_array_equal(cols['adc'], [-32768, 32767])
+
+
+def test_blank_lines_not_counted():
+    parser = get_parser('L23')
+    cols, bad = parser.parse_batch([b'', b'0.5,80.0', b''])
+    assert bad == 0 and parser.malformed == 0 and len(cols['temperature_F']) == 1
+
+
+@pytest.mark.parametrize('name, line', [
+    ('L23', b'1 2,3'),  # space inside a number
+    ('L23', b'0.5,80.1,3'),
+    ('L12', b'T = 2 3.0 C, H = 51.0 %'),
+    ('ADS1115', b'AIN0: 1.5\tVoltage: 2'),  # not an integer
+    ('ADS1115', b'AIN0: 99999\tVoltage: 1.0'),  # doesn't fit int16
+    ('ADS1115', b'AIN0: -32769\tVoltage: 1.0'),
+])
+def test_corrupt_lines_rejected(name, line):
+    parser = get_parser(name)
+    valid = sample_lines(name, 3)
+    cols, bad = parser.parse_batch([valid[0], line, valid[1]])
+    assert bad == 1 and parser.malformed == 1 and parser.parsed == 2
+    expected, _ = get_parser(name).parse_batch(valid[:2])
+    for col in cols:
+        np.testing.assert_array_equal(cols[col], expected[col])
+    assert get_parser(name).parse_line(line) is None
+
+
+def test_line_decoder_splits_chunks():
+    decoder = LineDecoder(get_parser('L23'))
+    assert len(decoder.feed(b'partial\n0.5,80')['temperature_F']) == 0
+    cols = decoder.feed(b'.0\n1.0,81.0\n')
+    np.testing.assert_array_equal(cols['temperature_F'], [80.0, 81.0])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils.parsers import get_parser
+from utils.pipeline import CSVSink, Pipeline
+
+
+def test_l12_csv_keeps_the_printed_digits(tmp_path):
+    # float32 columns would come out as 23.100000381469727
+    cols, bad = get_parser('L12').parse_batch([b'T = 23.1 C, H = 45.3 %', b'T = 0.1 C, H = 99.9 %'])
+    assert bad == 0
+    path = tmp_path / 'datalog.csv'
+    sink = CSVSink(str(path), 'L12', fsync='never')
+    sink.write(np.full(2, sink.start_ns, dtype=np.int64), dict(cols, elapsed_min=np.array([0.0, 0.5])))
+    sink.close()
+    lines = path.read_text().splitlines()
+    assert lines[0] == 'timestamp,elapsed_time_min,temperature_degC,humidity_percent'
+    assert [line.split(',', 1)[1] for line in lines[1:]] == ['0.0,23.1,45.3', '0.5,0.1,99.9']
+
+
+class ListSink:
+    name = 'list'
+
+    def __init__(self, fail=False):
+        self.rows, self.closed, self.fail = [], False, fail
+
+    def write(self, t_ns, columns):
+        self.rows += columns['x'].tolist()
+
+    def close(self):
+        self.closed = True
+        if self.fail:
+            raise OSError(28, "No space left on device")
+
+
+def test_every_sink_is_closed_when_one_fails():
+    sinks = [ListSink(fail=True), ListSink()]
+    source = (batch for batch in [(np.arange(3), {'x': np.arange(3.0)})])
+    with pytest.raises(OSError):
+        Pipeline(source, sinks=sinks).run()
+    assert all(sink.closed for sink in sinks)
+    assert sinks[1].rows == [0.0, 1.0, 2.0]
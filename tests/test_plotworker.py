@@ -0,0 +1,33 @@
+import threading
+
+from utils.plotworker import PlotWorker
+
+
+def test_slow_plots_only_render_the_latest_snapshot():
+    started, release = threading.Event(), threading.Event()
+    rendered = []
+
+    def plot(i):
+        rendered.append(i)
+        started.set()
+        release.wait(5)  # a slow render
+
+    worker = PlotWorker(plot)
+    worker.submit(0)
+    assert started.wait(5)
+    for i in range(1, 10):  # never blocks while the render runs
+        worker.submit(i)
+    release.set()
+    worker.close()
+    assert rendered == [0, 9]
+    assert (worker.submitted, worker.rendered, worker.dropped, worker.errors) == (10, 2, 8, 0)
+
+
+def test_errors_are_counted_not_raised():
+    def plot():
+        raise ValueError("bad data")
+
+    worker = PlotWorker(plot)
+    worker.submit()
+    worker.close()
+    assert worker.errors == 1 and worker.rendered == 0
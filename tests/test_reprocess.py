@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from utils.pipeline import ADSSink
+from utils.reprocess import reprocess
+from utils.thermistor import R_therm_to_temps, voltage_to_R_therm
+
+
+@pytest.fixture
+def run(tmp_path):
+    # An archived ADS1115 run, as the logger writes it
+    csv_file = str(tmp_path / 'thermistor_data.csv')
+    n = 500
+    sink = ADSSink(csv_file, fsync='never')
+    sink.write(np.arange(n, dtype=np.int64) * 1_000_000_000,
+               {'elapsed_min': np.arange(n) / 60.0, 'adc': np.linspace(10_000, 16_000, n).astype(np.int16)})
+    sink.close()
+    return csv_file
+
+
+def process(tmp_path, files, **kwargs):
+    kwargs = dict(out_dir=str(tmp_path / 'out'), plot=False, jobs=1, cache_file=str(tmp_path / 'cache.json'), **kwargs)
+    return reprocess(files, **kwargs)
+
+
+def test_recomputes_with_new_constants(tmp_path, run):
+    [result] = process(tmp_path, [run], constants={'BETA': 3500.0})
+    assert result['status'] == 'done' and result['rows'] == 500
+    before, after = pd.read_csv(run), pd.read_csv(result['outputs'][0])
+    assert list(after.columns) == list(before.columns)
+    kept = ['Elapsed Time (min)', 'Date', 'Voltage (V)']
+    pd.testing.assert_frame_equal(after[kept], before[kept])
+    # from the stored (rounded) voltage, with the new BETA
+    R_therm = voltage_to_R_therm(before['Voltage (V)'].to_numpy())
+    np.testing.assert_allclose(after['Temp_Beta (K)'], R_therm_to_temps(R_therm, beta=3500.0)[3], atol=0.006)
+    np.testing.assert_allclose(after['Temp_SH (K)'], before['Temp_SH (K)'], atol=0.1 + 1e-9)  # 1 decimal in the CSV
+    assert np.abs(after['Temp_Beta (K)'] - before['Temp_Beta (K)']).max() > 1.0
+
+
+def test_cache_skips_unchanged_files(tmp_path, run):
+    assert process(tmp_path, [run])[0]['status'] == 'done'
+    assert process(tmp_path, [run])[0]['status'] == 'skipped'
+    assert process(tmp_path, [run], constants={'BETA': 3977.0})[0]['status'] == 'done'
+    assert process(tmp_path, [run], constants={'BETA': 3977.0}, force=True)[0]['status'] == 'done'
+    with open(run, 'a') as f:
+        f.write(open(run).read().splitlines()[-1] + '\n')
+    assert process(tmp_path, [run], constants={'BETA': 3977.0})[0]['status'] == 'done'
+
+
+def test_bad_files_fail_alone(tmp_path, run):
+    other = tmp_path / 'temp_log.csv'
+    other.write_text('timestamp,elapsed_min,temperature_F\n2024-01-01 00:00:00,0.0,75.0\n')
+    results = {r['file']: r for r in process(tmp_path, [run, str(other)])}
+    assert results[run]['status'] == 'done'
+    assert results[str(other)]['status'] == 'failed' and 'L23' in results[str(other)]['error']
+    assert not (tmp_path / 'out' / 'temp_log.csv').exists()
+
+
+def test_unknown_source(tmp_path, run):
+    with pytest.raises(ValueError):
+        process(tmp_path, [run], source='adc')
+
+
+def test_same_names_in_different_runs(tmp_path, run):
+    other = tmp_path / 'run2' / 'thermistor_data.csv'
+    other.parent.mkdir()
+    other.write_text(open(run).read())
+    results = process(tmp_path, [run, str(other)])
+    outputs = sorted(r['outputs'][0] for r in results)
+    assert outputs == [str(tmp_path / 'out' / 'run2' / 'thermistor_data.csv'),
+                       str(tmp_path / 'out' / 'thermistor_data.csv')]
+    assert all(r['status'] == 'done' for r in results)
+    with pytest.raises(ValueError):
+        process(tmp_path, [run, run])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utils.samplestore import GrowingArray, SampleStore
+
+
+def store(tmp_path, **kwargs):
+    return SampleStore({'x': np.float64}, stats=('x',), spill_dir=str(tmp_path / 'spill'), **kwargs)
+
+
+def test_growing_array():
+    arr = GrowingArray(capacity=2)
+    for i in range(5):
+        arr.append(i)
+    arr.extend([5, 6])
+    arr.drop_front(3)
+    np.testing.assert_array_equal(arr.values, [3, 4, 5, 6])
+
+
+def test_max_rows_bounds_memory_and_spills_the_rest(tmp_path):
+    s = store(tmp_path, max_rows=1000)
+    x = np.arange(10_000, dtype=np.float64)
+    for i in range(0, len(x), 7):
+        s.extend(np.arange(i, min(i + 7, len(x))), x=x[i:i + 7])
+        assert s.in_memory <= 1000
+    assert len(s) == 10_000 and s.first + s.in_memory == 10_000
+    assert len(s.spilled) == s.first // s.chunk_rows > 0
+    chunks = list(s.iter_chunks())
+    np.testing.assert_array_equal(np.concatenate([c['x'] for c in chunks]), x)
+    np.testing.assert_array_equal(np.concatenate([c['t_ns'] for c in chunks]), np.arange(10_000))
+    assert s.stats['x'].n == 10_000 and s.stats['x'].mean == pytest.approx(x.mean())
+
+
+def test_one_row_in_memory(tmp_path):
+    s = store(tmp_path, max_rows=1)
+    assert s.chunk_rows == 1
+    for i in range(5):
+        s.append(i, x=float(i))
+    s.extend(np.arange(5, 8), x=np.arange(5.0, 8.0))
+    assert s.in_memory == 1 and len(s.spilled) == 7
+    np.testing.assert_array_equal(np.concatenate([c['x'] for c in s.iter_chunks()]), np.arange(8.0))
+
+
+def test_chunk_rows_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        store(tmp_path, max_rows=10, chunk_rows=0)
@@ -0,0 +1,60 @@
+import pytest
+
+from utils import scheduler
+from utils.scheduler import DeadlineScheduler
+
+MS = 1_000_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A virtual monotonic clock: sleep() and busy-waiting advance it
+    now = [0]
+
+    def monotonic_ns():
+        now[0] += 1000  # each read costs 1 us, so spinning terminates
+        return now[0]
+
+    def sleep(seconds):
+        now[0] += int(seconds * 1e9)
+
+    monkeypatch.setattr(scheduler.time, 'monotonic_ns', monotonic_ns)
+    monkeypatch.setattr(scheduler.time, 'sleep', sleep)
+    return now
+
+
+def test_work_between_waits_does_not_drift(clock):
+    sched = DeadlineScheduler(0.010)
+    for _ in range(100):
+        sched.wait()
+        clock[0] += 3 * MS  # work that a sleep(interval) loop would add up
+    sched.wait()
+    # the 101st deadline is at 1.000 s, not 100 * 13 ms
+    assert clock[0] - sched._t0 == pytest.approx(1000 * MS, abs=0.05 * MS)
+    assert sched.missed == 0 and sched.max_lateness < 0.0001
+
+
+def test_missed_deadlines_are_skipped(clock):
+    sched = DeadlineScheduler(0.010)
+    assert [sched.wait() for _ in range(3)] == [0, 1, 2]
+    clock[0] += 35 * MS  # a stall: now 55 ms, deadline 3 was at 30 ms
+    assert sched.wait() == 5  # deadlines 3 and 4 skipped, 5 (50 ms) served late
+    assert sched.missed == 2
+    assert sched.wait() == 6 and clock[0] - sched._t0 == pytest.approx(60 * MS, abs=0.01 * MS)
+
+
+def test_missed_deadlines_caught_up(clock):
+    sched = DeadlineScheduler(0.010, skip_missed=False)
+    sched.wait()
+    clock[0] += 35 * MS
+    start = clock[0]
+    assert [sched.wait() for _ in range(3)] == [1, 2, 3]  # 10, 20 and 30 ms, all past
+    assert clock[0] - start < 0.1 * MS  # taken back to back
+    assert sched.missed == 0 and sched.max_lateness == pytest.approx(0.025, abs=1e-4)
+
+
+def test_burst(clock):
+    sched = DeadlineScheduler(0.001)
+    t_ns, values = sched.burst(iter(range(5)).__next__, 5, dtype=int)
+    assert values.tolist() == [0, 1, 2, 3, 4] and len(t_ns) == 5
+    assert sched.ticks == 5
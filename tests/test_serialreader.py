@@ -0,0 +1,59 @@
+import pytest
+
+from utils.serialreader import SerialReader, wait_for_line
+
+
+class FakeSerial:
+    # Hands out `data` a few bytes per read(), then fails like an unplugged port
+    def __init__(self, data, chunk=8):
+        self.data = data
+        self.chunk = chunk
+
+    @property
+    def in_waiting(self):
+        return len(self.data)
+
+    def read(self, n):
+        if not self.data:
+            raise OSError("unplugged")
+        out, self.data = self.data[:min(n, self.chunk)], self.data[min(n, self.chunk):]
+        return out
+
+
+def drain(reader):
+    lines = []
+    with pytest.raises(EOFError):
+        while True:
+            lines += reader.get_batch(timeout=1.0)
+    return lines
+
+
+def test_lines_split_across_reads():
+    data = b''.join(b'%d,75.0\r\n' % i for i in range(50))
+    reader = SerialReader(FakeSerial(data)).start(initial=b'')
+    lines = drain(reader)
+    assert lines == [b'%d,75.0' % i for i in range(50)]
+    assert reader.lines == 50 and reader.overruns == 0
+    assert isinstance(reader.error, OSError)
+
+
+def test_end_marker_does_not_block_on_full_queue():
+    # nobody consumes while the thread runs: the queue fills up, and the end
+    # marker must still get in (the oldest batch is dropped and counted)
+    reader = SerialReader(FakeSerial(b''.join(b'%d,1\n' % i for i in range(100))), max_batches=4).start()
+    reader._thread.join(timeout=2.0)
+    assert not reader._thread.is_alive()
+    lines = drain(reader)
+    assert len(lines) + reader.dropped_lines == 100 and reader.dropped_lines > 0
+
+
+def test_byte_buffer_overrun_counted():
+    reader = SerialReader(FakeSerial(b'x' * 100 + b'\n1,2\n'), buffer_size=16).start()
+    lines = drain(reader)
+    assert lines[-1] == b'1,2' and reader.dropped_bytes > 0
+
+
+def test_wait_for_line_skips_partial_and_noise():
+    ser = FakeSerial(b'5,7\n\x00garbage\n0.50,82.3\n0.52,82.4\n')
+    rest = wait_for_line(ser, lambda line: line.count(b',') == 1 and b'garbage' not in line, timeout=1.0)
+    assert rest.startswith(b'0.50,82.3\n')
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.stats import RunningStats, cumulative_mean_std, rolling_mean_std
+
+
+@pytest.fixture
+def readings():
+    return np.random.default_rng(1).normal(300.0, 0.5, 1000)  # ~300 K: precision matters
+
+
+def test_update_and_extend_match_numpy(readings):
+    one, block = RunningStats(), RunningStats()
+    for x in readings:
+        one.update(x)
+    for i in range(0, len(readings), 37):
+        block.extend(readings[i:i + 37])
+    for stats in (one, block):
+        assert stats.n == len(readings)
+        assert stats.mean == pytest.approx(readings.mean(), rel=1e-12)
+        assert stats.std == pytest.approx(readings.std(), rel=1e-9)
+
+
+def test_nan_is_ignored():
+    stats = RunningStats()
+    stats.extend([1.0, np.nan, 3.0])
+    stats.update(float('nan'))
+    assert (stats.n, stats.mean, stats.std) == (2, 2.0, 1.0)
+
+
+def test_window(readings):
+    stats = RunningStats(window=50)
+    stats.extend(readings)
+    assert stats.n == 50
+    assert stats.mean == pytest.approx(readings[-50:].mean(), rel=1e-12)
+    assert stats.std == pytest.approx(readings[-50:].std(), rel=1e-6)
+
+
+def test_cumulative_mean_std(readings):
+    mean, std = cumulative_mean_std(readings)
+    for i in (0, 1, 10, 999):
+        assert mean[i] == pytest.approx(readings[:i + 1].mean(), rel=1e-12)
+        assert std[i] == pytest.approx(readings[:i + 1].std(), rel=1e-6, abs=1e-9)
+
+
+def test_rolling_mean_std_matches_running_window(readings):
+    mean, std = rolling_mean_std(readings, 20)
+    stats = RunningStats(window=20)
+    for i, x in enumerate(readings[:100]):
+        stats.update(x)
+        assert mean[i] == pytest.approx(stats.mean, rel=1e-12)
+        assert std[i] == pytest.approx(stats.std, rel=1e-6, abs=1e-9)
+
+
+def test_empty():
+    assert RunningStats().std == 0.0
+    assert all(a.size == 0 for a in cumulative_mean_std([]) + rolling_mean_std([], 5))
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('serial')
+pty = pytest.importorskip('pty')
+
+from utils.control import send
+from utils.supervisor import DEVICE_KINDS, Device, Supervisor
+
+
+def test_control_socket_stats_and_stop(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.control.WATCH_INTERVAL', 0.05)
+    master, slave = pty.openpty()
+    make_decoder, make_sink, _ = DEVICE_KINDS['L23']
+    csv_file = tmp_path / 'l23.csv'
+    device = Device('L23@pty', os.ttyname(slave), make_decoder, make_sink(str(csv_file)))
+    path = str(tmp_path / 'supervisor.ctl')
+    replies = {}
+
+    def board_and_client():
+        deadline = time.monotonic() + 5
+        sent = False
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            if not os.path.exists(path):
+                continue
+            counts = send(path, ['stats'])['devices']['L23@pty']
+            if counts['state'] == 'up' and not sent:  # opening the port flushes its input
+                # the bytes up to the first newline count as a partial line and are dropped
+                os.write(master, b'75.0\n' + b''.join(b'%.2f,%.1f\n' % (i / 30, 75.0) for i in range(20)))
+                sent = True
+            elif counts['samples'] >= 20:
+                break
+        replies['stats'] = send(path, ['stats'])
+        replies['set'] = send(path, ['set', 'status_interval', '0.5'])
+        replies['stop'] = send(path, ['stop'])
+
+    thread = threading.Thread(target=board_and_client)
+    thread.start()
+    asyncio.run(asyncio.wait_for(Supervisor([device], status_interval=30, control_socket=path).run(), 10))
+    thread.join()
+    os.close(master)
+    os.close(slave)
+
+    assert replies['stats']['devices']['L23@pty'] == {'state': 'up', 'samples': 20, 'malformed': 0, 'reconnects': 0}
+    assert replies['set'] == {'ok': False, 'error': 'status_interval must be at least 1.0'}
+    assert replies['stop']['ok']
+    assert not os.path.exists(path)
+    assert len(csv_file.read_text().splitlines()) == 21
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils import thermistor
+from utils.thermistor import CONVERTED_COLUMNS, convert_batch, convert_lut, get_lut, lut_filename
+
+
+def convert_one(adc):
+    # The per-sample math of the original logger
+    voltage = adc * thermistor.ADC_LSB_MV / 1000.0
+    R = thermistor.R_FIXED * voltage / (thermistor.Vcc - voltage)
+    logR = math.log(R)
+    sh = 1.0 / (thermistor.A + thermistor.B * logR + thermistor.C * logR**3)
+    beta = 1.0 / (1.0 / thermistor.T0 + math.log(R / thermistor.R0) / thermistor.BETA)
+    return [voltage, R, sh, sh * 9 / 5 - 459.67, sh - 273.15, beta, beta * 9 / 5 - 459.67, beta - 273.15]
+
+
+def test_batch_matches_per_sample_math():
+    codes = np.array([1000, 8000, 13333, 20000, 26000])
+    converted = convert_batch(codes)
+    for k, code in enumerate(codes):
+        expected = convert_one(int(code))
+        assert [converted[col][k] for col in CONVERTED_COLUMNS] == pytest.approx(expected, rel=1e-12)
+
+
+def test_beta_is_t0_at_r0():
+    # half the supply across the thermistor: R_therm == R_FIXED == R0
+    code = thermistor.Vcc / 2 * 1000 / thermistor.ADC_LSB_MV
+    converted = convert_batch([code])
+    assert converted['R_therm (Ohms)'][0] == pytest.approx(thermistor.R0)
+    assert converted['Temp_Beta (K)'][0] == pytest.approx(thermistor.T0)
+
+
+def test_out_of_range_codes_are_nan():
+    converted = convert_batch([-5, 0, 32767])  # negative, 0 V, above Vcc (open thermistor)
+    assert np.isnan(converted['Temp_SH (K)']).all()
+    assert np.isinf(converted['R_therm (Ohms)'][2])
+
+
+def test_lut_matches_batch():
+    codes = np.arange(thermistor.ADC_MIN, thermistor.ADC_MAX + 1, 7, dtype=np.int16)
+    batch, lut = convert_batch(codes), convert_lut(codes)
+    for col in CONVERTED_COLUMNS:
+        np.testing.assert_array_equal(lut[col], batch[col])
+
+
+def test_lut_cache_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(thermistor, '_lut_tables', {})
+    table = get_lut(beta=3977.0, cache_dir=str(tmp_path))
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+    monkeypatch.setattr(thermistor, '_lut_tables', {})
+    np.testing.assert_array_equal(get_lut(beta=3977.0, cache_dir=str(tmp_path)), table)
+    assert str(files[0]) != lut_filename(str(tmp_path), thermistor._lut_key(
+        thermistor.R_FIXED, thermistor.Vcc, thermistor.A, thermistor.B, thermistor.C,
+        thermistor.R0, thermistor.T0, thermistor.BETA))  # other constants, other file
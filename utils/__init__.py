@@ -0,0 +1,5 @@
+# utils
+#
+# Shared helpers for the logger scripts (L12_DH11, L23, ADS115_thermistor).
+# The scripts live in their own folders, so each one puts the repo root on
+# sys.path before importing from here.
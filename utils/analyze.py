@@ -0,0 +1,323 @@
+# analyze.py
+#
+# Offline analysis of the loggers' CSV files (any of the three layouts, see
+# utils/schemas.py) in constant memory, however long the log:
+#
+#   python -m utils.analyze L23/temp_log.csv
+#   python -m utils.analyze L12_DH11/datalog.csv --intervals hour --window 120 --z 5
+#
+# The file is read --chunk-rows rows at a time, and each chunk updates, per
+# value column:
+#   - summary stats: count, non-finite count, mean/std (merged per chunk,
+#     exact), min/max
+#   - minute / hour aggregates (count, mean, min, max) of the wall-clock date;
+#     only the current interval is held, finished ones are appended to
+#     <name>.<minute|hour>.csv
+#   - rolling mean/std over the last --window readings (the window is carried
+#     from chunk to chunk) and outliers: readings more than --z rolling stds
+#     away from the mean of the window before them
+#   - a min/max decimated copy of the series (at most --max-points points)
+#     for the plot, <name>.analysis.png
+# and the results go to <name>.summary.json.
+#
+# ADS1115 rows whose Temp_SH (C) isn't above 0 (open or shorted thermistor)
+# are counted and skipped, the same filter the ADS plot uses.
+
+import json
+import os
+import time
+
+import numpy as np
+
+from utils.schemas import SCHEMAS, detect_schema
+from utils.stats import RunningStats, rolling_mean_std
+
+INTERVALS = {'minute': 60, 'hour': 3600}
+ELAPSED_COLUMNS = ('elapsed_min', 'elapsed_time_min', 'Elapsed Time (min)')
+PLOT_COLUMNS = {
+    'L23': ['temperature_F'],
+    'L12': ['temperature_degC', 'humidity_percent'],
+    'ADS1115': ['Temp_SH (C)', 'Temp_Beta (C)', 'Voltage (V)'],
+}
+VALID_ABOVE = {'ADS1115': ('Temp_SH (C)', 0.0)}  # rows where this column isn't above the value are dropped
+MIN_PERIODS = 10  # readings in the window before outliers are looked for
+FLAT = 1e-7  # rolling std / |mean| below which a window counts as flat
+
+
+class ColumnSummary:
+    # Summary stats, rolling stats and outliers of one column, a chunk at a time
+    def __init__(self, window=60, z=4.0):
+        self.window = window
+        self.z = z
+        self.stats = RunningStats()
+        self.non_finite = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.outliers = 0
+        self.max_z = 0.0
+        self.rolling_std_max = 0.0
+        self._rolling_std_sum = 0.0
+        self._carry = np.empty(0)  # the last `window` readings of the previous chunks
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        self.non_finite += int(np.count_nonzero(~finite))
+        x = values[finite]
+        if not x.size:
+            return
+        self.stats.extend(x)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+
+        full = np.concatenate([self._carry, x])
+        mean, std = rolling_mean_std(full, self.window)
+        new = slice(len(self._carry), None)
+        self._rolling_std_sum += float(std[new].sum())
+        self.rolling_std_max = max(self.rolling_std_max, float(std[new].max()))
+        # each new reading against the window just before it
+        prev = np.arange(len(self._carry), len(full)) - 1
+        ok = prev >= 0
+        prev_mean, prev_std = mean[prev[ok]], std[prev[ok]]
+        filled = np.minimum(prev[ok] + 1, self.window) >= MIN_PERIODS
+        # a flat window has no spread to compare against (below FLAT its std is rounding noise)
+        spread = prev_std > FLAT * np.maximum(np.abs(prev_mean), 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where(filled & spread, np.abs(full[new][ok] - prev_mean) / prev_std, 0.0)
+        self.outliers += int(np.count_nonzero(score > self.z))
+        if score.size:
+            self.max_z = max(self.max_z, float(score.max()))
+        self._carry = full[-self.window:]
+
+    def result(self):
+        n = self.stats.n
+        return {'count': n, 'non_finite': self.non_finite,
+                'mean': self.stats.mean if n else None, 'std': self.stats.std if n else None,
+                'min': self.min if n else None, 'max': self.max if n else None,
+                'rolling_std_mean': self._rolling_std_sum / n if n else None,
+                'rolling_std_max': self.rolling_std_max if n else None,
+                'outliers': self.outliers, 'max_z': round(self.max_z, 3)}
+
+
+def _groups(keys):
+    # Start of every run of equal keys
+    return np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+
+
+class IntervalAggregates:
+    # count/mean/min/max of each column per wall-clock interval, written to a
+    # CSV as soon as the interval is over (a clock step back starts a new row)
+    def __init__(self, filename, seconds, columns):
+        self.filename = filename
+        self.seconds = seconds
+        self.columns = columns
+        self.rows_written = 0
+        self._open = None  # (key, rows, [count, sum, min, max]) of the current interval, as length-1 arrays
+        self._file = open(filename, 'w', newline='')
+        self._file.write(','.join(['interval_start', 'rows'] + [f'{col} {agg}' for col in columns
+                                                                 for agg in ('count', 'mean', 'min', 'max')]) + '\n')
+
+    def add(self, t_ns, values):
+        # t_ns: local wall-clock ns (NaT rows already dropped); values: [column arrays]
+        if not len(t_ns):
+            return
+        keys = t_ns // (self.seconds * 1_000_000_000)
+        starts = _groups(keys)
+        keys = keys[starts]
+        rows = np.diff(np.append(starts, len(t_ns)))
+        finite = [np.isfinite(v) for v in values]
+        aggs = [np.array([np.add.reduceat(f.astype(np.int64), starts) for f in finite]),
+                np.array([np.add.reduceat(np.where(f, v, 0.0), starts) for v, f in zip(values, finite)]),
+                np.array([np.minimum.reduceat(np.where(f, v, np.inf), starts) for v, f in zip(values, finite)]),
+                np.array([np.maximum.reduceat(np.where(f, v, -np.inf), starts) for v, f in zip(values, finite)])]
+        if self._open is not None:
+            key, open_rows, open_aggs = self._open
+            if key[0] == keys[0]:  # the open interval goes on in this chunk
+                rows[0] += open_rows[0]
+                for a, merge, o in zip(aggs, (np.add, np.add, np.minimum, np.maximum), open_aggs):
+                    a[:, 0] = merge(a[:, 0], o[:, 0])
+            else:
+                keys, rows = np.concatenate([key, keys]), np.concatenate([open_rows, rows])
+                aggs = [np.concatenate([o, a], axis=1) for o, a in zip(open_aggs, aggs)]
+        self._write(keys[:-1], rows[:-1], [a[:, :-1] for a in aggs])
+        self._open = (keys[-1:], rows[-1:], [a[:, -1:] for a in aggs])
+
+    def _write(self, keys, rows, aggs):
+        import pandas as pd
+
+        if not len(keys):
+            return
+        count, total, low, high = aggs
+        empty = count == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(empty, np.nan, total / count)
+        low, high = np.where(empty, np.nan, low), np.where(empty, np.nan, high)
+        table = {'interval_start': np.datetime_as_string((keys * self.seconds).astype('datetime64[s]')), 'rows': rows}
+        for j in range(len(self.columns)):
+            table.update({(j, 'count'): count[j], (j, 'mean'): mean[j], (j, 'min'): low[j], (j, 'max'): high[j]})
+        frame = pd.DataFrame(table)
+        frame['interval_start'] = frame['interval_start'].str.replace('T', ' ')
+        frame.to_csv(self._file, header=False, index=False, float_format='%.6g')
+        self.rows_written += len(keys)
+
+    def close(self):
+        if self._open is not None:
+            self._write(*self._open)
+            self._open = None
+        self._file.close()
+
+
+class MinMaxReservoir:
+    # Min and max of buckets of consecutive readings, at most max_points in
+    # all: when there are too many buckets, neighbours are merged and the
+    # bucket width doubles, so the kept points always span the whole series
+    def __init__(self, max_points=2000):
+        self.n_buckets = max(max_points // 2, 1)
+        self.width = 1
+        self.seen = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._min = (np.empty(0, dtype=np.int64), np.empty(0))  # (x, y) per bucket
+        self._max = (np.empty(0, dtype=np.int64), np.empty(0))
+
+    @staticmethod
+    def _reduce(ids, xmin, ymin, xmax, ymax):
+        # One (min, max) pair per run of equal (sorted) ids
+        starts = _groups(ids)
+        ends = np.append(starts[1:], len(ids)) - 1
+        lo = np.lexsort((ymin, ids))[starts]  # smallest y first within each id
+        hi = np.lexsort((ymax, ids))[ends]  # largest y last
+        return ids[starts], (xmin[lo], ymin[lo]), (xmax[hi], ymax[hi])
+
+    def add(self, x, y):
+        if not len(y):
+            return
+        ids = (self.seen + np.arange(len(y))) // self.width
+        self.seen += len(y)
+        ids = np.concatenate([self._ids, ids])
+        xmin, ymin = np.concatenate([self._min[0], x]), np.concatenate([self._min[1], y])
+        xmax, ymax = np.concatenate([self._max[0], x]), np.concatenate([self._max[1], y])
+        self._ids, self._min, self._max = self._reduce(ids, xmin, ymin, xmax, ymax)
+        while len(self._ids) > self.n_buckets:
+            self.width *= 2
+            self._ids, self._min, self._max = self._reduce(self._ids // 2, *self._min, *self._max)
+
+    def points(self):
+        x = np.concatenate([self._min[0], self._max[0]])
+        y = np.concatenate([self._min[1], self._max[1]])
+        order = np.argsort(x, kind='stable')
+        return x[order], y[order]
+
+
+def read_chunks(csv_file, chunk_rows):
+    # (schema, DataFrame chunks) of a logger CSV
+    import pandas as pd  # only the analysis needs it
+
+    with open(csv_file, newline='') as f:
+        schema = detect_schema(f.readline().rstrip('\r\n').split(','))
+    return schema, pd.read_csv(csv_file, chunksize=chunk_rows, skipinitialspace=True)
+
+
+def analyze(csv_file, out_dir=None, chunk_rows=100_000, intervals=('minute', 'hour'), window=60, z=4.0,
+            max_points=2000, plot=True):
+    import pandas as pd
+
+    start = time.perf_counter()
+    schema, chunks = read_chunks(csv_file, chunk_rows)
+    time_col = SCHEMAS[schema]['time']
+    columns = [c for c in SCHEMAS[schema]['columns'] if c not in ELAPSED_COLUMNS]
+    base = os.path.join(out_dir or os.path.dirname(csv_file) or '.', os.path.splitext(os.path.basename(csv_file))[0])
+
+    summaries = {col: ColumnSummary(window, z) for col in columns}
+    aggregates = {name: IntervalAggregates(f'{base}.{name}.csv', INTERVALS[name], columns) for name in intervals}
+    reservoirs = {col: MinMaxReservoir(max_points) for col in PLOT_COLUMNS[schema]} if plot else {}
+    rows = invalid = undated = n_chunks = 0
+    first_t = last_t = None
+
+    for df in chunks:
+        n_chunks += 1
+        rows += len(df)
+        if schema in VALID_ABOVE:
+            col, limit = VALID_ABOVE[schema]
+            valid = pd.to_numeric(df[col], errors='coerce').to_numpy() > limit
+            invalid += int(np.count_nonzero(~valid))
+            df = df[valid]
+        t = pd.to_datetime(df[time_col], format=SCHEMAS[schema]['time_format'], errors='coerce')
+        dated = t.notna().to_numpy()
+        undated += int(np.count_nonzero(~dated))
+        t_ns = t.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        if dated.any():
+            first_t = t_ns[dated][0] if first_t is None else first_t
+            last_t = t_ns[dated][-1]
+        values = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64) for col in columns}
+
+        for col, summary in summaries.items():
+            summary.add(values[col])
+        for agg in aggregates.values():
+            agg.add(t_ns[dated], [values[col][dated] for col in columns])
+        for col, reservoir in reservoirs.items():
+            ok = dated & np.isfinite(values[col])
+            reservoir.add(t_ns[ok], values[col][ok])
+
+    for agg in aggregates.values():
+        agg.close()
+
+    def date(t):
+        return None if t is None else np.datetime_as_string(np.datetime64(int(t), 'ns'), unit='s').replace('T', ' ')
+
+    summary = {
+        'file': csv_file, 'schema': schema, 'rows': rows, 'invalid_rows': invalid, 'undated_rows': undated,
+        'chunks': n_chunks, 'chunk_rows': chunk_rows, 'first': date(first_t), 'last': date(last_t),
+        'hours': (last_t - first_t) / 3.6e12 if first_t is not None else 0.0,
+        'rolling': {'window': window, 'z': z},
+        'columns': {col: s.result() for col, s in summaries.items()},
+        'intervals': {name: {'file': agg.filename, 'rows': agg.rows_written} for name, agg in aggregates.items()},
+    }
+    if reservoirs:
+        summary['plot'] = plot_summary(f'{base}.analysis.png', schema, summary, reservoirs)
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    with open(f'{base}.summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"[INFO] {csv_file} ({schema}): {rows} rows in {n_chunks} chunks, {summary['seconds']:.2f} s "
+          f"-> {base}.summary.json")
+    return summary
+
+
+def plot_summary(filename, schema, summary, reservoirs):
+    from utils.headless import pyplot
+
+    plt = pyplot()
+    fig, axs = plt.subplots(len(reservoirs), 1, figsize=(10, 3 * len(reservoirs) + 1), squeeze=False, sharex=True)
+    for ax, (col, reservoir) in zip(axs[:, 0], reservoirs.items()):
+        x, y = reservoir.points()
+        s = summary['columns'][col]
+        ax.plot(x.astype('datetime64[ns]'), y, '-', lw=0.8, color='tab:blue')
+        if s['count']:
+            ax.axhline(s['mean'], color='tab:red', ls='--', lw=0.8)
+            ax.set_title(f"{col}: {s['mean']:.3g} ± {s['std']:.3g} (N={s['count']}, {s['outliers']} outliers)", fontsize=10)
+        ax.set_ylabel(col)
+        ax.grid(True, linestyle='--', alpha=0.5)
+    axs[-1, 0].set_xlabel('Date')
+    fig.suptitle(f"{os.path.basename(summary['file'])} ({schema}, {summary['first']} .. {summary['last']})")
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+    return filename
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summary stats, interval aggregates, rolling stats/outliers "
+                                                 "and a decimated plot of logger CSV files, in constant memory.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--out-dir', help="where the outputs go (default: next to each CSV)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--intervals', nargs='*', choices=list(INTERVALS), default=list(INTERVALS))
+    parser.add_argument('--window', type=int, default=60, help="readings in the rolling window")
+    parser.add_argument('--z', type=float, default=4.0, help="outlier threshold, in rolling stds")
+    parser.add_argument('--max-points', type=int, default=2000, help="points drawn per series")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        analyze(csv_file, args.out_dir, chunk_rows=args.chunk_rows, intervals=args.intervals, window=args.window,
+                z=args.z, max_points=args.max_points, plot=not args.no_plot)
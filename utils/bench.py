@@ -0,0 +1,564 @@
+# bench.py
+#
+# Benchmark suite: every pipeline stage at growing sample counts.
+#
+#   python -m utils.bench                                  # all stages, N = 1e3 .. 1e6
+#   python -m utils.bench --stages parse convert --sizes 1e3 1e5 --out bench.json
+#   python -m utils.bench --compare before.json after.json
+#
+# Stages: parse (serial lines -> numbers), convert (ADC counts -> V, R_therm,
+# temperatures), persist (CSV / columnar writes, the loggers' sinks; the
+# legacy pandas saves are timed at their real cadence, a full rewrite every
+# SAVE_INTERVAL rows), stats, compress (deadband / swinging door,
+# utils/compress.py) and plot. Each stage is timed for the current code and
+# for the code it replaced ("legacy ...", kept below as a reference), on the
+# same synthetic data.
+#
+# For every (stage, implementation, N) the JSON output records the best
+# wall time, the cost per sample and the scaling exponent against the
+# previous N (1.0 = linear, 2.0 = quadratic). Implementations whose next size
+# would take longer than --budget seconds are skipped and recorded as such,
+# so the quadratic legacy paths don't stall the run. The projection uses the
+# measured exponent (at least 0, linear until two sizes are timed), so a
+# per-call benchmark whose cost stays flat with N keeps running.
+#
+# Only the timed call counts: setup(n, workdir) runs untimed and outside the
+# budget (input files, and for LivePlot.update the first update drawing all
+# N samples), so large sizes can take well beyond --budget in wall time.
+
+import contextlib
+import csv
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from utils import parsers
+from utils.colstore import ColumnarWriter
+from utils.compress import Compressor
+from utils.csvlog import AppendCSVWriter
+from utils.pipeline import ADSSink, CSVSink
+from utils.schemas import column_dtypes
+from utils.stats import RunningStats, cumulative_mean_std
+from utils.thermistor import A, B, BETA, C, R0, R_FIXED, T0, Vcc, CSV_HEADER, convert_batch, convert_lut, get_lut
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SAVE_INTERVAL = 5  # rows between saves, as in the loggers
+STAGES = ('parse', 'convert', 'persist', 'stats', 'compress', 'plot')
+BENCHMARKS = []  # (stage, name, setup(n, workdir) -> callable)
+
+
+def benchmark(stage, name):
+    def register(setup):
+        BENCHMARKS.append((stage, name, setup))
+        return setup
+    return register
+
+
+def adc_samples(n, seed=0):
+    return np.random.default_rng(seed).integers(1, 26000, n).astype(np.int16)
+
+
+def temp_samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 75 + np.cumsum(rng.normal(0, 0.05, n)), np.arange(n) / 30.0
+
+
+# === Legacy reference code (as in the scripts before the rewrite) ===
+
+def legacy_adc_to_voltage(adc_value):
+    return (adc_value * 0.1875) / 1000.0
+
+
+def legacy_calculate_R_therm(voltage):
+    if voltage >= Vcc:
+        return float('inf')
+    return (R_FIXED * voltage) / (Vcc - voltage)
+
+
+def legacy_calculate_temp_SH(R_therm):
+    logR = math.log(R_therm)
+    inv_T = A + B * logR + C * logR**3
+    T_K = 1.0 / inv_T
+    T_C = T_K - 273.15
+    return T_K, T_C * 9.0 / 5.0 + 32.0, T_C
+
+
+def legacy_calculate_temp_Beta(R_therm):
+    T_K = 1.0 / ((1.0 / T0) + (1.0 / BETA) * math.log(R_therm / R0))
+    T_C = T_K - 273.15
+    return T_K, T_C * 9.0 / 5.0 + 32.0, T_C
+
+
+def legacy_save_data(filename, timestamps, elapsed, temps):
+    import pandas as pd
+    pd.DataFrame({'timestamp': timestamps, 'elapsed_min': elapsed, 'temperature_F': temps}).to_csv(filename, index=False)
+
+
+def legacy_save_to_csv(filename, timestamps, elapsed_mins, temps, hums):
+    import pandas as pd
+    pd.DataFrame({'timestamp': timestamps, 'elapsed_time_min': elapsed_mins,
+                  'temperature_degC': temps, 'humidity_percent': hums}).to_csv(filename, index=False)
+
+
+def legacy_every_save_interval(save, n, *columns):
+    # The old loggers called save() on the whole history every SAVE_INTERVAL
+    # readings (and once at the end): n / SAVE_INTERVAL rewrites, O(n^2) rows
+    for i in range(SAVE_INTERVAL, n, SAVE_INTERVAL):
+        save(*(col[:i] for col in columns))
+    save(*columns)
+
+
+def legacy_plot_data(filename, elapsed, temps):
+    import matplotlib.pyplot as plt
+    from scipy.stats import gaussian_kde
+
+    stds = [np.std(temps[:i+1]) if i > 0 else 0 for i in range(len(temps))]
+    fig, axs = plt.subplots(2, 1, figsize=(8, 8), dpi=300)
+    axs[0].errorbar(elapsed, temps, yerr=stds, fmt='-o', color='tab:red', ecolor='gray', alpha=0.7)
+    axs[1].hist(temps, bins='auto', density=True, alpha=0.5, color='tab:blue')
+    temp_range = np.linspace(min(temps), max(temps), 1000)
+    axs[1].plot(temp_range, gaussian_kde(temps)(temp_range), color='tab:orange')
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close()
+
+
+def legacy_plot_data_from_csv(csv_file, filename):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    df = pd.read_csv(csv_file).dropna()
+    df = df[df['Temp_SH (C)'] > 0.]
+    time, data = df['Elapsed Time (min)'], df['Voltage (V)'].to_numpy()
+    temp_SH_K, temp_Beta_K = df['Temp_SH (K)'], df['Temp_Beta (K)']
+    avg_SH, std_SH, avg_Beta, std_Beta, avg_data, std_data = [], [], [], [], [], []
+    for i in range(len(time)):  # cumulative mean/std of every prefix
+        avg_SH.append(np.mean(temp_SH_K[:i+1]))
+        std_SH.append(np.std(temp_SH_K[:i+1]))
+        avg_Beta.append(np.mean(temp_Beta_K[:i+1]))
+        std_Beta.append(np.std(temp_Beta_K[:i+1]))
+        avg_data.append(np.mean(data[:i+1]))
+        std_data.append(np.std(data[:i+1]))
+    fig, axs = plt.subplots(2, 2, figsize=(10, 10))
+    axs[0, 0].errorbar(time, avg_SH, yerr=std_SH, fmt='o', color='blue', alpha=0.5)
+    axs[0, 0].errorbar(time, avg_Beta, yerr=std_Beta, fmt='o', color='green', alpha=0.5)
+    axs[0, 0].plot(time, temp_SH_K, linestyle='--', color='blue')
+    axs[0, 0].plot(time, temp_Beta_K, linestyle='--', color='green')
+    axs[0, 1].hist(temp_SH_K, bins=20, alpha=0.5, color='blue')
+    axs[0, 1].hist(temp_Beta_K, bins=20, alpha=0.5, color='green')
+    axs[1, 0].errorbar(time, avg_data, yerr=std_data, fmt='o', color='purple', alpha=0.5)
+    axs[1, 0].plot(time, data, linestyle='--', color='purple')
+    axs[1, 1].hist(data, bins=20, alpha=0.5, color='purple')
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close('all')
+
+
+def write_ads_csv(filename, n):
+    # An ADS log of n samples, as the logger writes it
+    t_ns = 1_757_000_000_000_000_000 + np.arange(n, dtype=np.int64) * 1_000_000_000
+    columns = {'elapsed_min': np.arange(n) / 60.0, 'adc': adc_samples(n)}
+    sink = ADSSink(filename, flush_rows=10_000, flush_interval=None, fsync='never')
+    for i in range(0, n, 10_000):
+        sink.write(t_ns[i:i + 10_000], {col: v[i:i + 10_000] for col, v in columns.items()})
+    sink.close()
+
+
+# === parse ===
+
+for _fmt, _legacy in (('L23', parsers._legacy_l23), ('L12', parsers._legacy_l12), ('ADS1115', parsers._legacy_ads)):
+    def _setup_legacy(n, workdir, fmt=_fmt, legacy=_legacy):
+        lines = parsers.sample_lines(fmt, n)
+
+        def run():
+            out = []
+            for line in lines:
+                try:
+                    out.append(legacy(line))
+                except (ValueError, IndexError):
+                    pass
+        return run
+
+    def _setup_batch(n, workdir, fmt=_fmt):
+        lines = parsers.sample_lines(fmt, n)
+        batches = [lines[i:i + 256] for i in range(0, n, 256)]
+
+        def run():
+            parser = parsers.get_parser(fmt)
+            for batch in batches:
+                parser.parse_batch(batch)
+        return run
+
+    benchmark('parse', f'legacy per-line {_fmt}')(_setup_legacy)
+    benchmark('parse', f'parse_batch {_fmt}')(_setup_batch)
+
+
+# === convert ===
+
+@benchmark('convert', 'legacy calculate_temp_SH/Beta per sample')
+def _(n, workdir):
+    adc = adc_samples(n).tolist()
+
+    def run():
+        for value in adc:
+            R = legacy_calculate_R_therm(legacy_adc_to_voltage(value))
+            legacy_calculate_temp_SH(R)
+            legacy_calculate_temp_Beta(R)
+    return run
+
+
+@benchmark('convert', 'convert_batch')
+def _(n, workdir):
+    adc = adc_samples(n)
+    return lambda: convert_batch(adc)
+
+
+@benchmark('convert', 'convert_lut')
+def _(n, workdir):
+    adc = adc_samples(n)
+    get_lut()  # table built once per process, not per call
+    return lambda: convert_lut(adc)
+
+
+# === persist ===
+
+@benchmark('persist', f'legacy save_data L23 (full pandas rewrite every {SAVE_INTERVAL} rows)')
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    timestamps = ['2025-09-12 22:52:28'] * n
+    filename = os.path.join(workdir, 'legacy.csv')
+    return lambda: legacy_every_save_interval(lambda *cols: legacy_save_data(filename, *cols), n,
+                                              timestamps, elapsed, temps)
+
+
+@benchmark('persist', f'legacy save_to_csv L12 (full pandas rewrite every {SAVE_INTERVAL} rows)')
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    timestamps = ['2025-09-12 22:52:28'] * n
+    filename = os.path.join(workdir, 'legacy_l12.csv')
+    return lambda: legacy_every_save_interval(lambda *cols: legacy_save_to_csv(filename, *cols), n,
+                                              timestamps, elapsed, np.round(temps - 52), np.round(temps - 24))
+
+
+@benchmark('persist', 'legacy ADS reopen-and-append per block of 5')
+def _(n, workdir):
+    rows = convert_batch(adc_samples(n))
+    data = np.column_stack([np.arange(n) / 60.0, np.zeros(n)] + [rows[col] for col in CSV_HEADER[2:]]).tolist()
+    filename = os.path.join(workdir, 'legacy_ads.csv')
+
+    def run():
+        with open(filename, 'w', newline='') as f:
+            csv.writer(f).writerow(CSV_HEADER)
+        for start in range(0, n, 5):
+            with open(filename, mode='a', newline='') as file:
+                writer = csv.writer(file)
+                for row in data[start:start + 5]:
+                    writer.writerow([round(row[0], 2), '09-18-2025 12:52:53',
+                                     round(row[2], 4), round(row[3], 4),
+                                     round(row[4], 1), round(row[5], 2), round(row[6], 2),
+                                     round(row[7], 2), round(row[8], 2), round(row[9], 2)])
+                file.flush()
+    return run
+
+
+@benchmark('persist', "AppendCSVWriter (flush every 5 rows, fsync='never')")
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    rows = [['2025-09-12 22:52:28', e, t] for e, t in zip(elapsed.tolist(), temps.tolist())]
+    filename = os.path.join(workdir, 'append.csv')
+
+    def run():
+        with AppendCSVWriter(filename, ['timestamp', 'elapsed_min', 'temperature_F'], flush_rows=5, fsync='never') as log:
+            for row in rows:
+                log.write_row(row)
+    return run
+
+
+for _schema in ('L23', 'L12'):
+    @benchmark('persist', f"CSVSink {_schema} (batches of {SAVE_INTERVAL}, fsync='never')")
+    def _(n, workdir, schema=_schema):
+        temps, elapsed = temp_samples(n)
+        t_ns = 1_757_000_000_000_000_000 + np.arange(n, dtype=np.int64) * 1_000_000_000
+        columns = {'elapsed_min': elapsed, 'temperature_F': temps,
+                   'temperature_C': np.round(temps - 52), 'humidity': np.round(temps - 24)}
+        filename = os.path.join(workdir, f'sink_{schema}.csv')
+
+        def run():
+            sink = CSVSink(filename, schema, flush_rows=SAVE_INTERVAL, flush_interval=None, fsync='never')
+            for i in range(0, n, SAVE_INTERVAL):
+                sink.write(t_ns[i:i + SAVE_INTERVAL], {col: v[i:i + SAVE_INTERVAL] for col, v in columns.items()})
+            sink.close()
+        return run
+
+
+@benchmark('persist', f"ADSSink (bursts of {SAVE_INTERVAL}, converted by LUT, fsync='never')")
+def _(n, workdir):
+    adc = adc_samples(n)
+    elapsed = np.arange(n) / 60.0
+    t_ns = 1_757_000_000_000_000_000 + np.arange(n, dtype=np.int64) * 1_000_000_000
+    filename = os.path.join(workdir, 'sink_ads.csv')
+    get_lut()
+
+    def run():
+        sink = ADSSink(filename, flush_rows=SAVE_INTERVAL, flush_interval=None, fsync='never')
+        for i in range(0, n, SAVE_INTERVAL):
+            sink.write(t_ns[i:i + SAVE_INTERVAL], {'elapsed_min': elapsed[i:i + SAVE_INTERVAL],
+                                                   'adc': adc[i:i + SAVE_INTERVAL]})
+        sink.close()
+    return run
+
+
+@benchmark('persist', 'ColumnarWriter (batches of 256)')
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    t_ns = np.arange(n, dtype=np.int64) * 1_000_000_000
+    path = os.path.join(workdir, 'cols')
+
+    def run():
+        with ColumnarWriter(path, column_dtypes('L23'), chunk_rows=10_000) as log:
+            for i in range(0, n, 256):
+                log.extend(t_ns[i:i + 256], elapsed_min=elapsed[i:i + 256], temperature_F=temps[i:i + 256])
+    return run
+
+
+# === stats ===
+
+@benchmark('stats', 'legacy np.mean/np.std of the whole list per sample')
+def _(n, workdir):
+    temps = temp_samples(n)[0].tolist()
+
+    def run():
+        history = []
+        for t in temps:
+            history.append(t)
+            np.mean(history), np.std(history)
+    return run
+
+
+@benchmark('stats', 'RunningStats.update per sample')
+def _(n, workdir):
+    temps = temp_samples(n)[0].tolist()
+
+    def run():
+        stats = RunningStats()
+        for t in temps:
+            stats.update(t)
+            stats.mean, stats.std
+    return run
+
+
+@benchmark('stats', 'legacy cumulative std list (error bars)')
+def _(n, workdir):
+    temps = temp_samples(n)[0].tolist()
+    return lambda: [np.std(temps[:i+1]) if i > 0 else 0 for i in range(len(temps))]
+
+
+@benchmark('stats', 'cumulative_mean_std')
+def _(n, workdir):
+    temps = temp_samples(n)[0]
+    return lambda: cumulative_mean_std(temps)
+
+
+# === compress ===
+
+def compress_batches(compressor, t_ns, columns, batch=256):
+    kept = []
+    for i in range(0, len(t_ns), batch):
+        out = compressor((t_ns[i:i + batch], {col: v[i:i + batch] for col, v in columns.items()}))
+        if out:
+            kept.append(out)
+    last = compressor.flush()
+    return kept + [last] if last else kept
+
+
+for _method in ('deadband', 'swinging_door'):
+    @benchmark('compress', f"Compressor {_method} (0.1 °F, batches of 256)")
+    def _(n, workdir, method=_method):
+        temps, elapsed = temp_samples(n)
+        t_ns = np.arange(n, dtype=np.int64)
+        return lambda: compress_batches(Compressor({'temperature_F': 0.1}, method), t_ns, {'elapsed_min': elapsed, 'temperature_F': temps})
+
+
+@benchmark('compress', "swinging_door (0.1 °F) + AppendCSVWriter of the kept rows")
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    t_ns = np.arange(n, dtype=np.int64)
+    filename = os.path.join(workdir, 'compressed.csv')
+
+    def run():
+        batches = compress_batches(Compressor({'temperature_F': 0.1}), t_ns, {'elapsed_min': elapsed, 'temperature_F': temps})
+        with AppendCSVWriter(filename, ['timestamp', 'elapsed_min', 'temperature_F'], flush_rows=5, fsync='never') as log:
+            for _, cols in batches:
+                log.write_rows(['2025-09-12 22:52:28', e, t] for e, t in zip(cols['elapsed_min'].tolist(), cols['temperature_F'].tolist()))
+    return run
+
+
+# === plot ===
+
+def _load_script(name, relpath):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, relpath))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@benchmark('plot', 'legacy plot_data L23 (full errorbar + gaussian_kde)')
+def _(n, workdir):
+    temps, elapsed = temp_samples(n)
+    return lambda: legacy_plot_data(os.path.join(workdir, 'legacy_plot.png'), elapsed, temps)
+
+
+@benchmark('plot', 'plot_data L23')
+def _(n, workdir):
+    logger = _load_script('l23_logger', os.path.join('L23', 'logger.py'))
+    logger.PLOT_FILENAME = os.path.join(workdir, 'plot.png')
+    temps, elapsed = temp_samples(n)
+    return lambda: logger.plot_data(elapsed, temps)
+
+
+@benchmark('plot', 'plot_data L12')
+def _(n, workdir):
+    logger = _load_script('l12_logger', os.path.join('L12_DH11', 'arduino_logger.py'))
+    logger.PLOT_FILENAME = os.path.join(workdir, 'plot.png')
+    temps, elapsed = temp_samples(n)
+    return lambda: logger.plot_data(elapsed, np.round(temps - 52), np.round(temps - 24))
+
+
+@benchmark('plot', 'legacy plot_data_from_csv ADS (prefix mean/std loop, every point drawn)')
+def _(n, workdir):
+    csv_file = os.path.join(workdir, 'ads_plot.csv')
+    write_ads_csv(csv_file, n)
+    return lambda: legacy_plot_data_from_csv(csv_file, os.path.join(workdir, 'legacy_ads_plot.png'))
+
+
+@benchmark('plot', 'plot_data_from_csv ADS')
+def _(n, workdir):
+    logger = _load_script('ads_logger', os.path.join('ADS115_thermistor', 'python', 'logger.py'))
+    csv_file = os.path.join(workdir, 'ads_plot.csv')
+    write_ads_csv(csv_file, n)
+    return lambda: logger.plot_data_from_csv(csv_file, os.path.join(workdir, 'ads_plot.png'))
+
+
+@benchmark('plot', 'LivePlot.update L23 (N samples already drawn, 5 new)')
+def _(n, workdir):
+    logger = _load_script('l23_logger', os.path.join('L23', 'logger.py'))
+    logger.PLOT_FILENAME = os.path.join(workdir, 'live.png')
+    temps, elapsed = temp_samples(n + 5 * 3)
+    live = logger.LivePlot()
+    live.update(elapsed[:n], temps[:n])
+    drawn = [n]
+
+    def run():
+        drawn[0] += 5  # each repeat needs 5 samples it hasn't seen
+        live.update(elapsed[:drawn[0]], temps[:drawn[0]])
+    return run
+
+
+# === Runner ===
+
+def _time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _measure(setup, n, workdir, repeat):
+    # The plot functions print a line per call; keep that out of the report
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return _time(setup(n, workdir), repeat)
+
+
+def run(stages=STAGES, sizes=SIZES, budget=30.0, verbose=True):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage, name, setup in BENCHMARKS:
+            if stage not in stages:
+                continue
+            prev = None  # (n, seconds)
+            exponent = 1.0
+            for n in sizes:
+                record = {'stage': stage, 'name': name, 'n': int(n)}
+                projected = prev[1] * (n / prev[0]) ** max(exponent, 0.0) if prev else 0.0
+                if projected > budget:
+                    record['skipped'] = f"projected {projected:.0f} s > budget {budget:.0f} s"
+                    results.append(record)
+                    if verbose:
+                        print(f"{stage:8} {name:58} {n:>9,}  skipped ({record['skipped']})")
+                    continue
+                try:
+                    seconds = _measure(setup, int(n), workdir, repeat=3 if n <= 10_000 else 1)
+                except ImportError as e:  # scipy/pandas missing for a legacy path
+                    record['skipped'] = f"missing dependency: {e.name}"
+                    results.append(record)
+                    break
+                if prev:
+                    exponent = math.log(seconds / prev[1]) / math.log(n / prev[0]) if seconds > 0 and prev[1] > 0 else 1.0
+                    record['scaling'] = round(exponent, 2)
+                record['seconds'] = seconds
+                record['us_per_sample'] = seconds / n * 1e6
+                results.append(record)
+                prev = (n, seconds)
+                if verbose:
+                    scaling = f"  x^{record['scaling']:.2f}" if 'scaling' in record else ''
+                    print(f"{stage:8} {name:58} {n:>9,}  {seconds:10.4f} s  {record['us_per_sample']:10.3f} us/sample{scaling}")
+    return results
+
+
+def environment():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {'revision': revision, 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'platform': platform.platform()}
+
+
+def compare(old_file, new_file):
+    # Per (stage, name, n): new time / old time (< 1 is faster)
+    with open(old_file) as f:
+        old = {(r['stage'], r['name'], r['n']): r for r in json.load(f)['results']}
+    with open(new_file) as f:
+        new = json.load(f)['results']
+    for r in new:
+        o = old.get((r['stage'], r['name'], r['n']))
+        if not o or 'seconds' not in o or 'seconds' not in r:
+            continue
+        ratio = r['seconds'] / o['seconds'] if o['seconds'] else float('inf')
+        flag = '  REGRESSION' if ratio > 1.2 else ''
+        print(f"{r['stage']:8} {r['name']:58} {r['n']:>9,}  {o['seconds']:10.4f} -> {r['seconds']:10.4f} s  x{ratio:5.2f}{flag}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import matplotlib
+    matplotlib.use('Agg')
+
+    parser = argparse.ArgumentParser(description="Time every pipeline stage at growing sample counts.")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--sizes', nargs='+', type=float, default=list(SIZES))
+    parser.add_argument('--budget', type=float, default=30.0, help="skip a size projected to take longer (seconds)")
+    parser.add_argument('--out', default='bench.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+    results = run(args.stages, [int(n) for n in args.sizes], args.budget)
+    with open(args.out, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    print(f"[INFO] Results saved to '{args.out}'.")
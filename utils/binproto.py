@@ -0,0 +1,193 @@
+# binproto.py
+#
+# Binary serial protocol: COBS-framed packets with raw ADC counts.
+#
+# The ASCII lines cost 20-40 bytes per sample at 9600 baud, a few hundred
+# samples per second at best. With BINARY_MODE set in
+# ADS115_thermistor/ino_code_simple the board sends instead, at 250000 baud:
+#
+#   payload (little-endian, 10 bytes)
+#     uint8  type     FRAME_ADS1115
+#     uint8  seq      +1 per frame, so lost frames can be counted
+#     uint32 t_us     device micros() (wraps every ~71 min; unwrapped here)
+#     int16  adc      raw ADC count
+#     uint16 crc      CRC-16/CCITT-FALSE of the first 8 bytes
+#
+# COBS-encoded (so the payload never contains 0x00) and terminated by 0x00:
+# 12 bytes per sample on the wire, ~2000 samples/s at 250000 baud, more than
+# the ADS1115's 860 SPS.
+#
+# FrameDecoder.feed(data) takes raw bytes as they arrive and returns the
+# complete frames as numpy arrays. Because every frame has the same length,
+# COBS decoding and the CRC check run column-wise over all frames at once
+# with numpy instead of byte by byte in Python.
+
+import struct
+
+import numpy as np
+
+FRAME_ADS1115 = 0x01
+BINARY_BAUD = 250000
+
+PAYLOAD = struct.Struct('<BBIh')  # without the CRC
+PAYLOAD_SIZE = PAYLOAD.size + 2
+ENCODED_SIZE = PAYLOAD_SIZE + 1  # COBS adds one byte for payloads < 254 bytes
+PAYLOAD_DTYPE = np.dtype([('type', 'u1'), ('seq', 'u1'), ('t_us', '<u4'), ('adc', '<i2'), ('crc', '<u2')])
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    # CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), as in the sketch
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ int(CRC_TABLE[(crc >> 8) ^ byte])
+    return crc
+
+
+def crc16_rows(rows):
+    # crc16 of every row of a (n, k) uint8 array at once
+    crc = np.full(len(rows), 0xFFFF, dtype=np.uint16)
+    for j in range(rows.shape[1]):
+        crc = (crc << 8) ^ CRC_TABLE[(crc >> 8) ^ rows[:, j]]
+    return crc
+
+
+def cobs_encode(data):
+    out = bytearray([0])
+    code_idx, code = 0, 1
+    for byte in data:
+        if byte == 0:
+            out[code_idx] = code
+            code_idx, code = len(out), 1
+            out.append(0)
+        else:
+            out.append(byte)
+            code += 1
+            if code == 0xFF:
+                out[code_idx] = code
+                code_idx, code = len(out), 1
+                out.append(0)
+    out[code_idx] = code
+    return bytes(out)
+
+
+def cobs_decode(data):
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 0 or i + code > len(data):
+            raise ValueError("invalid COBS data")
+        out += data[i + 1:i + code]
+        i += code
+        if code < 0xFF and i < len(data):
+            out.append(0)
+    return bytes(out)
+
+
+def encode_sample(seq, t_us, adc, frame_type=FRAME_ADS1115):
+    # One frame as the sketch sends it, delimiter included (for simulators/tests)
+    payload = PAYLOAD.pack(frame_type, seq & 0xFF, t_us & 0xFFFFFFFF, adc)
+    payload += struct.pack('<H', crc16(payload))
+    return cobs_encode(payload) + b'\x00'
+
+
+def cobs_decode_rows(enc):
+    # COBS-decode a (n, PAYLOAD_SIZE + 1) uint8 array of frames, column by
+    # column. Returns (payloads, ok) with ok False for malformed frames.
+    n, width = enc.shape
+    out = np.empty((n, width - 1), dtype=np.uint8)
+    next_code = enc[:, 0].astype(np.int64)  # position of the next code byte
+    for j in range(1, width):
+        is_code = next_code == j
+        byte = enc[:, j]
+        out[:, j - 1] = np.where(is_code, 0, byte)
+        next_code = np.where(is_code, j + byte.astype(np.int64), next_code)
+    ok = next_code == width  # the last group must end exactly at the frame end
+    return out, ok
+
+
+class FrameDecoder:
+    # Incremental decoder; feed() as bytes arrive, get arrays of samples back
+    def __init__(self, frame_type=FRAME_ADS1115, buffer_size=1 << 16):
+        self.frame_type = frame_type
+        self.buffer_size = buffer_size
+        self.frames = 0
+        self.malformed = 0  # wrong length, bad COBS, bad CRC or wrong type
+        self.lost = 0  # frames missing according to seq (malformed ones included)
+        self.dropped_bytes = 0
+        self._buf = bytearray()
+        self._skip_partial = True
+        self._last_seq = None
+        self._last_t = None
+        self._t_offset = 0
+
+    def _empty(self):
+        return {'seq': np.empty(0, np.uint8), 'device_us': np.empty(0, np.int64), 'adc': np.empty(0, np.int16)}
+
+    def feed(self, data):
+        # Returns {'seq': uint8, 'device_us': int64 (unwrapped), 'adc': int16}
+        self._buf += data
+        if len(self._buf) > self.buffer_size:
+            excess = len(self._buf) - self.buffer_size
+            del self._buf[:excess]
+            self.dropped_bytes += excess
+        end = self._buf.rfind(b'\x00')
+        if end < 0:
+            return self._empty()
+        chunk = bytes(self._buf[:end])
+        del self._buf[:end + 1]
+        frames = chunk.split(b'\x00')
+        if self._skip_partial:
+            frames = frames[1:]  # whatever was in flight when the port opened
+            self._skip_partial = False
+        return self.decode(frames)
+
+    def decode(self, frames):
+        # frames: list of encoded frames without the 0x00 delimiter
+        frames = [f for f in frames if f]
+        good = [f for f in frames if len(f) == ENCODED_SIZE]
+        bad = len(frames) - len(good)
+        if not good:
+            self.malformed += bad
+            return self._empty()
+
+        enc = np.frombuffer(b''.join(good), dtype=np.uint8).reshape(-1, ENCODED_SIZE)
+        raw, ok = cobs_decode_rows(enc)
+        payload = raw.view(PAYLOAD_DTYPE).ravel()
+        ok &= payload['type'] == self.frame_type
+        ok &= crc16_rows(raw[:, :PAYLOAD.size]) == payload['crc']
+        bad += int(np.count_nonzero(~ok))
+        payload = payload[ok]
+        self.malformed += bad
+        self.frames += len(payload)
+        if not len(payload):
+            return self._empty()
+
+        # Lost frames from seq gaps (modulo 256, so gaps over 255 frames are undercounted)
+        seq = payload['seq'].astype(np.int64)
+        first_prev = seq[0] - 1 if self._last_seq is None else self._last_seq
+        prev = np.concatenate(([first_prev], seq[:-1]))
+        self.lost += int(((seq - prev - 1) % 256).sum())
+        self._last_seq = int(seq[-1])
+
+        # Unwrap the 32-bit microsecond counter
+        t = payload['t_us'].astype(np.int64)
+        prev_t = np.concatenate(([t[0] if self._last_t is None else self._last_t], t[:-1]))
+        wraps = np.cumsum(t < prev_t)
+        device_us = t + self._t_offset + (wraps << 32)
+        self._t_offset += int(wraps[-1]) << 32
+        self._last_t = int(t[-1])
+        return {'seq': payload['seq'], 'device_us': device_us, 'adc': payload['adc'].astype(np.int16)}
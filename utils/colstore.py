@@ -0,0 +1,222 @@
+# colstore.py
+#
+# Columnar binary log format, an alternative to the CSV files.
+#
+# A log is a directory:
+#
+#   temp_log.cols/
+#       index.json              chunk list with per-chunk row count and min/max t_ns
+#       chunk_000000/t_ns.npy   int64 epoch nanoseconds (sorted)
+#       chunk_000000/<col>.npy  one plain .npy per column
+#       chunk_000001/...
+#
+# Readers never parse text: they pick the chunks whose [t_min, t_max]
+# overlaps the requested time range from the index, memory-map those .npy
+# files and slice them with searchsorted. "Last hour" therefore only touches
+# the last chunk or two, however long the log is.
+#
+# A writer opened without append starts a new log: the index and chunk_*
+# directories of an earlier one in the same directory are removed (other
+# files are left alone), so no stale chunk outlives its index entry.
+#
+# Run as a script to import the existing CSV logs:
+#
+#   python -m utils.colstore L23/temp_log.csv L12_DH11/datalog.csv ...
+
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.samplestore import GrowingArray
+
+INDEX_FILE = 'index.json'
+CHUNK_NAME = re.compile(r'chunk_\d{6}$')
+
+
+class ColumnarWriter:
+    def __init__(self, path, columns, chunk_rows=10_000, flush_interval=None, append=False):
+        # columns: {name: dtype}; a 't_ns' column is always added
+        self.path = path
+        self.columns = {col: np.dtype(dtype) for col, dtype in columns.items()}
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval  # seconds; None -> only full chunks (and close)
+        self._t_ns = GrowingArray(dtype=np.int64)
+        self._buf = {col: GrowingArray(dtype=dtype) for col, dtype in self.columns.items()}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        if append and os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+        else:
+            self._clear()  # a new log: chunks of an earlier one would be overwritten one by one
+            self.index = {'columns': {col: dtype.str for col, dtype in self.columns.items()}, 'chunks': []}
+            self._write_index()
+
+    def _clear(self):
+        # Removes an earlier log's index and chunk directories, nothing else
+        for name in os.listdir(self.path):
+            full = os.path.join(self.path, name)
+            if name in (INDEX_FILE, INDEX_FILE + '.tmp'):
+                os.remove(full)
+            elif CHUNK_NAME.match(name) and os.path.isdir(full):
+                shutil.rmtree(full)
+
+    def append(self, t_ns, **values):
+        self._t_ns.append(t_ns)
+        for col, buf in self._buf.items():
+            buf.append(values[col])
+        self._maybe_flush()
+
+    def extend(self, t_ns, **values):
+        self._t_ns.extend(t_ns)
+        for col, buf in self._buf.items():
+            buf.extend(values[col])
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        while len(self._t_ns) >= self.chunk_rows:
+            self._write_chunk(self.chunk_rows)
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def poll(self):
+        # flush_interval check without new rows (see AppendCSVWriter.poll)
+        if len(self._t_ns) and self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        # Writes whatever is buffered as a (possibly short) chunk
+        if len(self._t_ns):
+            self._write_chunk(len(self._t_ns))
+        self._last_flush = time.monotonic()
+
+    def _write_chunk(self, n):
+        name = f"chunk_{len(self.index['chunks']):06d}"
+        chunk_dir = os.path.join(self.path, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        t = self._t_ns.values[:n]
+        np.save(os.path.join(chunk_dir, 't_ns.npy'), t)
+        for col, buf in self._buf.items():
+            np.save(os.path.join(chunk_dir, f'{col}.npy'), buf.values[:n])
+        # Only listed in the index once all of its files are on disk
+        self.index['chunks'].append({'name': name, 'rows': int(n),
+                                     't_min': int(t.min()), 't_max': int(t.max())})
+        self._write_index()
+        self._t_ns.drop_front(n)
+        for buf in self._buf.values():
+            buf.drop_front(n)
+
+    def _write_index(self):
+        tmp = os.path.join(self.path, INDEX_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarReader:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.columns = list(self.index['columns'])
+        self.chunks = self.index['chunks']
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.chunks)
+
+    @property
+    def time_range(self):
+        if not self.chunks:
+            return None
+        return min(c['t_min'] for c in self.chunks), max(c['t_max'] for c in self.chunks)
+
+    def _load(self, chunk, col):
+        return np.load(os.path.join(self.path, chunk['name'], f'{col}.npy'), mmap_mode='r')
+
+    def iter_chunks(self, t_start=None, t_end=None, columns=None):
+        # Yields {'t_ns': ..., col: ...} for rows with t_start <= t_ns < t_end,
+        # as read-only memory-mapped slices (copy them to keep them around).
+        columns = self.columns if columns is None else columns
+        for chunk in self.chunks:
+            if t_start is not None and chunk['t_max'] < t_start:
+                continue
+            if t_end is not None and chunk['t_min'] >= t_end:
+                continue
+            t = self._load(chunk, 't_ns')
+            lo = 0 if t_start is None else int(np.searchsorted(t, t_start, side='left'))
+            hi = len(t) if t_end is None else int(np.searchsorted(t, t_end, side='left'))
+            if lo >= hi:
+                continue
+            out = {'t_ns': t[lo:hi]}
+            for col in columns:
+                out[col] = self._load(chunk, col)[lo:hi]
+            yield out
+
+    def read(self, t_start=None, t_end=None, columns=None):
+        # Same as iter_chunks, concatenated into regular arrays
+        columns = self.columns if columns is None else columns
+        parts = list(self.iter_chunks(t_start, t_end, columns))
+        if not parts:
+            dtypes = dict(self.index['columns'], t_ns='<i8')
+            return {col: np.empty(0, dtype=dtypes[col]) for col in ['t_ns'] + list(columns)}
+        return {col: np.concatenate([p[col] for p in parts]) for col in parts[0]}
+
+    def last(self, seconds, columns=None):
+        # e.g. reader.last(3600) -> the last hour of the log
+        if not self.chunks:
+            return self.read(columns=columns)
+        t_end = self.time_range[1]
+        return self.read(t_end - int(seconds * 1e9), None, columns)
+
+
+def import_csv(csv_file, out_path=None, chunk_rows=10_000):
+    # Convert one of the loggers' CSV files (any of the three layouts) into a
+    # columnar log. CSV dates are local wall-clock times; they are converted
+    # with the current UTC offset.
+    import pandas as pd  # only needed for the import
+    from utils.schemas import SCHEMAS, detect_schema
+
+    with open(csv_file, newline='') as f:
+        schema_name = detect_schema(f.readline().rstrip('\r\n').split(','))
+    schema = SCHEMAS[schema_name]
+    out_path = out_path or os.path.splitext(csv_file)[0] + '.cols'
+    utc_offset_ns = int(datetime.now().astimezone().utcoffset().total_seconds() * 1e9)
+
+    columns = dict(schema['columns'].values())
+    rows = 0
+    with ColumnarWriter(out_path, columns, chunk_rows=chunk_rows) as writer:
+        for df in pd.read_csv(csv_file, chunksize=chunk_rows):
+            t = pd.to_datetime(df[schema['time']], format=schema['time_format'])
+            t_ns = t.to_numpy(dtype='datetime64[ns]').astype(np.int64) - utc_offset_ns
+            values = {col: df[csv_col].to_numpy(dtype=dtype) for csv_col, (col, dtype) in schema['columns'].items()}
+            writer.extend(t_ns, **values)
+            rows += len(df)
+    print(f"[INFO] {csv_file} ({schema_name}): {rows} rows -> {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import logger CSV files into the columnar log format.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--chunk-rows', type=int, default=10_000)
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        import_csv(csv_file, chunk_rows=args.chunk_rows)
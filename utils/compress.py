@@ -0,0 +1,191 @@
+# compress.py
+#
+# Lossy compression at ingest: only the rows needed to redraw each signal
+# within a fixed error bound are kept.
+#
+#   comp = Compressor({'temperature_F': 0.1}, method='swinging_door')
+#   batch = comp((t_ns, columns))  # the kept rows of the batch, or None
+#   ...
+#   last = comp.flush()  # the row held back until the end of the signal was known
+#
+# deadband: a row is kept when one of its values moved more than its
+#   tolerance away from the last kept row; holding the last kept value
+#   reproduces the signal within the tolerance. A flat stretch (the DHT11
+#   repeating 23.0,51.0) becomes one row.
+# swinging_door: swinging-door trending. The rows skipped since the last kept
+#   one each allow a range of slopes (the "doors") for the line through them;
+#   a row is kept when the line to the next row would leave that range, so
+#   linear interpolation between kept rows passes within the tolerance of
+#   every skipped row. A slow ramp (the thermistor warming up) becomes a few
+#   rows too.
+#
+# With several columns a row is kept when any of them needs it and all of
+# them restart from it, so each stays within its own tolerance. Rows with a
+# non-finite value (NaN, inf) are always kept. The time axis is 'elapsed_min'
+# if the batch has it, else t_ns.
+#
+# The first WINDOW rows after a kept one are checked one at a time; once a
+# segment is longer than that (a flat or slow signal) the rest of the batch
+# is checked with numpy, in windows of doubling size.
+#
+# Dropped rows are gone for good: anything that must be exact (running stats)
+# has to see the batch before this step, see ingest_steps in utils/pipeline.py.
+
+import bisect
+import math
+
+import numpy as np
+
+METHODS = ('deadband', 'swinging_door')
+WINDOW = 16
+
+
+class Compressor:
+    def __init__(self, tolerances, method='swinging_door'):
+        # tolerances: {column: largest error allowed, in the column's units}
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method '{method}', expected one of {METHODS}")
+        self.columns = list(tolerances)
+        self.tolerances = [float(tolerances[col]) for col in self.columns]
+        self.method = method
+        self.seen = 0  # rows in
+        self.kept = 0  # rows out
+        self._anchor = None  # (time, values) of the last kept row
+        self._upper = self._lower = None  # per column slope range left by the skipped rows (the doors)
+        self._skipped = 0  # rows skipped since the anchor
+        self._pending = None  # (time, values, row) of the last skipped row: its index in the
+                              # current batch, or (t_ns, columns) of length 1 once that batch is done
+
+    def _restart(self, t, y):
+        self._anchor = (t, y)
+        self._upper = [math.inf] * len(y)
+        self._lower = [-math.inf] * len(y)
+        self._skipped = 0
+
+    def _fits(self, t, y):
+        # Can the row be skipped (deadband) / end the current segment (swinging
+        # door)? If so the doors are narrowed by it.
+        at, ay = self._anchor
+        dt = t - at
+        if self.method == 'deadband' or dt <= 0:  # rows at the anchor's time only need to be near it
+            return all(abs(v - a) <= tol for v, a, tol in zip(y, ay, self.tolerances))
+        for v, a, upper, lower in zip(y, ay, self._upper, self._lower):
+            if not lower <= (v - a) / dt <= upper:
+                return False
+        for j, (v, a, tol) in enumerate(zip(y, ay, self.tolerances)):
+            self._upper[j] = min(self._upper[j], (v + tol - a) / dt)
+            self._lower[j] = max(self._lower[j], (v - tol - a) / dt)
+        return True
+
+    def _fitting(self, t, y):
+        # _fits for consecutive rows (t, y[column]) at once: how many of them fit
+        at, ay = self._anchor
+        ay, tol = np.array(ay)[:, None], np.array(self.tolerances)[:, None]
+        near = (np.abs(y - ay) <= tol).all(axis=0)
+        if self.method == 'deadband':
+            return len(t) if near.all() else int(np.argmin(near))
+        dt = t - at
+        ahead = dt > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (y - ay) / dt
+            upper = np.where(ahead, slope + tol / dt, np.inf)
+            lower = np.where(ahead, slope - tol / dt, -np.inf)
+        # the doors each row sees, left by the rows before it
+        doors_upper = np.minimum.accumulate(np.concatenate([np.array(self._upper)[:, None], upper[:, :-1]], axis=1), axis=1)
+        doors_lower = np.maximum.accumulate(np.concatenate([np.array(self._lower)[:, None], lower[:, :-1]], axis=1), axis=1)
+        fits = np.where(ahead, ((doors_lower <= slope) & (slope <= doors_upper)).all(axis=0), near)
+        n = len(t) if fits.all() else int(np.argmin(fits))
+        if n:
+            self._upper = np.minimum(self._upper, upper[:, :n].min(axis=1)).tolist()
+            self._lower = np.maximum(self._lower, lower[:, :n].max(axis=1)).tolist()
+        return n
+
+    def _skip(self, times, values, i, end):
+        # How many rows from i on (up to end) can be skipped
+        if self._skipped < WINDOW or end - i < WINDOW:
+            return 1 if self._fits(times[i], values[i]) else 0
+        skip, window = 0, WINDOW
+        t, y = np.array(times[i:end]), np.array(values[i:end]).T
+        while skip < len(t):
+            fit = self._fitting(t[skip:skip + window], y[:, skip:skip + window])
+            skip += fit
+            if fit < window:
+                break
+            window *= 2
+        return skip
+
+    def __call__(self, batch):
+        t_ns, columns = batch
+        n = len(t_ns)
+        self.seen += n
+        times = np.asarray(columns['elapsed_min'] if 'elapsed_min' in columns else t_ns, dtype=np.float64)
+        values = np.array([np.asarray(columns[col], dtype=np.float64) for col in self.columns]).reshape(len(self.columns), n)
+        finite = np.isfinite(values).all(axis=0)
+        gaps = np.flatnonzero(~finite).tolist() + [n]  # a run of finite rows ends at the next gap
+        times, values, finite = times.tolist(), values.T.tolist(), finite.tolist()
+
+        kept = []  # indices into this batch
+        held = None  # the row skipped in an earlier batch, if it turns out to be needed
+        i = 0
+        while i < n:
+            if self._anchor is not None and finite[i]:
+                skip = self._skip(times, values, i, gaps[bisect.bisect(gaps, i)])
+                if skip:
+                    i += skip
+                    self._skipped += skip
+                    self._pending = (times[i - 1], values[i - 1], i - 1)
+                    continue
+                if self.method == 'swinging_door' and self._pending is not None:
+                    # the last skipped row ends this segment and starts the next one
+                    held = self._keep_pending(kept) or held
+                    continue
+            elif self._pending is not None:
+                # a gap (NaN): the line drawn up to it ends at the last real row
+                held = self._keep_pending(kept) or held
+            self._pending = None
+            kept.append(i)
+            self._restart(times[i], values[i])
+            i += 1
+
+        if self._pending is not None and isinstance(self._pending[2], int):
+            t, y, i = self._pending
+            self._pending = (t, y, (np.array(t_ns[i:i + 1]), {col: np.array(v[i:i + 1]) for col, v in columns.items()}))
+        return self._take(t_ns, columns, kept, held)
+
+    def _keep_pending(self, kept):
+        # Keeps the last skipped row and restarts from it; returns the row if
+        # it came from an earlier batch
+        t, y, row = self._pending
+        self._pending = None
+        self._restart(t, y)
+        if isinstance(row, int):
+            kept.append(row)
+            return None
+        return row
+
+    def _take(self, t_ns, columns, kept, held):
+        if not kept and held is None:
+            return None
+        idx = np.asarray(kept, dtype=np.intp)
+        t_out = np.asarray(t_ns)[idx]
+        out = {col: np.asarray(v)[idx] for col, v in columns.items()}
+        if held is not None:
+            held_t, held_cols = held
+            t_out = np.concatenate([held_t, t_out])
+            out = {col: np.concatenate([held_cols[col], v]) for col, v in out.items()}
+        self.kept += len(t_out)
+        return (t_out, out) if len(t_out) else None
+
+    def flush(self):
+        # The last row seen, if it was skipped (it marks where the signal ends)
+        if self._pending is None:
+            return None
+        t, y, (t_ns, columns) = self._pending
+        self._pending = None
+        self._restart(t, y)
+        self.kept += len(t_ns)
+        return t_ns, columns
+
+    def summary(self):
+        pct = 100.0 * self.kept / self.seen if self.seen else 0.0
+        return f"{self.method}: kept {self.kept} of {self.seen} rows ({pct:.1f}%)"
@@ -0,0 +1,286 @@
+# control.py
+#
+# Run-time control of a logger over a local Unix domain socket and signals,
+# instead of polling a STOP file from the acquisition loop.
+#
+#   control = Control('temp_log.ctl', stats=store.stats, metrics=metrics)
+#   control_settings(control, sinks, SAVE_INTERVAL, PLOT_MIN_INTERVAL)  # utils/pipeline.py
+#   with control:
+#       Pipeline(serial_source(reader, control, metrics), steps, sinks, metrics).run()
+#
+#   python -m utils.control temp_log.ctl stats
+#   python -m utils.control temp_log.ctl set save_interval 20
+#   python -m utils.control temp_log.ctl stop
+#
+# Commands, one line in and one JSON line back ({"ok": true, ...} or
+# {"ok": false, "error": ...}):
+#   stop            end the run: the source is closed, rows held by a step are
+#                   passed on and every sink is flushed and closed
+#   stats           running stats of the logger's columns, samples, counters,
+#                   gauges and settings
+#   get             the current settings
+#   set NAME VALUE  change a setting, e.g. save_interval or plot_interval
+# Signals: SIGTERM stops the same way (it used to kill the logger before the
+# final flush), SIGUSR1 prints the stats. Ctrl-C is left as it was.
+#
+# The Control is the source's stop condition, so it is called once per batch,
+# on the loop thread (utils/supervisor.py, which has no batches, calls it from
+# an asyncio task a few times a second): commands queued by the socket thread
+# or a signal handler run there, between batches, and see (and change) a
+# consistent state. With nothing queued the call is one deque and one Event
+# check; a command waits at most one batch (the serial read timeout, or an
+# ADS burst).
+#
+# Where AF_UNIX isn't available or the socket can't be created, a watcher
+# thread looks for the STOP file once a second instead, off the loop thread.
+
+import collections
+import json
+import math
+import os
+import signal
+import socket
+import threading
+import time
+
+COMMANDS = ('stop', 'stats', 'get', 'set')
+REPLY_TIMEOUT = 30.0  # seconds a command waits for the loop thread
+WATCH_INTERVAL = 1.0  # seconds between STOP file checks (fallback), and accept() wake-ups
+
+
+class Control:
+    def __init__(self, path, stop_file='STOP', stats=None, metrics=None, status=None,
+                 message="\n[STOP] Stop requested. Exiting loop..."):
+        # path: the socket (None: STOP file only); stats: {column: RunningStats};
+        # status: () -> dict added to the stats reply (e.g. per-device counts)
+        self.path = path
+        self.stop_file = stop_file
+        self.stats = stats or {}
+        self.metrics = metrics
+        self.status = status
+        self.message = message
+        self.settings = {}  # name -> [value, apply, minimum]
+        self.stopping = threading.Event()
+        self._closed = threading.Event()
+        self._pending = collections.deque()  # (command words, reply) for the loop thread
+        self._server = None
+        self._threads = []
+        self._signals = {}
+        self._start = time.monotonic()
+
+    def setting(self, name, value, apply, minimum=None):
+        # apply(value) runs on the loop thread; values sent by `set` are
+        # converted to the type of `value`
+        self.settings[name] = [value, apply, minimum]
+
+    def __call__(self):
+        # The stop condition: runs the queued commands, True once a stop was asked for
+        while self._pending:
+            words, reply = self._pending.popleft()
+            reply(self._execute(words))
+        if not self.stopping.is_set():
+            return False
+        if self.message:
+            print(self.message)
+            self.message = None
+        return True
+
+    def stop(self):
+        self.stopping.set()
+
+    # === Commands (loop thread) ===
+
+    def snapshot(self):
+        out = {'run_seconds': round(time.monotonic() - self._start, 3),
+               'stats': {col: {'n': s.n, 'mean': s.mean, 'std': s.std} for col, s in self.stats.items()}}
+        if self.metrics:
+            out.update(samples=self.metrics.samples, counters=dict(self.metrics.counters),
+                       gauges=dict(self.metrics.gauges))
+        if self.status:
+            out.update(self.status())
+        out['settings'] = self._values()
+        return out
+
+    def _values(self):
+        return {name: value for name, (value, _, _) in self.settings.items()}
+
+    def _set(self, name, text):
+        if name not in self.settings:
+            raise ValueError(f"Unknown setting '{name}', expected one of {list(self.settings)}")
+        old, apply, minimum = self.settings[name]
+        value = type(old)(text)
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"{name} must be at least {minimum}")
+        apply(value)
+        self.settings[name][0] = value
+
+    def _execute(self, words):
+        try:
+            if words[0] == 'stats':
+                return dict(ok=True, **self.snapshot())
+            if words[0] == 'set':
+                if len(words) != 3:
+                    raise ValueError("usage: set NAME VALUE")
+                self._set(words[1], words[2])
+            return {'ok': True, 'settings': self._values()}
+        except ValueError as e:
+            return {'ok': False, 'error': str(e)}
+
+    # === Requests (socket thread, signal handlers) ===
+
+    def request(self, words, timeout=REPLY_TIMEOUT):
+        # Runs a command on the loop thread and returns its reply
+        if not words or words[0] not in COMMANDS:
+            return {'ok': False, 'error': f"expected one of {COMMANDS}"}
+        if words[0] == 'stop':
+            self.stop()
+            return {'ok': True, 'stopping': True}
+        if self.stopping.is_set():
+            return {'ok': False, 'error': "stopping"}
+        done, box = threading.Event(), []
+        self._pending.append((words, lambda reply: (box.append(reply), done.set())))
+        if self._closed.is_set():
+            self._drain()  # the loop won't run it any more
+        if not done.wait(timeout):
+            return {'ok': False, 'error': f"no answer from the logger loop within {timeout} s"}
+        return box[0]
+
+    def _drain(self):
+        # Commands queued after the loop's last call: answered instead of
+        # leaving the client waiting for REPLY_TIMEOUT
+        while True:
+            try:
+                _, reply = self._pending.popleft()
+            except IndexError:
+                return
+            reply({'ok': False, 'error': "stopping"})
+
+    def _serve(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(REPLY_TIMEOUT)
+                    line = conn.makefile('r', encoding='utf-8').readline()
+                    conn.sendall((json.dumps(self.request(line.split())) + '\n').encode('utf-8'))
+                except OSError:
+                    pass  # the client went away
+
+    def _watch(self):
+        # Fallback: the STOP file, once a second
+        while not self._closed.wait(WATCH_INTERVAL):
+            if os.path.exists(self.stop_file):
+                self.message = f"\n[STOP] Detected '{self.stop_file}'. Exiting loop..."
+                self.stop()
+                return
+
+    def _print_stats(self, reply):
+        print(f"[STATS] {json.dumps(reply)}")
+
+    def _on_signal(self, signum, frame):
+        if signum == signal.SIGTERM:
+            self.stop()
+        else:
+            self._pending.append((['stats'], self._print_stats))
+
+    # === Setup ===
+
+    def _listen(self):
+        # The socket, or None (then the STOP file is watched)
+        if not self.path or not hasattr(socket, 'AF_UNIX'):
+            return None
+        if os.path.exists(self.path):
+            # left by a run that didn't shut down, unless a logger still answers on it
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.path)
+                except OSError:
+                    os.unlink(self.path)
+                else:
+                    print(f"[WARN] Another logger is listening on '{self.path}'.")
+                    return None
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(self.path)
+            server.listen()
+        except OSError as e:
+            server.close()
+            print(f"[WARN] No control socket at '{self.path}': {e}")
+            return None
+        server.settimeout(WATCH_INTERVAL)
+        return server
+
+    def start(self):
+        self._server = self._listen()
+        if self._server:
+            target, name = self._serve, 'control-socket'
+        elif self.stop_file:
+            target, name = self._watch, 'stop-file-watcher'
+        else:
+            target = None
+        if target:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, getattr(signal, 'SIGUSR1', None)):
+                if sig is not None:
+                    self._signals[sig] = signal.signal(sig, self._on_signal)
+        return self
+
+    def describe(self):
+        # How to stop the logger, for its start message
+        if self._server:
+            return f"'python -m utils.control {self.path} stop' or SIGTERM to stop"
+        return f"create file named '{self.stop_file}' to stop"
+
+    def close(self):
+        self._closed.set()
+        self._drain()
+        for sig, handler in self._signals.items():
+            signal.signal(sig, handler)
+        self._signals = {}
+        for thread in self._threads:
+            thread.join(timeout=2 * WATCH_INTERVAL)
+        self._threads = []
+        if self._server:
+            self._server.close()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def send(path, words, timeout=REPLY_TIMEOUT):
+    # One command to the logger listening on `path`; returns its reply
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((' '.join(words) + '\n').encode('utf-8'))
+        return json.loads(sock.makefile('r', encoding='utf-8').readline())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send a command to a running logger.")
+    parser.add_argument('socket', help="the logger's control socket, e.g. temp_log.ctl")
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('args', nargs='*', help="set: NAME VALUE")
+    parser.add_argument('--timeout', type=float, default=REPLY_TIMEOUT)
+    args = parser.parse_args()
+    reply = send(args.socket, [args.command] + args.args, args.timeout)
+    print(json.dumps(reply, indent=1))
+    raise SystemExit(0 if reply.get('ok') else 1)
@@ -0,0 +1,91 @@
+# csvlog.py
+#
+# Append-only CSV writer for the loggers.
+#
+# The file stays open for the whole run; rows are buffered in memory and only
+# the new rows are written out, every `flush_rows` rows or every
+# `flush_interval` seconds, whichever comes first. write_rows() can only
+# check the time when rows arrive, so the loop also calls poll() while idle
+# (Pipeline does, at least once per read timeout): rows never wait in the
+# buffer much longer than flush_interval, even when the sensor goes quiet.
+# A crash therefore loses at most one flush interval of data, instead of the
+# old "rewrite the whole history with pandas every N readings".
+#
+# fsync policy:
+#   'never' - leave it to the OS (fastest)
+#   'flush' - os.fsync after every flush (safest on SD cards / power loss)
+#   'close' - only fsync when the file is closed
+
+import csv
+import os
+import time
+
+FSYNC_POLICIES = ('never', 'flush', 'close')
+
+
+class AppendCSVWriter:
+    def __init__(self, filename, header, flush_rows=5, flush_interval=None,
+                 fsync='flush', append=False):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.filename = filename
+        self.header = list(header)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval  # seconds, None -> row count only
+        self.fsync = fsync
+        self.rows_written = 0
+
+        write_header = not (append and os.path.exists(filename) and os.path.getsize(filename) > 0)
+        self._file = open(filename, mode='a' if append else 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        if write_header:
+            self._writer.writerow(self.header)
+            self._sync()
+
+    def write_row(self, row):
+        self.write_rows((row,))
+
+    def write_rows(self, rows):
+        self._buffer.extend(rows)
+        if self.flush_rows and len(self._buffer) >= self.flush_rows:
+            self.flush()
+        elif self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def poll(self):
+        # Flushes buffered rows once flush_interval has passed, data or not
+        if self._buffer and self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def flush(self):
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        self._sync()
+        self._last_flush = time.monotonic()
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync == 'flush':
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        if self.fsync == 'close':
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
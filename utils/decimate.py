@@ -0,0 +1,173 @@
+# decimate.py
+#
+# Downsampling for time-series plots. A 100k-point run drawn into an 8 inch
+# wide PNG has far more points than pixels; these pick a subset that keeps the
+# visual shape, so render time and file size depend on the output width and
+# not on how long the logger has been running.
+#
+# Both functions return *indices* into the original arrays, so x, y, error
+# bars etc. can all be sliced the same way. Statistics and histograms should
+# keep using the full data.
+#
+#   minmax_indices - min and max of each bucket (fully vectorized, keeps spikes)
+#   lttb_indices   - Largest-Triangle-Three-Buckets (smoother looking lines)
+#
+# IncrementalDecimator does the same for a series that only grows (the live
+# plots): buckets of k samples, aligned from the first one, keep their min
+# and max; when there are too many, neighbouring buckets are merged and k
+# doubles (the min/max of two buckets is among theirs, so this is exact). An
+# update only reads the new samples and the kept ones, never the whole
+# history. 'lttb' runs on those kept points.
+
+import numpy as np
+
+
+def minmax_indices(y, n_buckets):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= 2 * n_buckets or n_buckets < 1:
+        return np.arange(n)
+
+    k = n // n_buckets  # samples per bucket; the remainder goes in one tail bucket
+    body = y[:k * n_buckets].reshape(n_buckets, k)
+    offsets = np.arange(n_buckets) * k
+    nan = np.isnan(body)
+    lo = np.argmin(np.where(nan, np.inf, body), axis=1) + offsets
+    hi = np.argmax(np.where(nan, -np.inf, body), axis=1) + offsets
+    idx = [lo, hi, [0, n - 1]]
+
+    tail = y[k * n_buckets:]
+    if len(tail) and not np.isnan(tail).all():
+        idx.append([k * n_buckets + np.nanargmin(tail), k * n_buckets + np.nanargmax(tail)])
+    return np.unique(np.concatenate(idx))
+
+
+def lttb_indices(x, y, n_out):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # first and last points are always kept; the rest is split in n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = np.nanmean(x[nxt]), np.nanmean(y[nxt])
+        else:
+            cx, cy = x[-1], y[-1]
+        # pick the point forming the largest triangle with the previous pick and that average
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        out[i + 1] = a
+    return out
+
+
+def decimate_indices(x, y, max_points, method='minmax'):
+    # max_points=None turns decimation off
+    if max_points is None or len(y) <= max_points:
+        return np.arange(len(y))
+    if method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    if method == 'minmax':
+        return minmax_indices(y, max_points // 2)
+    raise ValueError(f"Unknown decimation method: {method!r}")
+
+
+class IncrementalDecimator:
+    def __init__(self, max_points, method='minmax'):
+        if method not in ('minmax', 'lttb'):
+            raise ValueError(f"Unknown decimation method: {method!r}")
+        self.max_points = max_points
+        self.method = method
+        # buckets kept before merging: minmax draws two points per bucket,
+        # lttb picks max_points out of twice as many candidates
+        self.max_buckets = max(2, (max_points or 0) // 2 if method == 'minmax' else max_points or 0)
+        self.k = 1  # samples per bucket
+        self._pairs = np.empty((0, 2), dtype=np.int64)  # (argmin, argmax) of each full bucket
+        self._partial = None  # same for the bucket being filled, from len(_pairs) * k on
+        self._n = 0  # samples seen
+
+    def update(self, x, y):
+        # x, y: the whole series so far. Returns sorted indices to draw.
+        y = np.asarray(y, dtype=np.float64)
+        n = len(y)
+        if self.max_points is None:
+            return np.arange(n)
+        self._add(y, n)
+        if n <= self.max_points:
+            return np.arange(n)
+        idx = [[0, n - 1], self._pairs.ravel()] + ([self._partial] if self._partial is not None else [])
+        idx = np.unique(np.concatenate(idx))
+        if self.method == 'lttb':
+            idx = idx[lttb_indices(np.asarray(x, dtype=np.float64)[idx], y[idx], self.max_points)]
+        return idx
+
+    def _add(self, y, n):
+        pos = self._n
+        if n <= pos:
+            return
+        start = len(self._pairs) * self.k
+        end = min(n, start + self.k)
+        if pos < end:  # fill the partial bucket
+            self._partial = _combine(y, self._partial, _extremes(y, pos, end))
+            pos = end
+        if pos == start + self.k:
+            self._pairs = np.vstack((self._pairs, self._partial))
+            self._partial = None
+        full = (n - pos) // self.k
+        if full:  # the full buckets among the new samples, at once
+            block = y[pos:pos + full * self.k].reshape(full, self.k)
+            offsets = pos + np.arange(full) * self.k
+            lo = np.argmin(_low(block), axis=1) + offsets
+            hi = np.argmax(_high(block), axis=1) + offsets
+            self._pairs = np.vstack((self._pairs, np.column_stack((lo, hi))))
+            pos += full * self.k
+        if pos < n:
+            self._partial = _extremes(y, pos, n)
+        self._n = n
+        while len(self._pairs) >= self.max_buckets:
+            self._merge(y)
+
+    def _merge(self, y):
+        # Neighbouring buckets into one and k doubles; an odd last bucket
+        # becomes the start of the (now twice as long) partial bucket
+        pairs = self._pairs
+        if len(pairs) % 2:
+            self._partial = _combine(y, pairs[-1], self._partial)
+            pairs = pairs[:-1]
+        lo, hi = pairs[:, 0].reshape(-1, 2), pairs[:, 1].reshape(-1, 2)
+        lo = np.where(_low(y[lo[:, 0]]) <= _low(y[lo[:, 1]]), lo[:, 0], lo[:, 1])
+        hi = np.where(_high(y[hi[:, 0]]) >= _high(y[hi[:, 1]]), hi[:, 0], hi[:, 1])
+        self._pairs = np.column_stack((lo, hi))
+        self.k *= 2
+
+
+def _low(values):
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def _high(values):
+    return np.where(np.isnan(values), -np.inf, values)
+
+
+def _extremes(y, start, end):
+    # (argmin, argmax) of y[start:end], NaN ignored unless all of it is NaN
+    segment = y[start:end]
+    return np.array([start + np.argmin(_low(segment)), start + np.argmax(_high(segment))])
+
+
+def _combine(y, first, second):
+    # (argmin, argmax) of two consecutive ranges; ties go to the first, like argmin
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return np.array([first[0] if _low(y[first[0]]) <= _low(y[second[0]]) else second[0],
+                     first[1] if _high(y[first[1]]) >= _high(y[second[1]]) else second[1]])
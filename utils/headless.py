@@ -0,0 +1,34 @@
+# headless.py
+#
+# Deferred plotting imports, for a fast start on small, display-less hosts.
+#
+# matplotlib.pyplot takes ~0.7 s to import on a desktop and several seconds
+# on a Raspberry Pi, pandas ~0.4 s. The loggers need neither until
+# something is plotted, so their plot functions call pyplot() instead of
+# importing at module level; with HEADLESS set that happens once, at exit.
+# pyplot() always selects the non-GUI Agg backend: plots are only written to
+# file, from the plot worker thread.
+
+import threading
+
+
+def pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def deferred(factory, method):
+    # A function calling factory().<method>(...), with factory() run on the
+    # first call only. E.g. PlotWorker(deferred(LivePlot, 'update')) builds
+    # the figure on the plot thread, when the first plot is due.
+    lock = threading.Lock()
+    instance = []
+
+    def call(*args, **kwargs):
+        with lock:
+            if not instance:
+                instance.append(factory())
+        return getattr(instance[0], method)(*args, **kwargs)
+    return call
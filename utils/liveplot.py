@@ -0,0 +1,139 @@
+# liveplot.py
+#
+# Building blocks for "live" plots: the figure and its artists are created
+# once, and every cycle only the new samples are pushed in (set_data /
+# set_segments / stairs.set_data) before the figure is re-saved. No new
+# subplots, no re-histogramming of the whole history, no tight_layout per
+# cycle, so the plotting cost stays roughly flat over a long run.
+# Lines and error bars can also be decimated (max_points, see decimate.py):
+# the full data is kept, only the drawn subset is limited, and it is updated
+# incrementally (IncrementalDecimator) so an update costs the new samples
+# plus max_points, not the whole history.
+
+import numpy as np
+
+from utils.decimate import IncrementalDecimator
+from utils.samplestore import GrowingArray
+
+
+class IncrementalHistogram:
+    # Fixed-width bins whose counts are only ever added to. The bin width is
+    # picked from the first batch (same rules as np.histogram); the range
+    # grows by whole bins when new values fall outside it, and neighbouring
+    # bins are merged (width doubled) if that would exceed max_bins.
+    def __init__(self, bins=20, max_bins=None):
+        self.bins = bins
+        self.max_bins = max_bins or (bins * 4 if isinstance(bins, int) else 200)
+        self.lo = None
+        self.width = None
+        self.counts = None
+        self.n = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        if self.counts is None:
+            edges = np.histogram_bin_edges(values, self.bins)
+            self.lo = edges[0]
+            self.width = edges[1] - edges[0]
+            self.counts = np.zeros(len(edges) - 1)
+            while len(self.counts) > self.max_bins:
+                self._merge_pairs()
+
+        vmin, vmax = values.min(), values.max()
+        if vmin < self.lo:
+            extra = int(np.ceil((self.lo - vmin) / self.width))
+            self.counts = np.concatenate((np.zeros(extra), self.counts))
+            self.lo -= extra * self.width
+        hi = self.lo + self.width * len(self.counts)
+        if vmax >= hi:
+            extra = int(np.floor((vmax - hi) / self.width)) + 1
+            self.counts = np.concatenate((self.counts, np.zeros(extra)))
+        while len(self.counts) > self.max_bins:
+            self._merge_pairs()
+
+        idx = ((values - self.lo) // self.width).astype(np.int64)
+        idx = np.clip(idx, 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.n += values.size
+
+    def _merge_pairs(self):
+        counts = self.counts
+        if len(counts) % 2:
+            counts = np.append(counts, 0.0)
+        self.counts = counts[0::2] + counts[1::2]
+        self.width *= 2
+
+    @property
+    def edges(self):
+        return self.lo + self.width * np.arange(len(self.counts) + 1)
+
+    def density(self):
+        return self.counts / (self.n * self.width) if self.n else self.counts
+
+
+class GrowingErrorbar:
+    # errorbar() replacement that can be extended: a Line2D for the points and
+    # a LineCollection for the vertical bars.
+    def __init__(self, ax, fmt='o', color=None, ecolor=None, alpha=None, label=None,
+                 max_points=None, method='minmax'):
+        from matplotlib.collections import LineCollection  # imported with the first plot, not at startup
+        (self.line,) = ax.plot([], [], fmt, color=color, alpha=alpha, label=label)
+        self.bars = LineCollection([], colors=ecolor or self.line.get_color(), alpha=alpha,
+                                   zorder=self.line.get_zorder() - 0.1)  # bars under the points, like errorbar()
+        ax.add_collection(self.bars)
+        self.ax = ax
+        self.decimator = IncrementalDecimator(max_points, method)
+        self.x = GrowingArray()
+        self.y = GrowingArray()
+        self.segments = GrowingArray(width=2 * 2)
+
+    def extend(self, x, y, yerr):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        yerr = np.asarray(yerr, dtype=np.float64)
+        self.x.extend(x)
+        self.y.extend(y)
+        self.segments.extend(np.column_stack((x, y - yerr, x, y + yerr)))
+        idx = self.decimator.update(self.x.values, self.y.values)
+        self.line.set_data(self.x.values[idx], self.y.values[idx])
+        self.bars.set_segments(self.segments.values[idx].reshape(-1, 2, 2))
+        # Data limits only ever grow, so feed the new points instead of relim()
+        if len(x):
+            self.ax.update_datalim(np.column_stack((np.r_[x, x], np.r_[y - yerr, y + yerr])))
+
+
+class GrowingLine:
+    def __init__(self, ax, *args, max_points=None, method='minmax', **kwargs):
+        (self.line,) = ax.plot([], [], *args, **kwargs)
+        self.ax = ax
+        self.decimator = IncrementalDecimator(max_points, method)
+        self.x = GrowingArray()
+        self.y = GrowingArray()
+
+    def extend(self, x, y):
+        self.x.extend(x)
+        self.y.extend(y)
+        idx = self.decimator.update(self.x.values, self.y.values)
+        self.line.set_data(self.x.values[idx], self.y.values[idx])
+        if len(x):
+            self.ax.update_datalim(np.column_stack((x, y)))
+
+
+def update_histograms(ax, pairs, density=False):
+    # Redraw stairs() artists from their IncrementalHistograms and fit the
+    # axes to them (density can go down as well as up, so no datalim here).
+    # pairs: [(stairs, hist), ...]
+    lo, hi, top = np.inf, -np.inf, 0.0
+    for stairs, hist in pairs:
+        if hist.counts is None:
+            continue
+        values = hist.density() if density else hist.counts
+        edges = hist.edges
+        stairs.set_data(values, edges)
+        lo, hi, top = min(lo, edges[0]), max(hi, edges[-1]), max(top, values.max())
+    if lo < hi:
+        ax.set_xlim(lo, hi)
+        ax.set_ylim(0, top * 1.05 or 1.0)
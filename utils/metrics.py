@@ -0,0 +1,181 @@
+# metrics.py
+#
+# Per-stage latency and throughput instrumentation for the loggers.
+#
+#   metrics = Metrics('L23', interval=10, export_file='temp_log.metrics.jsonl')
+#   with metrics.stage('parse'):
+#       cols, _ = parser.parse_batch(batch)
+#   metrics.add_samples(len(cols['temperature_F']))
+#   metrics.gauge('queue_depth', reader.batches.qsize())
+#   metrics.counter('dropped_lines', reader.dropped_lines)
+#   metrics.maybe_report()  # prints/exports a summary every `interval` seconds
+#
+# Stage times are measured with time.perf_counter_ns around whole batches,
+# not single samples, so the overhead is one timer pair per stage per batch.
+# They go into fixed log-spaced histograms (1 us .. 100 s, 20 buckets per
+# decade, so percentiles are within ~12%), from which p50/p99 are read; the
+# max is exact.
+#
+# Every report prints one compact line for the interval just ended (rates and
+# percentiles over that interval) and, with export_file, appends the interval
+# and the run totals as one JSON object per line. close() writes the final
+# report, with percentiles over the whole run.
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS_PER_DECADE = 20
+MIN_EXP = -6  # 1 us
+MAX_EXP = 2  # 100 s
+N_BUCKETS = (MAX_EXP - MIN_EXP) * BUCKETS_PER_DECADE + 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds > 0:
+            i = int((math.log10(seconds) - MIN_EXP) * BUCKETS_PER_DECADE)
+            i = min(max(i, 0), N_BUCKETS - 1)
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        # Upper edge of the bucket holding the q-th percentile (capped at max)
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(10 ** (MIN_EXP + (i + 1) / BUCKETS_PER_DECADE), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50), 'p99': self.percentile(99), 'max': self.max}
+
+
+class Metrics:
+    def __init__(self, name, interval=10.0, export_file=None, out=print):
+        # interval: seconds between reports (None: only on report()/close())
+        # out: where the summary line goes (None to stay silent)
+        self.name = name
+        self.interval = interval
+        self.export_file = export_file
+        self.out = out
+        self.samples = 0
+        self.counters = {}  # cumulative totals, e.g. dropped lines
+        self.gauges = {}  # latest value, e.g. queue depth
+
+        self._lock = threading.Lock()  # stages may be recorded from worker threads
+        self._interval_hist = {}
+        self._total_hist = {}
+        self._start = self._last_report = time.monotonic()
+        self._last_samples = 0
+        self._last_counters = {}
+        if export_file:
+            open(export_file, 'w').close()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            hist = self._interval_hist.get(stage)
+            if hist is None:
+                hist = self._interval_hist[stage] = LatencyHistogram()
+                self._total_hist.setdefault(stage, LatencyHistogram())
+            hist.add(seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter_ns() - t0) / 1e9)
+
+    def timed(self, stage, func):
+        # func wrapped so every call is recorded under `stage` (e.g. the
+        # plot function run by PlotWorker on its own thread)
+        def wrapper(*args, **kwargs):
+            with self.stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def add_samples(self, n):
+        self.samples += n
+
+    def counter(self, name, total):
+        # Sets a cumulative counter (the caller's own running total)
+        self.counters[name] = total
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def maybe_report(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.interval is not None and now - self._last_report >= self.interval:
+            self.report(now)
+
+    def report(self, now=None, final=False):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            interval_hist, self._interval_hist = self._interval_hist, {}
+            for stage, hist in interval_hist.items():
+                self._total_hist[stage].merge(hist)
+            totals = {stage: hist.snapshot() for stage, hist in self._total_hist.items()}
+        seconds = now - self._last_report
+        samples = self.samples - self._last_samples
+        stages = {stage: hist.snapshot() for stage, hist in interval_hist.items()}
+        new_counts = {k: v - self._last_counters.get(k, 0) for k, v in self.counters.items()}
+        self._last_report, self._last_samples = now, self.samples
+        self._last_counters = dict(self.counters)
+
+        if self.out and final:  # whole run
+            self.out(self.format_line(self.samples, now - self._start, totals, self.counters, final))
+        elif self.out:
+            self.out(self.format_line(samples, seconds, stages, new_counts))
+        if self.export_file:
+            record = {'name': self.name, 'time': time.time(), 'final': final,
+                      'run_seconds': now - self._start, 'interval_seconds': seconds,
+                      'samples': samples, 'samples_per_s': samples / seconds if seconds > 0 else 0.0,
+                      'stages': stages, 'counters': dict(self.counters), 'gauges': dict(self.gauges),
+                      'total': {'samples': self.samples, 'stages': totals}}
+            with open(self.export_file, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def format_line(self, samples, seconds, stages, new_counts, final=False):
+        rate = samples / seconds if seconds > 0 else 0.0
+        parts = [f"[METRICS{' FINAL' if final else ''}] {self.name}: {samples} samples in {seconds:.1f} s "
+                 f"({rate:.1f}/s, total {self.samples})"]
+        for stage, s in stages.items():
+            parts.append(f"{stage} p50 {_ms(s['p50'])} p99 {_ms(s['p99'])} max {_ms(s['max'])}")
+        parts += [f"{k} {v:g}" for k, v in self.gauges.items()]
+        parts += [f"{k} {'' if final else '+'}{v}" for k, v in new_counts.items() if v]
+        return ' | '.join(parts)
+
+    def close(self):
+        self.report(final=True)
+
+
+def _ms(seconds):
+    return f"{seconds * 1e3:.2f}ms" if seconds < 10 else f"{seconds:.1f}s"
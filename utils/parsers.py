@@ -0,0 +1,283 @@
+# parsers.py
+#
+# Line parsers for the sketches' serial output, one per format, in a registry.
+#
+#   L23      "0.50,82.3"                        elapsed_min, temperature_F
+#   L12      "T = 23.0 C, H = 51.0 %"           temperature_C, humidity
+#   ADS1115  "AIN0: 12345\tVoltage: 2.3146875"  adc, voltage (ino_code_simple)
+#
+# Parsers work on raw bytes lines (as utils/serialreader.py hands them out)
+# and parse a whole batch at once into numpy arrays:
+#
+#   cols, bad = get_parser('L12').parse_batch(lines)  # {'temperature_C': array, ...}
+#
+# Fast path: the batch is joined into one bytes object, the fixed labels are
+# checked (once per line) and stripped in bulk, the field count of every line
+# is checked with numpy, and all numbers are converted by numpy in one go;
+# nothing runs per line in Python. Separators are blanked, not removed, so a
+# space inside a number ("1 2") still fails the conversion, and integer
+# columns must hold whole numbers within their dtype (no truncation or
+# wraparound). If anything is off, the valid lines are picked out with one
+# pass of the format's compiled, anchored regex and the bad ones (and those
+# out of range) are counted (parser.malformed), never raised or printed.
+# Blank lines are skipped and not counted.
+#
+# Run as a script for a benchmark against the old per-line parsing:
+#
+#   python -m utils.parsers [N]
+
+import re
+
+import numpy as np
+
+# A float as printed by Serial.print / Python, including nan and inf
+NUM = rb'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|nan|inf'
+_N = rb'(?:' + NUM + rb')'
+_S = rb'[ \t]*'
+
+PARSERS = {}
+
+
+def register(parser):
+    PARSERS[parser.name] = parser
+    return parser
+
+
+def get_parser(name):
+    # A fresh parser (own malformed counters) of a registered format
+    try:
+        proto = PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown line format {name!r}; expected one of {list(PARSERS)}") from None
+    return LineParser(proto.name, proto.pattern, proto.columns, proto.labels, proto.delete)
+
+
+class LineParser:
+    def __init__(self, name, pattern, columns, labels=(), delete=b' \t\r'):
+        # pattern: regex for one whole line, numbers written as NUM
+        # columns: {name: dtype}, in the order the numbers appear on the line
+        # labels: (text, replacement) pairs, each text exactly once per line;
+        #         together with delete (bytes blanked afterwards) they reduce
+        #         a valid line to comma-separated numbers
+        self.name = name
+        self.pattern = pattern
+        self.columns = {col: np.dtype(dtype) for col, dtype in columns.items()}
+        self.labels = tuple(labels)
+        self.delete = delete
+        self._blank = bytes.maketrans(delete, b' ' * len(delete))
+        self.line_re = re.compile(rb'^' + pattern + rb'$', re.MULTILINE)
+        self.parsed = 0
+        self.malformed = 0
+
+    def _in_range(self, values):
+        # Rows whose integer columns hold whole numbers that fit their dtype
+        ok = np.ones(len(values), dtype=bool)
+        for i, dtype in enumerate(self.columns.values()):
+            if dtype.kind in 'iu':
+                info, v = np.iinfo(dtype), values[:, i]
+                ok &= (v == np.floor(v)) & (v >= info.min) & (v <= info.max)
+        return ok
+
+    def _fast(self, lines, check=True):
+        # Whole batch at once -> ({column: array}, rows dropped as out of range).
+        # Raises ValueError if any line is off; check=False skips the structure
+        # checks for lines the regex passed and drops out-of-range rows instead.
+        n = len(lines)
+        joined = b'\n'.join(lines)
+        for text, replacement in self.labels:
+            if check and joined.count(text) != n:
+                raise ValueError(f"label {text!r} missing or repeated")
+            joined = joined.replace(text, replacement)
+        if self.delete:
+            joined = joined.translate(self._blank)
+
+        # Exactly one comma between consecutive numbers on every line
+        if check:
+            buf = np.frombuffer(joined, dtype=np.uint8)
+            commas = np.cumsum(buf == ord(','))
+            at_ends = np.append(commas[buf == ord('\n')], commas[-1])
+            if np.any(np.diff(at_ends, prepend=0) != len(self.columns) - 1):
+                raise ValueError("wrong number of fields")
+
+        # ValueError on anything that isn't a number
+        values = np.array(joined.replace(b'\n', b',').split(b','), dtype=np.float64)
+        values = values.reshape(n, len(self.columns))
+        ok = self._in_range(values)
+        dropped = n - int(np.count_nonzero(ok))
+        if dropped:
+            if check:
+                raise ValueError("integer field not whole or out of range")
+            values = values[ok]
+        return {col: values[:, i].astype(dtype, copy=False)
+                for i, (col, dtype) in enumerate(self.columns.items())}, dropped
+
+    def _empty(self):
+        return {col: np.empty(0, dtype=dtype) for col, dtype in self.columns.items()}
+
+    def matches(self, line):
+        # Whether a single line is valid in this format (not counted)
+        return self.line_re.match(line.strip()) is not None
+
+    def parse_batch(self, lines):
+        # lines: list of bytes (line endings optional).
+        # Returns ({column: array}, number of malformed lines in this batch).
+        if not all(lines):
+            lines = [line for line in lines if line]
+        bad = 0
+        try:
+            cols, _ = self._fast(lines) if lines else (self._empty(), 0)
+        except ValueError:
+            # Slow path: keep only the lines the compiled regex matches (and
+            # whose integers fit)
+            lines = [line.strip() for line in lines]
+            lines = [line for line in lines if line]
+            good = self.line_re.findall(b'\n'.join(lines))
+            cols, dropped = self._fast(good, check=False) if good else (self._empty(), 0)
+            bad = len(lines) - len(good) + dropped
+            lines = good[dropped:]  # only their count matters below
+        self.malformed += bad
+        self.parsed += len(lines)
+        return cols, bad
+
+    def parse_line(self, line):
+        # Single line -> tuple of values, or None (counted as malformed)
+        cols, bad = self.parse_batch((line,))
+        if bad or not len(next(iter(cols.values()))):
+            return None
+        return tuple(arr[0].item() for arr in cols.values())
+
+
+class LineDecoder:
+    # Byte stream -> parsed batches: feed() whatever the port returned, get
+    # the complete lines back as arrays (same interface as
+    # utils/binproto.FrameDecoder)
+    def __init__(self, parser):
+        self.parser = parser
+        self._buf = bytearray()
+        self._skip_partial = True
+
+    @property
+    def malformed(self):
+        return self.parser.malformed
+
+    def feed(self, data):
+        self._buf += data
+        end = self._buf.rfind(b'\n')
+        if end < 0:
+            return self.parser._empty()
+        chunk = bytes(self._buf[:end])
+        del self._buf[:end + 1]
+        lines = chunk.split(b'\n')
+        if self._skip_partial:
+            lines = lines[1:]  # whatever was in flight when the port opened
+            self._skip_partial = False
+        return self.parser.parse_batch(lines)[0]
+
+
+register(LineParser(
+    'L23',
+    _S + _N + _S + rb',' + _S + _N + _S,
+    {'elapsed_min': np.float64, 'temperature_F': np.float64},
+))
+
+register(LineParser(
+    'L12',
+    rb'T' + _S + rb'=' + _S + _N + _S + rb'C?' + _S + rb',' + _S + rb'H' + _S + rb'=' + _S + _N + _S + rb'%?' + _S,
+    {'temperature_C': np.float64, 'humidity': np.float64},
+    labels=((b'T', b''), (b'H', b'')),
+    delete=b'C=% \t\r',
+))
+
+register(LineParser(
+    'ADS1115',
+    rb'AIN0:' + _S + rb'[-+]?\d+' + rb'[ \t]+Voltage:' + _S + _N + _S,
+    {'adc': np.int16, 'voltage': np.float64},
+    labels=((b'AIN0:', b''), (b'Voltage:', b',')),
+))
+
+
+# === Benchmark ===
+
+def _legacy_l23(line):
+    parts = line.decode('utf-8').strip().split(',')
+    if len(parts) != 2:
+        raise ValueError(line)
+    return float(parts[0]), float(parts[1])
+
+
+def _legacy_l12(line):
+    line = line.decode('utf-8').strip()
+    if not ("T =" in line and "H =" in line):
+        raise ValueError(line)
+    temp_part, hum_part = line.split(',')
+    temp = float(temp_part.split('=')[1].strip().split(' ')[0])
+    hum = float(hum_part.split('=')[1].strip().replace('%', ''))
+    return temp, hum
+
+
+def _legacy_ads(line):
+    line = line.decode('utf-8').strip()
+    ain, volt = line.split('\t')
+    return int(ain.split(':')[1]), float(volt.split(':')[1])
+
+
+def sample_lines(name, n, malformed=0.0, seed=0):
+    # n synthetic lines in a sketch's format, a fraction of them garbage
+    rng = np.random.default_rng(seed)
+    if name == 'L23':
+        lines = [b'%.2f,%.1f' % (i / 30, t) for i, t in enumerate(rng.normal(75, 2, n))]
+    elif name == 'L12':
+        lines = [b'T = %.1f C, H = %.1f %%' % (t, h) for t, h in zip(rng.normal(23, 1, n), rng.normal(51, 3, n))]
+    elif name == 'ADS1115':
+        lines = [b'AIN0: %d\tVoltage: %.7f' % (a, a * 0.1875 / 1000) for a in rng.integers(0, 26000, n)]
+    else:
+        raise ValueError(name)
+    for i in np.flatnonzero(rng.random(n) < malformed):
+        lines[i] = lines[i][:len(lines[i]) // 2]  # truncated line
+    return lines
+
+
+def benchmark(n=100_000, batch=256, repeat=3):
+    import time
+
+    legacy = {'L23': _legacy_l23, 'L12': _legacy_l12, 'ADS1115': _legacy_ads}
+    results = []
+    for name in PARSERS:
+        for malformed in (0.0, 0.01):
+            lines = sample_lines(name, n, malformed)
+            batches = [lines[i:i + batch] for i in range(0, n, batch)]
+
+            def run_legacy():
+                for line in lines:
+                    try:
+                        legacy[name](line)
+                    except (ValueError, IndexError):
+                        pass
+
+            def run_batch():
+                parser = get_parser(name)
+                for b in batches:
+                    parser.parse_batch(b)
+
+            timings = {}
+            for label, func in (('legacy', run_legacy), ('batch', run_batch)):
+                best = float('inf')
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    func()
+                    best = min(best, time.perf_counter() - t0)
+                timings[label] = best
+            results.append({'format': name, 'n': n, 'batch': batch, 'malformed': malformed,
+                            'legacy_us_per_line': timings['legacy'] / n * 1e6,
+                            'batch_us_per_line': timings['batch'] / n * 1e6})
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{'format':8} {'malformed':>9} {'legacy us/line':>15} {'batch us/line':>14} {'speedup':>8}")
+    for r in benchmark(n):
+        print(f"{r['format']:8} {r['malformed']:9.0%} {r['legacy_us_per_line']:15.3f} "
+              f"{r['batch_us_per_line']:14.3f} {r['legacy_us_per_line'] / r['batch_us_per_line']:7.1f}x")
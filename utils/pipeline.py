@@ -0,0 +1,445 @@
+# pipeline.py
+#
+# The acquisition loop shared by the loggers, as a chain of stages:
+#
+#   source -> parse -> convert -> stats -> sinks
+#
+#   metrics = Metrics('L23', interval=10)
+#   store = SampleStore({'elapsed_min': np.float64, 'temperature_F': np.float64}, stats=('temperature_F',))
+#   Pipeline(
+#       serial_source(reader, stop=StopFile('STOP'), metrics=metrics),
+#       steps=[('parse', parse_lines(get_parser('L23'), metrics)),
+#              ('stats', track(store))],
+#       sinks=[CSVSink('temp_log.csv', 'L23'), PlotSink(plot, snapshot, every=5)],
+#       metrics=metrics,
+#   ).run()
+#
+# A source is a generator of batches: lists of raw lines (serial_source) or
+# already-parsed (t_ns, columns) pairs (scheduled_source). Each step is a
+# function batch -> batch (or None to drop it), chained as generators, and
+# every parsed batch - t_ns, an int64 array of epoch ns, and columns, a dict
+# of equally long arrays - is then handed to each sink's write(t_ns, columns)
+# in order; sinks with a poll() also get it on every pass of the loop, idle
+# ones included (time-based flushes). Everything works a batch at a time, so batching, buffering and
+# background sinks added here help every sensor. ingest_steps() puts an
+# optional Compressor (utils/compress.py) in front of the store and the
+# sinks, with the running stats still taken over every raw sample.
+#
+# Sources end on their stop condition, checked once per batch (a Control,
+# utils/control.py: socket command, SIGTERM or, as a fallback, the STOP file;
+# or a plain StopFile) or when the port fails; Ctrl-C also ends the run. Either way the source is
+# closed, rows still held by a step (compress) are passed on, and every sink
+# is flushed and closed.
+#
+# Steps, sinks and the source's waits are timed in `metrics`
+# (utils/metrics.py) under their names.
+
+import contextlib
+import os
+import time
+
+import numpy as np
+
+from utils.colstore import ColumnarWriter
+from utils.csvlog import AppendCSVWriter
+from utils.plotworker import PlotWorker
+from utils.samplestore import format_timestamps
+from utils.schemas import SCHEMAS, column_dtypes, header
+from utils.thermistor import CONVERTED_COLUMNS, convert_lut
+
+ADS_DECIMALS = (4, 4, 1, 2, 2, 2, 2, 2)  # CSV rounding of CONVERTED_COLUMNS, as the ADS logger always wrote them
+
+
+def _timer(metrics, stage):
+    return metrics.stage(stage) if metrics else contextlib.nullcontext()
+
+
+class StopFile:
+    # Stop condition: true once `filename` exists
+    def __init__(self, filename='STOP', message=None):
+        self.filename = filename
+        self.message = message if message is not None else f"\n[STOP] Detected '{filename}'. Exiting loop..."
+
+    def __call__(self):
+        if os.path.exists(self.filename):
+            if self.message:
+                print(self.message)
+            return True
+        return False
+
+
+# === Sources ===
+
+def open_serial(port, baudrate, parser, timeout=1.0, connect_timeout=10.0):
+    # Opens the port and waits for the first valid line instead of a fixed
+    # sleep for the Arduino reset. Returns (ser, bytes already read from that
+    # line on, to pass to SerialReader.start). Raises serial.SerialException.
+    import serial  # not needed by the sources that don't read a port
+
+    from utils.serialreader import wait_for_line
+
+    ser = serial.Serial(port, baudrate, timeout=timeout)
+    start = time.monotonic()
+    initial = wait_for_line(ser, parser.matches, timeout=connect_timeout)
+    if initial is None:
+        print(f"[WARN] No valid line from {port} within {connect_timeout} s, logging anyway.")
+        initial = b''
+    print(f"Connected to {port} at {baudrate} baud ({time.monotonic() - start:.2f} s).")
+    return ser, initial
+
+
+def serial_source(reader, stop=None, metrics=None, timeout=1.0):
+    # Batches of raw lines from a started SerialReader ([] when nothing
+    # arrived within `timeout`), until stop() or the reader fails. Stops the
+    # reader when done.
+    try:
+        while not (stop and stop()):
+            try:
+                with _timer(metrics, 'read'):
+                    batch = reader.get_batch(timeout=timeout)
+            except EOFError as e:
+                print(f"[ERROR] Serial reader stopped: {e}")
+                return
+            if metrics:
+                metrics.gauge('queue_depth', reader.batches.qsize())
+                metrics.counter('dropped_lines', reader.dropped_lines)
+            yield batch
+    finally:
+        reader.stop()
+        if reader.overruns:
+            print(f"[WARN] Serial overruns: {reader.dropped_bytes} bytes, {reader.dropped_lines} lines dropped.")
+
+
+def scheduled_source(read, scheduler, burst, column, stop=None, metrics=None, dtype=None, start_ns=None):
+    # Bursts of `burst` read() values on the scheduler's deadline grid (see
+    # utils/scheduler.py) as (t_ns, {'elapsed_min': ..., column: values}),
+    # until stop() (checked after each burst)
+    start_ns = time.time_ns() if start_ns is None else start_ns
+    while True:
+        with _timer(metrics, 'acquire'):
+            t_ns, values = scheduler.burst(read, burst, dtype=dtype)
+        if metrics:
+            metrics.counter('missed_deadlines', scheduler.missed)
+            metrics.gauge('max_lateness_ms', round(scheduler.max_lateness * 1e3, 3))
+        yield t_ns, {'elapsed_min': (t_ns - start_ns) / 60e9, column: values}
+        if stop and stop():
+            return
+
+
+# === Steps ===
+
+def parse_lines(parser, metrics=None):
+    # Raw lines -> (t_ns, columns); every row gets the batch's arrival time.
+    # Malformed lines are only counted (parser.malformed).
+    def parse(lines):
+        if not lines:
+            return None
+        columns, _ = parser.parse_batch(lines)
+        if metrics:
+            metrics.counter('malformed', parser.malformed)
+        n = len(next(iter(columns.values())))
+        if not n:
+            return None
+        return np.full(n, time.time_ns(), dtype=np.int64), columns
+    return parse
+
+
+def host_elapsed(start_ns=None):
+    # Adds 'elapsed_min' (minutes since start_ns, host clock) for sketches
+    # that don't send their own
+    start_ns = time.time_ns() if start_ns is None else start_ns
+
+    def add(batch):
+        t_ns, columns = batch
+        return t_ns, {'elapsed_min': (t_ns - start_ns) / 60e9, **columns}
+    return add
+
+
+def convert_adc(convert=convert_lut):
+    # Adds the thermistor columns (CONVERTED_COLUMNS) derived from 'adc'
+    def add(batch):
+        t_ns, columns = batch
+        return t_ns, {**columns, **convert(columns['adc'])}
+    return add
+
+
+def running_stats(stats, metrics=None):
+    # Updates {column: RunningStats} with the batch; the means are reported
+    # as avg_<column>
+    def update(batch):
+        t_ns, columns = batch
+        for col, col_stats in stats.items():
+            col_stats.extend(columns[col])
+            if metrics:
+                metrics.gauge(f'avg_{col}', round(col_stats.mean, 2))
+        return batch
+    return update
+
+
+def track(store, metrics=None, stats=True):
+    # Appends the batch to a SampleStore (its columns only), which also keeps
+    # the running statistics; their means are reported as avg_<column>.
+    # stats=False: store only, the stats were taken earlier (ingest_steps).
+    def extend(batch):
+        t_ns, columns = batch
+        store.extend(t_ns, update_stats=stats, **{col: columns[col] for col in store.columns})
+        if metrics and stats:
+            for col, col_stats in store.stats.items():
+                metrics.gauge(f'avg_{col}', round(col_stats.mean, 2))
+        return batch
+    return extend
+
+
+def compress(compressor, metrics=None):
+    # Runs a Compressor (utils/compress.py); the rows it drops are counted
+    # as 'compressed_out'
+    def step(batch):
+        batch = compressor(batch)
+        if metrics:
+            metrics.counter('compressed_out', compressor.seen - compressor.kept)
+        return batch
+    step.flush = compressor.flush  # the row it holds back, see Pipeline._flush
+    return step
+
+
+def ingest_steps(store, metrics=None, compressor=None, stats=None):
+    # The steps that keep the samples: track(store), or the running stats
+    # (the store's, or `stats`) over every raw sample first and then the
+    # store; with a compressor only the rows it keeps go on to the store and
+    # the sinks, so anything drawn from the store (the plots, with their
+    # histograms and error bars) covers the kept rows only
+    if compressor is None and stats is None:
+        return [('stats', track(store, metrics))]
+    steps = [('stats', running_stats(store.stats if stats is None else stats, metrics))]
+    if compressor is not None:
+        steps.append(('compress', compress(compressor, metrics)))
+    return steps + [('store', track(store, stats=False))]
+
+
+# === Sinks ===
+
+class CSVSink:
+    # Rows of one of the utils/schemas.py layouts. 'elapsed_min' is taken
+    # from the batch, or counted from the sink's creation if the batch has none.
+    name = 'csv'
+
+    def __init__(self, filename, schema, flush_rows=5, flush_interval=30, fsync='flush', append=False):
+        self.filename = filename
+        self.schema = schema
+        self.columns = [col for col, _ in SCHEMAS[schema]['columns'].values()]
+        self.time_format = SCHEMAS[schema]['time_format']
+        self.writer = AppendCSVWriter(filename, header(schema), flush_rows=flush_rows,
+                                      flush_interval=flush_interval, fsync=fsync, append=append)
+        self.start_ns = time.time_ns()
+
+    def _elapsed(self, t_ns, columns):
+        if 'elapsed_min' in columns:
+            return columns['elapsed_min']
+        return (np.asarray(t_ns) - self.start_ns) / 60e9
+
+    def poll(self):
+        self.writer.poll()
+
+    def write(self, t_ns, columns):
+        values = [self._elapsed(t_ns, columns) if col == 'elapsed_min' else columns[col] for col in self.columns]
+        timestamps = format_timestamps(t_ns, self.time_format)
+        self.writer.write_rows([ts, *row] for ts, row in zip(timestamps, zip(*(np.asarray(v).tolist() for v in values))))
+
+    def close(self):
+        self.writer.close()
+
+
+class ADSSink(CSVSink):
+    # thermistor_data.csv layout (the date comes second). The derived columns
+    # are taken from the batch (convert_adc) or computed here from 'adc'.
+    def __init__(self, filename, convert=convert_lut, **kwargs):
+        super().__init__(filename, 'ADS1115', **kwargs)
+        self.convert = convert
+
+    def write(self, t_ns, columns):
+        converted = columns if CONVERTED_COLUMNS[0] in columns else self.convert(columns['adc'])
+        values = [np.round(self._elapsed(t_ns, columns), 2)]
+        values += [np.round(converted[col], d) for col, d in zip(CONVERTED_COLUMNS, ADS_DECIMALS)]
+        timestamps = format_timestamps(t_ns, self.time_format)
+        rows = zip(*(v.tolist() for v in values))
+        self.writer.write_rows([elapsed, ts, *rest] for ts, (elapsed, *rest) in zip(timestamps, rows))
+
+
+class ColumnarSink:
+    # Chunked .npy columns (utils/colstore.py) of a schema; the batch's
+    # columns are looked up by short name, then by CSV name. extra:
+    # {column: dtype} stored as well, taken from the batch by name (e.g. the
+    # ADS logger's raw 'adc' counts, which its CSV doesn't keep)
+    name = 'columnar'
+
+    def __init__(self, path, schema, chunk_rows=1000, extra=None, **kwargs):
+        self.path = path
+        self.names = {col: csv_name for csv_name, (col, _) in SCHEMAS[schema]['columns'].items()}
+        self.names.update((col, col) for col in extra or {})
+        self.writer = ColumnarWriter(path, {**column_dtypes(schema), **(extra or {})}, chunk_rows=chunk_rows, **kwargs)
+
+    def write(self, t_ns, columns):
+        self.writer.extend(t_ns, **{col: columns[col] if col in columns else columns[csv_name]
+                                    for col, csv_name in self.names.items()})
+
+    def poll(self):
+        self.writer.poll()
+
+    def close(self):
+        self.writer.close()
+
+
+class PrintSink:
+    # Prints format_rows(t_ns, columns) -> iterable of lines (readings on the console)
+    name = 'print'
+
+    def __init__(self, format_rows):
+        self.format_rows = format_rows
+
+    def write(self, t_ns, columns):
+        for line in self.format_rows(t_ns, columns):
+            print(line)
+
+    def close(self):
+        pass
+
+
+class PlotSink:
+    # Re-plots every `every` samples on a PlotWorker thread (rate-limited to
+    # one render per min_interval seconds, stale snapshots dropped).
+    # snapshot() -> (args, kwargs) for plot_func; it is taken on the loop
+    # thread, so it must copy what the loop keeps appending to.
+    # headless: no plots while logging, plot_func runs once, on close().
+    name = 'submit_plot'
+
+    def __init__(self, plot_func, snapshot, every=1, min_interval=0.0, headless=False, metrics=None):
+        self.plot_func = metrics.timed('plot', plot_func) if metrics else plot_func
+        self.snapshot = snapshot
+        self.every = every
+        self.metrics = metrics
+        self.samples = 0
+        self.worker = None if headless else PlotWorker(self.plot_func, min_interval=min_interval)
+
+    def _submit(self):
+        args, kwargs = self.snapshot()
+        self.worker.submit(*args, **kwargs)
+        if self.metrics:
+            self.metrics.counter('plots_skipped', self.worker.dropped)
+
+    def write(self, t_ns, columns):
+        before, self.samples = self.samples, self.samples + len(t_ns)
+        if self.worker and self.samples // self.every > before // self.every:
+            self._submit()
+
+    def close(self):
+        if self.worker:
+            self._submit()
+            self.worker.close()  # waits for the final plot
+        else:
+            args, kwargs = self.snapshot()
+            self.plot_func(*args, **kwargs)
+
+
+def control_settings(control, sinks, save_interval, plot_interval):
+    # The loggers' live settings on a Control (utils/control.py):
+    # save_interval - rows per CSV flush and per plot; plot_interval - least
+    # seconds between plot renders
+    def set_save_interval(n):
+        for sink in sinks:
+            if isinstance(sink, CSVSink):
+                sink.writer.flush_rows = n
+            elif isinstance(sink, PlotSink):
+                sink.every = n
+
+    def set_plot_interval(seconds):
+        for sink in sinks:
+            if isinstance(sink, PlotSink) and sink.worker:
+                sink.worker.min_interval = seconds
+
+    control.setting('save_interval', int(save_interval), set_save_interval, minimum=1)
+    control.setting('plot_interval', float(plot_interval), set_plot_interval, minimum=0)
+
+
+# === Running ===
+
+class Pipeline:
+    def __init__(self, source, steps=(), sinks=(), metrics=None):
+        # steps: [(name, func)], func(batch) -> batch or None to drop it
+        self.source = source
+        self.steps = list(steps)
+        self.sinks = list(sinks)
+        self.metrics = metrics
+        self.samples = 0
+
+    def _apply(self, batches, name, func):
+        try:
+            for batch in batches:
+                if batch is not None:
+                    with _timer(self.metrics, name):
+                        batch = func(batch)
+                yield batch  # None too, so the loop below still runs while idle
+        finally:
+            batches.close()
+
+    def _write(self, batch):
+        t_ns, columns = batch
+        self.samples += len(t_ns)
+        if self.metrics:
+            self.metrics.add_samples(len(t_ns))
+        for sink in self.sinks:
+            with _timer(self.metrics, sink.name):
+                sink.write(t_ns, columns)
+
+    def _flush(self):
+        # Once the source has ended: rows held back by steps with a flush()
+        # (compress), through the steps after them to the sinks
+        for i, (_, func) in enumerate(self.steps):
+            batch = func.flush() if hasattr(func, 'flush') else None
+            for name, later in self.steps[i + 1:]:
+                if batch is not None:
+                    with _timer(self.metrics, name):
+                        batch = later(batch)
+            if batch is not None:
+                self._write(batch)
+
+    def run(self):
+        batches = self.source
+        for name, func in self.steps:
+            batches = self._apply(batches, name, func)
+        polled = [sink for sink in self.sinks if hasattr(sink, 'poll')]
+        try:
+            try:
+                for batch in batches:
+                    if batch is not None:
+                        self._write(batch)
+                    for sink in polled:  # time-based flushes, also while idle
+                        sink.poll()
+                    if self.metrics:
+                        self.metrics.maybe_report()
+            except KeyboardInterrupt:
+                print("\n[INTERRUPT] KeyboardInterrupt received. Exiting...")
+            batches.close()
+            self._flush()
+        finally:
+            batches.close()
+            self._close()
+        return self.samples
+
+    def _close(self):
+        # Every sink gets closed (and flushed) even if another one fails,
+        # e.g. a full disk under the CSV doesn't lose the columnar rows
+        error = None
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except OSError as e:
+                print(f"[ERROR] Closing the {getattr(sink, 'name', type(sink).__name__)} sink failed: {e}")
+                error = error or e
+        if self.metrics:
+            try:
+                self.metrics.close()
+            except OSError as e:
+                print(f"[ERROR] Closing the metrics failed: {e}")
+                error = error or e
+        if error is not None:
+            raise error
@@ -0,0 +1,77 @@
+# plotworker.py
+#
+# Runs a plot function on a background thread so the acquisition loop never
+# waits for matplotlib.
+#
+# The loop hands over a snapshot with submit(...) and goes straight back to
+# reading. Only the latest snapshot is kept: if rendering falls behind, older
+# pending requests are dropped (and counted), and renders are spaced at least
+# `min_interval` seconds apart. Use a non-GUI backend (Agg) when plotting from
+# this thread.
+
+import threading
+import time
+
+
+class PlotWorker:
+    def __init__(self, plot_func, min_interval=0.0, name='plot-worker'):
+        self.plot_func = plot_func
+        self.min_interval = min_interval
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0  # snapshots replaced before they were rendered
+        self.errors = 0
+
+        self._cond = threading.Condition()
+        self._pending = None  # (args, kwargs) of the latest snapshot
+        self._stopping = False
+        self._last_render = float('-inf')
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, *args, **kwargs):
+        # Never blocks: replaces any snapshot that hasn't been rendered yet.
+        # Pass copies of anything the caller keeps appending to.
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (args, kwargs)
+            self.submitted += 1
+            self._cond.notify()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._pending is None:
+                    if self._stopping:
+                        return None
+                    self._cond.wait()
+                    continue
+                # Rate limit; newer submissions keep replacing _pending meanwhile
+                wait = self._last_render + self.min_interval - time.monotonic()
+                if wait > 0 and not self._stopping:
+                    self._cond.wait(wait)
+                    continue
+                job, self._pending = self._pending, None
+                return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            args, kwargs = job
+            self._last_render = time.monotonic()
+            try:
+                self.plot_func(*args, **kwargs)
+                self.rendered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[WARN] Plot failed: {e}")
+
+    def close(self, timeout=None):
+        # Renders whatever is still pending, then stops the thread
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
@@ -0,0 +1,237 @@
+# reprocess.py
+#
+# Batch reprocessing of archived ADS1115 runs after a change of thermistor
+# constants: the derived columns (R_therm, Temp_SH, Temp_Beta) are recomputed
+# from the stored voltage and the plot is redrawn, one file per process.
+#
+#   python -m utils.reprocess ADS115_thermistor/python/sample/thermistor_data.csv
+#   python -m utils.reprocess runs/*/thermistor_data.csv --set BETA=3977 R_FIXED=9960 --jobs 4
+#   python -m utils.reprocess runs/*/thermistor_data.csv --source R_therm   # keep the stored R_therm
+#
+# Each input goes to <out-dir>/<name>.csv (default: a 'reprocessed' directory
+# next to it) with the plot, <name>.png, in the logger's layout
+# (plot_data_from_csv). With --out-dir the inputs' directories are mirrored
+# under it, relative to their common parent, so run1/log.csv and run2/log.csv
+# go to <out-dir>/run1/log.csv and <out-dir>/run2/log.csv. Inputs are never
+# modified.
+#
+# Files are skipped when nothing they depend on changed: the cache (--cache)
+# records, per output, a hash of the input's content, the constants, the
+# options and VERSION. Hashing runs in the worker processes too, so a batch
+# of unchanged files costs one read of each. An interrupted batch resumes
+# where it stopped, the cache is saved after every file.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from utils import thermistor
+from utils.csvlog import AppendCSVWriter
+from utils.pipeline import ADS_DECIMALS
+from utils.schemas import detect_schema
+from utils.thermistor import CONVERTED_COLUMNS, CSV_HEADER, R_therm_to_temps, voltage_to_R_therm
+
+VERSION = 1  # bump when the conversion or the plot changes, to redo every file
+CONSTANTS = ('R_FIXED', 'Vcc', 'A', 'B', 'C', 'R0', 'T0', 'BETA')  # names in utils/thermistor.py
+SOURCES = ('voltage', 'R_therm')  # what the derived columns are recomputed from
+CACHE_FILENAME = '.reprocess_cache.json'
+HASH_BLOCK = 1 << 20
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADS_LOGGER = os.path.join('ADS115_thermistor', 'python', 'logger.py')
+
+_logger = None  # the ADS logger script, loaded once per worker for its plot
+
+
+def default_constants():
+    return {name: getattr(thermistor, name) for name in CONSTANTS}
+
+
+def file_digest(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(input_digest, constants, source, plot):
+    options = {'input': input_digest, 'constants': constants, 'source': source, 'plot': plot, 'version': VERSION}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def outputs(csv_file, out_dir=None, plot=True, root=None):
+    # root: the directory mirrored under out_dir (default: the input's own)
+    if out_dir is None:
+        out_dir = os.path.join(os.path.dirname(csv_file), 'reprocessed')
+    elif root is not None:
+        out_dir = os.path.normpath(os.path.join(out_dir, os.path.relpath(os.path.dirname(os.path.abspath(csv_file)), root)))
+    base = os.path.join(out_dir, os.path.splitext(os.path.basename(csv_file))[0])
+    return [base + '.csv'] + ([base + '.png'] if plot else [])
+
+
+def load_cache(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_cache(filename, cache):
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, filename)
+
+
+def recompute(frame, constants, source='voltage'):
+    # {CONVERTED_COLUMNS: array} of a chunk of the ADS CSV, with `constants`
+    voltage = frame['Voltage (V)'].to_numpy(dtype=np.float64)
+    if source == 'voltage':
+        R_therm = voltage_to_R_therm(voltage, constants['R_FIXED'], constants['Vcc'])
+    else:
+        R_therm = frame['R_therm (Ohms)'].to_numpy(dtype=np.float64)
+    temps = R_therm_to_temps(R_therm, constants['A'], constants['B'], constants['C'],
+                             constants['R0'], constants['T0'], constants['BETA'])
+    return dict(zip(CONVERTED_COLUMNS, (voltage, R_therm) + temps))
+
+
+def _plot(csv_file, plot_filename):
+    global _logger
+    if _logger is None:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location('ads_logger', os.path.join(REPO_ROOT, ADS_LOGGER))
+        _logger = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_logger)
+    _logger.plot_data_from_csv(csv_file, plot_filename)
+
+
+def reprocess_file(csv_file, out_dir=None, constants=None, source='voltage', plot=True,
+                   chunk_rows=100_000, cached_key=None, root=None):
+    # Recomputes one file unless its cache key is `cached_key` and its
+    # outputs exist. Returns {'file', 'key', 'status', 'outputs', 'rows', 'seconds'}.
+    import pandas as pd
+
+    start = time.perf_counter()
+    constants = constants or default_constants()
+    files = outputs(csv_file, out_dir, plot, root)
+    key = cache_key(file_digest(csv_file), constants, source, plot)
+    result = {'file': csv_file, 'key': key, 'outputs': files, 'rows': 0}
+    if key == cached_key and all(os.path.exists(f) for f in files):
+        return dict(result, status='skipped', seconds=time.perf_counter() - start)
+
+    with open(csv_file) as f:
+        schema = detect_schema(f.readline().strip().split(','))
+    if schema != 'ADS1115':
+        raise ValueError(f"{csv_file}: {schema} log, only ADS1115 runs have derived columns")
+
+    # numbers as float (a corrupt row fails the file, instead of turning a column into text)
+    dtypes = {col: str if col == 'Date' else np.float64 for col in CSV_HEADER}
+    os.makedirs(os.path.dirname(files[0]) or '.', exist_ok=True)
+    tmp = files[0] + '.tmp'
+    try:
+        with AppendCSVWriter(tmp, CSV_HEADER, flush_rows=10_000, fsync='close') as writer:
+            for frame in pd.read_csv(csv_file, chunksize=chunk_rows, dtype=dtypes):
+                converted = recompute(frame, constants, source)
+                values = [frame['Elapsed Time (min)'].to_numpy()]
+                values += [np.round(converted[col], d) for col, d in zip(CONVERTED_COLUMNS, ADS_DECIMALS)]
+                rows = zip(*(v.tolist() for v in values))
+                writer.write_rows([elapsed, date, *rest] for date, (elapsed, *rest) in zip(frame['Date'].tolist(), rows))
+                result['rows'] += len(frame)
+    except BaseException:
+        os.remove(tmp)  # no half-written output
+        raise
+    os.replace(tmp, files[0])
+    if plot:
+        _plot(files[0], files[1])
+    return dict(result, status='done', seconds=time.perf_counter() - start)
+
+
+def _task(args):
+    csv_file, kwargs = args
+    try:
+        return reprocess_file(csv_file, **kwargs)
+    except Exception as e:  # one bad file doesn't stop the batch
+        return {'file': csv_file, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+
+
+def reprocess(csv_files, out_dir=None, constants=None, source='voltage', plot=True, jobs=None,
+              chunk_rows=100_000, cache_file=CACHE_FILENAME, force=False):
+    # Reprocesses csv_files on `jobs` processes (default: one per CPU),
+    # largest first. Returns the per-file results.
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source '{source}', expected one of {SOURCES}")
+    constants = dict(default_constants(), **(constants or {}))
+    cache = {} if force else load_cache(cache_file)
+    csv_files = sorted(csv_files, key=os.path.getsize, reverse=True)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in csv_files]) if csv_files else None
+    # Two inputs writing the same output would race in the pool (the same file given twice)
+    targets = {}
+    for csv_file in csv_files:
+        target = os.path.abspath(outputs(csv_file, out_dir, plot, root)[0])
+        if target in targets:
+            raise ValueError(f"{targets[target]} and {csv_file} would both be reprocessed to {target}")
+        targets[target] = csv_file
+    tasks = []
+    for target, csv_file in targets.items():
+        cached = cache.get(target, {})
+        tasks.append((csv_file, {'out_dir': out_dir, 'constants': constants, 'source': source, 'plot': plot,
+                                 'chunk_rows': chunk_rows, 'cached_key': cached.get('key'), 'root': root}))
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks)) or 1
+    start = time.perf_counter()
+    results = []
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    try:
+        for result in (pool.imap_unordered(_task, tasks) if pool else map(_task, tasks)):
+            results.append(result)
+            if result['status'] == 'failed':
+                print(f"{result['file']}: failed, {result['error']}")
+                continue
+            if result['status'] == 'done':
+                print(f"{result['file']}: {result['rows']} rows in {result['seconds']:.2f} s -> "
+                      f"{', '.join(result['outputs'])}")
+            else:
+                print(f"{result['file']}: unchanged, skipped")
+            cache[os.path.abspath(result['outputs'][0])] = {'file': os.path.abspath(result['file']), 'key': result['key']}
+            save_cache(cache_file, cache)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    counts = {status: sum(r['status'] == status for r in results) for status in ('done', 'skipped', 'failed')}
+    print(f"{counts['done']} reprocessed, {counts['skipped']} skipped, {counts['failed']} failed "
+          f"in {time.perf_counter() - start:.2f} s ({jobs} process{'es' if jobs > 1 else ''})")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def constant(text):
+        name, sep, value = text.partition('=')
+        if not sep or name not in CONSTANTS:
+            raise argparse.ArgumentTypeError(f"expected NAME=value with NAME one of {', '.join(CONSTANTS)}")
+        return name, float(value)
+
+    parser = argparse.ArgumentParser(description="Recompute the derived columns and plots of archived ADS1115 "
+                                                 "runs with new thermistor constants, in parallel.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--set', type=constant, nargs='*', default=[], metavar='NAME=VALUE',
+                        help=f"constants to change ({', '.join(CONSTANTS)}), the rest as in utils/thermistor.py")
+    parser.add_argument('--source', choices=SOURCES, default='voltage',
+                        help="recompute from the stored voltage (R_FIXED/Vcc apply) or the stored R_therm")
+    parser.add_argument('--out-dir', help="where the outputs go (default: reprocessed/ next to each CSV)")
+    parser.add_argument('--jobs', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--cache', default=CACHE_FILENAME, help="hash cache of the files already done")
+    parser.add_argument('--force', action='store_true', help="ignore the cache, redo every file")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+    results = reprocess(args.csv_files, args.out_dir, dict(args.set), args.source, not args.no_plot, args.jobs,
+                        args.chunk_rows, args.cache, args.force)
+    raise SystemExit(1 if any(r['status'] == 'failed' for r in results) else 0)
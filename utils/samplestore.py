@@ -0,0 +1,155 @@
+# samplestore.py
+#
+# Compact, optionally bounded storage for logger samples.
+#
+# Instead of growing Python lists of boxed floats and preformatted strftime
+# strings (100+ bytes per sample), each column is a typed numpy array and the
+# wall-clock time is kept as int64 nanoseconds since the epoch; date strings
+# are only produced when a row is written out (format_timestamp).
+#
+# With max_rows set, the oldest chunk_rows rows are spilled to .npz files in
+# spill_dir whenever the in-memory part grows past the cap. Running stats are
+# updated on append, so they stay exact over everything ever logged.
+
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.stats import RunningStats
+
+
+class GrowingArray:
+    # numpy array with amortized O(1) appends; .values is a view, no copy
+    def __init__(self, width=None, dtype=np.float64, capacity=1024):
+        shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.empty(shape, dtype=dtype)
+        self._n = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        need = self._n + len(values)
+        if need > len(self._data):
+            capacity = max(need, 2 * len(self._data))
+            grown = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            grown[:self._n] = self._data[:self._n]
+            self._data = grown
+        self._data[self._n:need] = values
+        self._n = need
+
+    def append(self, value):
+        if self._n == len(self._data):
+            self.extend([value])
+            return
+        self._data[self._n] = value
+        self._n += 1
+
+    def drop_front(self, n):
+        # Forget the first n values (keeps the allocated capacity)
+        n = min(n, self._n)
+        self._data[:self._n - n] = self._data[n:self._n]
+        self._n -= n
+
+    @property
+    def values(self):
+        return self._data[:self._n]
+
+    def __len__(self):
+        return self._n
+
+
+def format_timestamp(t_ns, fmt='%Y-%m-%d %H:%M:%S'):
+    return datetime.fromtimestamp(int(t_ns) / 1e9).strftime(fmt)
+
+
+def format_timestamps(t_ns, fmt='%Y-%m-%d %H:%M:%S'):
+    # format_timestamp for an array, one strftime per distinct second
+    seconds, inverse = np.unique(np.asarray(t_ns, dtype=np.int64) // 1_000_000_000, return_inverse=True)
+    texts = [datetime.fromtimestamp(s).strftime(fmt) for s in seconds.tolist()]
+    return [texts[i] for i in inverse.tolist()]
+
+
+class SampleStore:
+    def __init__(self, columns, stats=(), max_rows=None, chunk_rows=None,
+                 spill_dir='spill', name='samples'):
+        # columns: {name: dtype}; stats: column names to keep RunningStats for
+        self.dtypes = {col: np.dtype(dtype) for col, dtype in columns.items()}
+        self.t_ns = GrowingArray(dtype=np.int64)
+        self.columns = {col: GrowingArray(dtype=dtype) for col, dtype in self.dtypes.items()}
+        self.stats = {col: RunningStats() for col in stats}
+        self.max_rows = max_rows
+        self.chunk_rows = chunk_rows if chunk_rows is not None else (max(1, max_rows // 2) if max_rows else None)
+        if self.chunk_rows is not None and self.chunk_rows < 1:
+            raise ValueError(f"chunk_rows must be at least 1, got {chunk_rows}")
+        self.spill_dir = spill_dir
+        self.name = name
+        self.spilled = []  # .npz files holding the oldest rows, in order
+        self.first = 0  # run-wide index of the first row still in memory
+        self.total = 0  # rows ever appended
+
+    def append(self, t_ns=None, **values):
+        self.t_ns.append(time.time_ns() if t_ns is None else t_ns)
+        for col, arr in self.columns.items():
+            arr.append(values[col])
+        for col, stats in self.stats.items():
+            stats.update(values[col])
+        self.total += 1
+        if self.max_rows and len(self.t_ns) > self.max_rows:
+            self._spill()
+
+    def extend(self, t_ns, update_stats=True, **values):
+        # update_stats=False: the stats were already given these rows (or more,
+        # when only some of the rows are stored, see utils/compress.py)
+        self.t_ns.extend(t_ns)
+        for col, arr in self.columns.items():
+            arr.extend(values[col])
+        if update_stats:
+            for col, stats in self.stats.items():
+                stats.extend(values[col])
+        self.total += len(t_ns)
+        while self.max_rows and len(self.t_ns) > self.max_rows:
+            self._spill()
+
+    def _spill(self):
+        n = min(self.chunk_rows, len(self.t_ns))
+        os.makedirs(self.spill_dir, exist_ok=True)
+        filename = os.path.join(self.spill_dir, f"{self.name}_{self.first:012d}.npz")
+        np.savez(filename, t_ns=self.t_ns.values[:n],
+                 **{col: arr.values[:n] for col, arr in self.columns.items()})
+        self.spilled.append(filename)
+        self.t_ns.drop_front(n)
+        for arr in self.columns.values():
+            arr.drop_front(n)
+        self.first += n
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def in_memory(self):
+        return len(self.t_ns)
+
+    def column(self, col):
+        # View of the in-memory rows (copy it before handing it to another thread)
+        return self.columns[col].values
+
+    @property
+    def timestamps(self):
+        return self.t_ns.values
+
+    def tail(self, n):
+        # Last n rows as {'t_ns': ..., col: ...} views
+        out = {'t_ns': self.t_ns.values[-n:]}
+        out.update({col: arr.values[-n:] for col, arr in self.columns.items()})
+        return out
+
+    def iter_chunks(self):
+        # Everything logged so far, oldest first: spilled files, then memory
+        for filename in self.spilled:
+            with np.load(filename) as data:
+                yield {key: data[key] for key in data.files}
+        yield self.tail(self.in_memory) if self.in_memory else {'t_ns': self.t_ns.values[:0]}
+
+    def nbytes(self):
+        return self.t_ns.values.nbytes + sum(arr.values.nbytes for arr in self.columns.values())
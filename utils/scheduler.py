@@ -0,0 +1,90 @@
+# scheduler.py
+#
+# Drift-free periodic sampling on the monotonic clock.
+#
+# "do the work, then time.sleep(interval)" makes the real period
+# interval + (time spent working), so the sample times drift further and
+# further behind. DeadlineScheduler instead waits for absolute deadlines
+# t0 + k * interval on time.monotonic_ns(): time spent between two waits is
+# absorbed, not accumulated.
+#
+# For sub-millisecond intervals the OS sleep is too coarse, so wait() sleeps
+# until `spin` seconds before the deadline and busy-waits the rest.
+#
+# When the caller falls more than one interval behind (a slow plot, a disk
+# stall), the deadlines already past are skipped and counted in `missed`
+# (skip_missed=True), so samples stay on the regular grid; with
+# skip_missed=False they are taken immediately, back to back, to catch up.
+#
+# burst(read, n) takes n samples at n consecutive deadlines and returns them
+# as arrays, so conversion and storage can handle them as one batch.
+
+import time
+
+import numpy as np
+
+
+class DeadlineScheduler:
+    def __init__(self, interval, spin=0.0002, skip_missed=True):
+        # interval, spin: seconds
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval_ns = int(round(interval * 1e9))
+        self.spin_ns = int(round(spin * 1e9))
+        self.skip_missed = skip_missed
+        self.ticks = 0  # deadlines served
+        self.missed = 0  # deadlines skipped because we were a whole interval late
+        self.max_lateness = 0.0  # seconds, over the deadlines served
+        self._lateness_sum_ns = 0
+        self._t0 = None
+        self._k = 0
+
+    def start(self):
+        # Deadline 0 is now; called by the first wait() if not before
+        self._t0 = time.monotonic_ns()
+        self._k = 0
+
+    @property
+    def mean_lateness(self):
+        return self._lateness_sum_ns / self.ticks / 1e9 if self.ticks else 0.0
+
+    def wait(self):
+        # Blocks until the next deadline and returns its index k
+        if self._t0 is None:
+            self.start()
+        deadline = self._t0 + self._k * self.interval_ns
+        now = time.monotonic_ns()
+        if now < deadline:
+            if deadline - now > self.spin_ns:
+                time.sleep((deadline - now - self.spin_ns) / 1e9)
+            while time.monotonic_ns() < deadline:
+                pass
+            now = time.monotonic_ns()
+        elif self.skip_missed and now - deadline >= self.interval_ns:
+            skipped = (now - deadline) // self.interval_ns
+            self.missed += skipped
+            self._k += skipped
+            deadline += skipped * self.interval_ns
+
+        lateness = now - deadline
+        self._lateness_sum_ns += lateness
+        self.max_lateness = max(self.max_lateness, lateness / 1e9)
+        self.ticks += 1
+        k = self._k
+        self._k += 1
+        return k
+
+    def burst(self, read, n, dtype=None):
+        # n samples of read() at consecutive deadlines.
+        # Returns (epoch t_ns as int64, values as an array).
+        t_ns = np.empty(n, dtype=np.int64)
+        values = [None] * n
+        for i in range(n):
+            self.wait()
+            t_ns[i] = time.time_ns()
+            values[i] = read()
+        return t_ns, np.asarray(values, dtype=dtype)
+
+    def summary(self):
+        return (f"{self.ticks} samples, {self.missed} missed deadlines, "
+                f"lateness mean {self.mean_lateness * 1e3:.3f} ms / max {self.max_lateness * 1e3:.3f} ms")
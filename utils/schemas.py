@@ -0,0 +1,70 @@
+# schemas.py
+#
+# The three CSV layouts the loggers write, in one place, so tools that read
+# them back (colstore import, analysis, reprocessing) agree on column names,
+# types and the timestamp format.
+#
+# Each schema maps CSV header names to short column names used by the binary
+# formats: {csv_name: (column, dtype)}. 'time' is the CSV column holding the
+# wall-clock date and 'time_format' its strftime format.
+
+import numpy as np
+
+from utils.thermistor import CSV_HEADER as ADS_HEADER
+
+SCHEMAS = {
+    'L23': {
+        'time': 'timestamp',
+        'time_format': '%Y-%m-%d %H:%M:%S',
+        'columns': {
+            'elapsed_min': ('elapsed_min', np.float64),
+            'temperature_F': ('temperature_F', np.float64),
+        },
+    },
+    'L12': {
+        'time': 'timestamp',
+        'time_format': '%Y-%m-%d %H:%M:%S',
+        'columns': {
+            'elapsed_time_min': ('elapsed_min', np.float64),
+            # float32 in the columnar store only; parsed and written to CSV as float64
+            'temperature_degC': ('temperature_C', np.float32),
+            'humidity_percent': ('humidity', np.float32),
+        },
+    },
+    'ADS1115': {
+        'time': 'Date',
+        'time_format': '%m-%d-%Y %H:%M:%S',
+        'columns': {
+            'Elapsed Time (min)': ('elapsed_min', np.float64),
+            'Voltage (V)': ('voltage', np.float64),
+            'R_therm (Ohms)': ('R_therm', np.float64),
+            'Temp_SH (K)': ('temp_SH_K', np.float64),
+            'Temp_SH (F)': ('temp_SH_F', np.float64),
+            'Temp_SH (C)': ('temp_SH_C', np.float64),
+            'Temp_Beta (K)': ('temp_Beta_K', np.float64),
+            'Temp_Beta (F)': ('temp_Beta_F', np.float64),
+            'Temp_Beta (C)': ('temp_Beta_C', np.float64),
+        },
+    },
+}
+
+
+def header(schema):
+    # CSV header in file order (the ADS logger puts the date second)
+    if schema == 'ADS1115':
+        return list(ADS_HEADER)
+    s = SCHEMAS[schema]
+    return [s['time']] + list(s['columns'])
+
+
+def detect_schema(csv_header):
+    csv_header = [h.strip() for h in csv_header]
+    for name in SCHEMAS:
+        if csv_header == header(name):
+            return name
+    raise ValueError(f"Unknown CSV layout: {csv_header}")
+
+
+def column_dtypes(schema):
+    # {column: dtype} for the binary formats, wall-clock time excluded
+    return {col: dtype for col, dtype in SCHEMAS[schema]['columns'].values()}
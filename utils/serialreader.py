@@ -0,0 +1,147 @@
+# serialreader.py
+#
+# Bulk, non-blocking serial reading on a background thread.
+#
+# Instead of one ser.readline().decode() per line in the acquisition loop,
+# the thread drains everything in in_waiting with a single read() into a
+# bounded byte buffer (a bytearray trimmed from the front, not a ring
+# buffer: only the partial last line stays in it between reads, so the trim
+# is short), splits off all complete lines at once and queues them as a
+# batch (a list of bytes lines, without the line ending). The consumer
+# takes whole batches with get_batch().
+#
+# Nothing blocks the device side: if the byte buffer would overflow, the
+# oldest bytes are dropped, and if the consumer falls behind, whole batches
+# are dropped. Both are counted (dropped_bytes / dropped_lines) so data loss
+# is visible instead of silent. The end-of-stream marker never blocks either:
+# with the queue full (the consumer already gone) the oldest batch makes
+# room for it.
+#
+# wait_for_line() replaces the fixed time.sleep(2) after opening the port:
+# opening resets the Arduino, and the board is ready as soon as its sketch
+# prints the first valid line, typically well before 2 s. The bytes from that
+# line on are handed to start(initial=...) so no reading is lost.
+
+import queue
+import threading
+import time
+
+
+class SerialReader:
+    def __init__(self, ser, buffer_size=1 << 16, max_batches=256, name='serial-reader'):
+        self.ser = ser
+        self.buffer_size = buffer_size
+        self.batches = queue.Queue(maxsize=max_batches)
+        self.bytes_read = 0
+        self.lines = 0
+        self.dropped_bytes = 0  # byte buffer overruns (a line longer than buffer_size, or garbage)
+        self.dropped_lines = 0  # complete lines dropped because the batch queue was full
+        self.error = None
+
+        self._buf = bytearray()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self, initial=b''):
+        # initial: bytes already read from the port (see wait_for_line)
+        if initial:
+            self._feed(initial)
+        self._thread.start()
+        return self
+
+    @property
+    def overruns(self):
+        return self.dropped_bytes + self.dropped_lines
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                # Everything already waiting in one call; otherwise block for
+                # one byte (up to the port timeout) so we don't spin.
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if data:
+                    self._feed(data)
+        except Exception as e:  # port closed / unplugged
+            self.error = e
+        finally:
+            self._put_end()
+
+    def _put_end(self):
+        # None wakes up the consumer (EOFError); never blocks the thread's exit
+        while True:
+            try:
+                self.batches.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self.dropped_lines += len(self.batches.get_nowait())
+                except queue.Empty:
+                    pass
+
+    def _feed(self, data):
+        self.bytes_read += len(data)
+        self._buf += data
+        if len(self._buf) > self.buffer_size:
+            excess = len(self._buf) - self.buffer_size
+            del self._buf[:excess]
+            self.dropped_bytes += excess
+
+        end = self._buf.rfind(b'\n')
+        if end < 0:
+            return
+        chunk = bytes(self._buf[:end])
+        del self._buf[:end + 1]
+        batch = [line.rstrip(b'\r') for line in chunk.split(b'\n')]
+        batch = [line for line in batch if line]
+        if not batch:
+            return
+        self.lines += len(batch)
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            self.dropped_lines += len(batch)
+
+    def get_batch(self, timeout=1.0):
+        # Next batch of lines ([] on timeout). Raises EOFError once the reader
+        # has stopped and everything queued has been consumed.
+        try:
+            batch = self.batches.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if batch is None:
+            raise EOFError(self.error or "serial reader stopped")
+        return batch
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+def wait_for_line(ser, is_valid, timeout=10.0):
+    # Reads until a complete line for which is_valid(line) is true, skipping
+    # the reset noise and the partial line the port was opened in. Returns
+    # the bytes from the start of that line on, or None after `timeout`
+    # seconds (the bytes read so far are then dropped).
+    deadline = time.monotonic() + timeout
+    buf = bytearray()
+    start = None  # beginning of the first complete line not yet checked
+    while time.monotonic() < deadline:
+        data = ser.read(ser.in_waiting or 1)
+        if not data:
+            continue
+        buf += data
+        if start is None:
+            first = buf.find(b'\n')
+            if first < 0:
+                continue
+            start = first + 1
+        while True:
+            end = buf.find(b'\n', start)
+            if end < 0:
+                break
+            if is_valid(bytes(buf[start:end]).strip()):
+                return bytes(buf[start:])
+            start = end + 1
+        del buf[:start]
+        start = 0
+    return None
@@ -0,0 +1,225 @@
+# simulator.py
+#
+# Fake Arduino on a pseudo-terminal, for running the loggers without a board.
+#
+#   python -m utils.simulator L23 --rate 1000
+#   python -m utils.simulator L12 --replay L12_DH11/datalog.csv --rate 0 --duration 30
+#   python -m utils.simulator ADS1115-bin --rate 860 --link ./ttyADS
+#
+# A pty pair is created and the slave side's path is printed (and optionally
+# symlinked to --link); point a logger or the supervisor at it, e.g.
+# `python L23/logger.py /dev/pts/7`. The master side emits the sketch's exact
+# output:
+#
+#   L23          "0.50,82.34"
+#   L12          "T = 23.0 C, H = 51.0 %"
+#   ADS1115      "AIN0: 12345\tVoltage: 2.3146875" plus an empty line (ino_code_simple)
+#   ADS1115-bin  COBS frames as with BINARY_MODE 1 (utils/binproto.py)
+#
+# Values come from a recorded CSV (--replay, any of the three logger
+# layouts, looped) or are synthesized: a slow sine around a base value,
+# a linear drift and gaussian noise.
+#
+# --rate is in samples per second, far beyond real time if wanted; 0 means
+# as fast as the pty accepts. Writes block when the reader falls behind, so
+# the achieved rate printed every second is the highest rate the logger
+# on the other side sustains.
+
+import csv
+import os
+import sys
+import time
+import tty
+
+import numpy as np
+
+from utils.binproto import encode_sample
+from utils.scheduler import DeadlineScheduler
+from utils.schemas import detect_schema
+from utils.thermistor import ADC_LSB_MV, BETA, R0, R_FIXED, T0, Vcc
+
+FORMATS = ('L23', 'L12', 'ADS1115', 'ADS1115-bin')
+WRITES_PER_SECOND = 100  # at high rates, samples are written in chunks this often
+
+
+# === Values ===
+
+class Synthetic:
+    # base + amplitude * sin(2 pi t / period) + drift * t + noise, t in minutes
+    def __init__(self, base, amplitude=1.0, period=30.0, drift=0.01, noise=0.2, seed=None):
+        self.base = base
+        self.amplitude = amplitude
+        self.period = period
+        self.drift = drift
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, t_min):
+        t_min = np.asarray(t_min, dtype=np.float64)
+        return (self.base + self.amplitude * np.sin(2 * np.pi * t_min / self.period)
+                + self.drift * t_min + self.rng.normal(0, self.noise, t_min.shape))
+
+
+def temp_C_to_adc(temp_C):
+    # Inverse of utils/thermistor: Beta model -> divider voltage -> ADC count
+    temp_K = np.asarray(temp_C, dtype=np.float64) + 273.15
+    r_therm = R0 * np.exp(BETA * (1.0 / temp_K - 1.0 / T0))
+    voltage = Vcc * r_therm / (R_FIXED + r_therm)
+    return np.clip(np.round(voltage * 1000.0 / ADC_LSB_MV), -32768, 32767).astype(np.int16)
+
+
+def synthetic_source(fmt, seed=None):
+    # Returns values(t_min) -> {column: array} for a format
+    if fmt == 'L23':
+        temp = Synthetic(75.0, amplitude=2.0, noise=0.3, seed=seed)
+        return lambda t: {'temperature_F': temp(t)}
+    if fmt == 'L12':
+        # DHT11 readings come in whole units
+        temp = Synthetic(23.0, amplitude=1.0, noise=0.3, seed=seed)
+        hum = Synthetic(51.0, amplitude=3.0, drift=-0.02, noise=0.5, seed=seed)
+        return lambda t: {'temperature_C': np.round(temp(t)), 'humidity': np.round(hum(t))}
+    temp = Synthetic(20.0, amplitude=1.5, noise=0.05, seed=seed)
+    return lambda t: {'adc': temp_C_to_adc(temp(t))}
+
+
+def replay_source(csv_file):
+    # Loads a logger CSV; returns (format, values(i) -> {column: array}) where
+    # i are sample indices, wrapping around at the end of the file
+    with open(csv_file, newline='') as f:
+        reader = csv.reader(f)
+        schema = detect_schema(next(reader))
+        rows = [row for row in reader if row]
+
+    def column(i):
+        return np.array([float(row[i]) if row[i] else np.nan for row in rows])
+
+    if schema == 'L23':
+        data = {'temperature_F': column(2)}
+    elif schema == 'L12':
+        data = {'temperature_C': column(2), 'humidity': column(3)}
+    else:
+        voltage = column(2)
+        data = {'adc': np.clip(np.round(np.nan_to_num(voltage) * 1000.0 / ADC_LSB_MV), -32768, 32767).astype(np.int16)}
+    n = len(rows)
+    return schema, lambda idx: {col: values[np.asarray(idx) % n] for col, values in data.items()}
+
+
+# === Output ===
+
+def render(fmt, first, t_min, t_us, values):
+    # Bytes for a chunk of samples in the sketch's exact format
+    if fmt == 'L23':
+        return b''.join(b'%.2f,%.2f\r\n' % pair for pair in zip(t_min.tolist(), values['temperature_F'].tolist()))
+    if fmt == 'L12':
+        return b''.join(b'T = %.1f C, H = %.1f %%\r\n' % pair
+                        for pair in zip(values['temperature_C'].tolist(), values['humidity'].tolist()))
+    if fmt == 'ADS1115':
+        return b''.join(b'AIN0: %d\tVoltage: %.7f\r\n\r\n' % (adc, adc * ADC_LSB_MV / 1000)
+                        for adc in values['adc'].tolist())
+    return b''.join(encode_sample(first + k, t, adc)
+                    for k, (t, adc) in enumerate(zip(t_us.tolist(), values['adc'].tolist())))
+
+
+class Simulator:
+    def __init__(self, fmt, rate=1.0, replay=None, time_scale=1.0, seed=None, link=None):
+        # rate: samples per second (0 = unlimited); time_scale: simulated
+        # seconds per real second for the synthetic signal and elapsed column
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}")
+        self.fmt = fmt
+        self.rate = rate
+        self.time_scale = time_scale
+        if replay:
+            schema, self._replay = replay_source(replay)
+            if fmt.split('-')[0] != schema:
+                raise ValueError(f"{replay} is a {schema} log, it can't be replayed as {fmt}")
+            self._synthetic = None
+        else:
+            self._replay = None
+            self._synthetic = synthetic_source(fmt, seed)
+        self.samples = 0
+        self.bytes = 0
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # no echo, no newline translation
+        self.port = os.ttyname(self.slave)
+        self.link = link
+        if link:
+            if os.path.islink(link):
+                os.remove(link)
+            os.symlink(self.port, link)
+
+    def chunk(self, n):
+        # Next n samples, rendered
+        idx = np.arange(self.samples, self.samples + n)
+        seconds = idx / self.rate if self.rate else idx * 1e-3
+        t_min = seconds * self.time_scale / 60.0
+        t_us = (seconds * 1e6).astype(np.int64)
+        values = self._replay(idx) if self._replay else self._synthetic(t_min)
+        return render(self.fmt, self.samples, t_min, t_us, values)
+
+    def run(self, duration=None, max_samples=None, report=1.0):
+        per_write = max(1, int(self.rate / WRITES_PER_SECOND)) if self.rate else 1000
+        scheduler = DeadlineScheduler(per_write / self.rate) if self.rate else None
+        start = last_report = time.monotonic()
+        last_samples = 0
+        try:
+            while True:
+                now = time.monotonic()
+                if duration is not None and now - start >= duration:
+                    break
+                if max_samples is not None and self.samples >= max_samples:
+                    break
+                if report and now - last_report >= report:
+                    rate = (self.samples - last_samples) / (now - last_report)
+                    print(f"[SIM] {self.samples} samples, {rate:.0f} samples/s", file=sys.stderr)
+                    last_report, last_samples = now, self.samples
+                if scheduler:
+                    scheduler.wait()
+                n = per_write if max_samples is None else min(per_write, max_samples - self.samples)
+                data = self.chunk(n)
+                os.write(self.master, data)  # blocks while the reader is behind
+                self.samples += n
+                self.bytes += len(data)
+        except OSError as e:
+            print(f"[SIM] stopped: {e}", file=sys.stderr)
+        elapsed = time.monotonic() - start
+        return {'samples': self.samples, 'bytes': self.bytes, 'seconds': elapsed,
+                'samples_per_s': self.samples / elapsed if elapsed else 0.0}
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Emulate an Arduino sketch's serial output on a pty.")
+    parser.add_argument('format', choices=FORMATS)
+    parser.add_argument('--rate', type=float, default=1.0, help="samples per second, 0 = as fast as possible")
+    parser.add_argument('--replay', help="logger CSV to replay instead of synthetic data")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="simulated seconds per real second")
+    parser.add_argument('--duration', type=float, help="seconds to run (default: until Ctrl-C)")
+    parser.add_argument('--samples', type=int, help="stop after this many samples")
+    parser.add_argument('--link', help="also make this symlink to the pty")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    sim = Simulator(args.format, rate=args.rate, replay=args.replay, time_scale=args.time_scale,
+                    seed=args.seed, link=args.link)
+    print(f"[SIM] {args.format} on {sim.port}" + (f" ({args.link})" if args.link else ""), flush=True)
+    try:
+        result = sim.run(args.duration, args.samples)
+    except KeyboardInterrupt:
+        result = None
+    finally:
+        sim.close()
+    if result:
+        print(f"[SIM] {result['samples']} samples, {result['bytes']} bytes in {result['seconds']:.1f} s "
+              f"({result['samples_per_s']:.0f} samples/s)", file=sys.stderr)
@@ -0,0 +1,111 @@
+# stats.py
+#
+# Running statistics shared by the loggers.
+#
+# RunningStats keeps mean/std with O(1) work per reading (Welford), either over
+# everything seen so far or over the last `window` readings; the cumulative
+# kind merges a whole block at once in extend(). For plotting, the
+# cumulative_* / rolling_* functions give the per-sample series in one O(n)
+# pass instead of calling np.mean/np.std on every prefix.
+
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RunningStats:
+    def __init__(self, window=None):
+        self.window = window  # None -> cumulative over all readings
+        self._values = deque() if window else None
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+
+    def _add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        if self.n == 1:
+            self.n, self.mean, self._m2 = 0, 0.0, 0.0
+            return
+        self.n -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self._m2 = max(self._m2 - delta * (x - self.mean), 0.0)
+
+    def update(self, x):
+        x = float(x)
+        if math.isnan(x):
+            return  # invalid readings don't count
+        if self._values is not None:
+            if len(self._values) == self.window:
+                self._remove(self._values.popleft())
+            self._values.append(x)
+        self._add(x)
+
+    def extend(self, values):
+        if self._values is not None:
+            for x in values:
+                self.update(x)
+            return
+        # cumulative: the block's mean/M2 merged in at once (Chan et al.)
+        x = np.asarray(values, dtype=np.float64).ravel()
+        x = x[~np.isnan(x)]
+        if not x.size:
+            return
+        n, mean = x.size, x.mean()
+        m2 = float(np.sum((x - mean) ** 2))
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    @property
+    def var(self):
+        # Population variance, same as np.var / np.std default (ddof=0)
+        return self._m2 / self.n if self.n else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    def __repr__(self):
+        return f"RunningStats(n={self.n}, mean={self.mean:.4f}, std={self.std:.4f})"
+
+
+def cumulative_mean_std(values):
+    # mean/std of values[:i+1] for every i, from cumulative sums.
+    # Values are shifted by the first sample first so the sum-of-squares
+    # doesn't lose precision on e.g. ~300 K readings.
+    x = np.asarray(values, dtype=np.float64)
+    if x.size == 0:
+        return x.copy(), x.copy()
+    shift = x[0]
+    d = x - shift
+    n = np.arange(1, x.size + 1)
+    mean = np.cumsum(d) / n
+    var = np.maximum(np.cumsum(d * d) / n - mean**2, 0.0)
+    return mean + shift, np.sqrt(var)
+
+
+def rolling_mean_std(values, window):
+    # mean/std over the last `window` samples at each point
+    # (shorter windows at the start, like a partially filled RunningStats).
+    x = np.asarray(values, dtype=np.float64)
+    if x.size == 0:
+        return x.copy(), x.copy()
+    shift = x[0]
+    d = x - shift
+    s1 = np.concatenate(([0.0], np.cumsum(d)))
+    s2 = np.concatenate(([0.0], np.cumsum(d * d)))
+    hi = np.arange(1, x.size + 1)
+    lo = np.maximum(hi - window, 0)
+    n = hi - lo
+    mean = (s1[hi] - s1[lo]) / n
+    var = np.maximum((s2[hi] - s2[lo]) / n - mean**2, 0.0)
+    return mean + shift, np.sqrt(var)
@@ -0,0 +1,259 @@
+# supervisor.py
+#
+# One asyncio process logging several boards at once.
+#
+#   python -m utils.supervisor L23:/dev/ttyACM0 L12:/dev/ttyACM1:9600:rack1_dht.csv
+#
+# Each device spec is KIND:PORT[:BAUD[:CSV_FILE]], KIND being one of
+# DEVICE_KINDS. Every port gets its own parser (utils/parsers.py) and CSV
+# sink (utils/pipeline.py), and is read from the event loop through its file
+# descriptor (loop.add_reader), so there is no thread and no blocking
+# readline() per board. The bytes are split into lines (or binary frames,
+# utils/binproto.py) and parsed in bulk.
+#
+# When a port drops (cable pulled, board reset) it is closed and reopened
+# with exponential backoff; the other ports keep logging. A failing sink
+# (disk full, permissions) isn't a port problem: that device stops with the
+# error in its status line instead of reconnecting. There is no fixed
+# sleep(2) after opening a port: the partial line that is in flight while
+# the board resets is discarded and logging starts with the first complete
+# line.
+#
+# Run-time control goes through utils/control.py, as in the loggers: with
+# --control-socket, 'python -m utils.control supervisor.ctl stats' returns the
+# per-device counts, 'set status_interval 60' changes the status period and
+# 'stop' ends the run. SIGTERM stops too, SIGUSR1 prints the stats. The STOP
+# file is only watched when there is no socket (--control-socket '', or no
+# AF_UNIX). Ctrl-C stops as well; all sinks are flushed and closed.
+
+import asyncio
+import os
+import signal
+import time
+
+import numpy as np
+import serial
+
+from utils.parsers import LineDecoder, get_parser
+from utils.binproto import BINARY_BAUD, FrameDecoder
+from utils.control import Control
+from utils.pipeline import ADSSink, CSVSink
+
+STOP_FILENAME = 'STOP'
+CONTROL_SOCKET = 'supervisor.ctl'  # python -m utils.control supervisor.ctl stop|stats|get|set NAME VALUE
+CONTROL_INTERVAL = 0.2  # seconds between runs of the queued control commands
+STATUS_INTERVAL = 30  # seconds between status lines
+BACKOFF_MIN = 0.5  # seconds before the first reconnect attempt
+BACKOFF_MAX = 30.0
+
+
+# kind: (decoder factory, sink factory, default baud rate)
+DEVICE_KINDS = {
+    'L23': (lambda: LineDecoder(get_parser('L23')), lambda filename: CSVSink(filename, 'L23', append=True), 9600),
+    'L12': (lambda: LineDecoder(get_parser('L12')), lambda filename: CSVSink(filename, 'L12', append=True), 9600),
+    'ADS1115': (lambda: LineDecoder(get_parser('ADS1115')), lambda filename: ADSSink(filename, append=True), 9600),
+    # ino_code_simple with BINARY_MODE 1 (utils/binproto.py)
+    'ADS1115-bin': (FrameDecoder, lambda filename: ADSSink(filename, append=True), BINARY_BAUD),
+}
+
+
+class SinkError(Exception):
+    # A device's sink failed (disk full, permissions): not a port problem,
+    # so the device stops instead of reconnecting
+    pass
+
+
+class Device:
+    def __init__(self, name, port, make_decoder, sink, baudrate=9600):
+        # make_decoder: called on every (re)connect; the decoder's feed(bytes)
+        # returns {column: array} for the complete lines/frames received
+        self.name = name
+        self.port = port
+        self.make_decoder = make_decoder
+        self.decoder = make_decoder()
+        self.malformed = 0
+        self.sink = sink
+        self.baudrate = baudrate
+        self.ser = None
+        self.connected = False
+        self.samples = 0
+        self.reconnects = 0
+        self.error = None  # why the device stopped for good
+
+    def _open(self):
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0)
+        self.malformed += self.decoder.malformed
+        self.decoder = self.make_decoder()  # drops any partial line/frame
+
+    def _close(self):
+        self.connected = False
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except (OSError, serial.SerialException):
+                pass
+            self.ser = None
+
+    def _feed(self, data):
+        columns = self.decoder.feed(data)
+        n = len(next(iter(columns.values())))
+        if n:
+            self.sink.write(np.full(n, time.time_ns(), dtype=np.int64), columns)
+            self.samples += n
+
+    async def _read_until_error(self, loop):
+        # Reads until the port fails; returns the exception
+        failed = loop.create_future()
+
+        def on_readable():
+            if failed.done():
+                return
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if not data:
+                    # readable but empty: the device went away
+                    raise serial.SerialException("device disconnected")
+            except (OSError, serial.SerialException) as e:
+                failed.set_result(e)
+                return
+            try:
+                self._feed(data)
+            except Exception as e:  # only port errors are retried
+                error = SinkError(f"cannot write {getattr(self.sink, 'filename', 'the sink')}: {type(e).__name__}: {e}")
+                error.__cause__ = e
+                failed.set_exception(error)
+
+        fd = self.ser.fileno()
+        loop.add_reader(fd, on_readable)
+        try:
+            return await failed
+        finally:
+            loop.remove_reader(fd)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        backoff = BACKOFF_MIN
+        while True:
+            try:
+                self._open()
+            except (OSError, serial.SerialException) as e:
+                print(f"[{self.name}] cannot open {self.port}: {e}; retrying in {backoff:.1f} s")
+                await asyncio.sleep(backoff)
+                backoff = min(2 * backoff, BACKOFF_MAX)
+                continue
+
+            print(f"[{self.name}] connected to {self.port} at {self.baudrate} baud")
+            self.connected = True
+            samples_before = self.samples
+            try:
+                error = await self._read_until_error(loop)
+            except SinkError as e:
+                self.error = str(e)
+                print(f"[{self.name}] stopped: {e}")
+                return
+            finally:
+                self._close()
+            if self.samples > samples_before:
+                backoff = BACKOFF_MIN  # it was working: retry quickly
+            self.reconnects += 1
+            print(f"[{self.name}] lost {self.port}: {error}; reconnecting in {backoff:.1f} s")
+            await asyncio.sleep(backoff)
+            backoff = min(2 * backoff, BACKOFF_MAX)
+
+    def state(self):
+        return f"failed ({self.error})" if self.error else 'up' if self.connected else 'down'
+
+    def counts(self):
+        # For the control socket's stats reply
+        return {'state': self.state(), 'samples': self.samples,
+                'malformed': self.malformed + self.decoder.malformed, 'reconnects': self.reconnects}
+
+    def status(self):
+        return (f"{self.name}: {self.state()}, {self.samples} samples, {self.malformed + self.decoder.malformed} malformed, "
+                f"{self.reconnects} reconnects")
+
+
+class Supervisor:
+    def __init__(self, devices, stop_filename=STOP_FILENAME, status_interval=STATUS_INTERVAL,
+                 control_socket=CONTROL_SOCKET):
+        self.devices = list(devices)
+        self.status_interval = status_interval
+        self.control = Control(control_socket, stop_filename, status=self.counts,
+                               message="\n[STOP] Stop requested.")
+        self.control.setting('status_interval', float(status_interval), self._set_status_interval, minimum=1.0)
+        self._status_changed = None
+
+    def counts(self):
+        return {'devices': {dev.name: dev.counts() for dev in self.devices}}
+
+    def _set_status_interval(self, seconds):
+        self.status_interval = seconds
+        self._status_changed.set()  # restart the current wait
+
+    async def _serve_control(self, stop):
+        # The Control's commands run here, on the loop, between reads; it
+        # returns True once a stop was asked for (socket, SIGTERM or STOP file)
+        while not stop.is_set():
+            if self.control():
+                stop.set()
+            await asyncio.sleep(CONTROL_INTERVAL)
+
+    async def _report(self, stop):
+        while not stop.is_set():
+            self._status_changed.clear()
+            try:
+                await asyncio.wait_for(self._status_changed.wait(), self.status_interval)
+            except asyncio.TimeoutError:
+                print(" | ".join(dev.status() for dev in self.devices))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        self._status_changed = asyncio.Event()
+        loop.add_signal_handler(signal.SIGINT, stop.set)  # SIGTERM is the Control's
+
+        tasks = [asyncio.create_task(dev.run(), name=dev.name) for dev in self.devices]
+        tasks.append(asyncio.create_task(self._serve_control(stop)))
+        tasks.append(asyncio.create_task(self._report(stop)))
+        try:
+            with self.control:
+                print(f"[INFO] Logging {len(self.devices)} device(s) ({self.control.describe()}, or Ctrl-C)")
+                await stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for dev in self.devices:
+                dev._close()
+                try:
+                    dev.sink.close()
+                except OSError as e:  # still the other devices' to flush
+                    print(f"[{dev.name}] closing its sink failed: {e}")
+                print(dev.status())
+
+
+def device_from_spec(spec):
+    # "KIND:PORT[:BAUD[:CSV_FILE]]"
+    kind, port, *rest = spec.split(':')
+    if kind not in DEVICE_KINDS:
+        raise ValueError(f"Unknown device kind {kind!r}; expected one of {list(DEVICE_KINDS)}")
+    make_decoder, make_sink, default_baud = DEVICE_KINDS[kind]
+    baudrate = int(rest[0]) if rest and rest[0] else default_baud
+    filename = rest[1] if len(rest) > 1 else f"{kind}_{os.path.basename(port)}.csv"
+    return Device(f"{kind}@{port}", port, make_decoder, make_sink(filename), baudrate=baudrate)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Log several serial sensor boards from one process.")
+    parser.add_argument('devices', nargs='+', metavar='KIND:PORT[:BAUD[:CSV_FILE]]',
+                        help=f"KIND is one of {', '.join(DEVICE_KINDS)}")
+    parser.add_argument('--stop-file', default=STOP_FILENAME, help="watched only when there is no control socket")
+    parser.add_argument('--control-socket', default=CONTROL_SOCKET,
+                        help="Unix socket for utils.control ('' for none: STOP file only)")
+    parser.add_argument('--status-interval', type=float, default=STATUS_INTERVAL)
+    args = parser.parse_args()
+
+    devices = [device_from_spec(spec) for spec in args.devices]
+    asyncio.run(Supervisor(devices, args.stop_file, args.status_interval, args.control_socket or None).run())
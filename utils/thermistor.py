@@ -0,0 +1,120 @@
+# thermistor.py
+#
+# ADS1115 + NTC thermistor conversion, vectorized with numpy.
+# Same constants and equations as ADS115_thermistor/ino_code, but a whole
+# block of raw ADC counts converts in one pass instead of one Python call
+# (and one math.log) per sample.
+
+import hashlib
+import os
+
+import numpy as np
+
+# Constants (same as the Arduino code)
+R_FIXED = 10000.0  # Fixed resistor in the voltage divider (10kΩ)
+Vcc = 5.0  # Supply voltage (usually 5V for most Arduino boards)
+A = 0.001129148  # Steinhart-Hart coefficient A
+B = 0.000234125  # Steinhart-Hart coefficient B
+C = 0.0000000876741  # Steinhart-Hart coefficient C
+R0 = 10000.0  # Thermistor nominal resistance at T0 (25°C)
+T0 = 298.15  # Reference temperature (25°C in Kelvin)
+BETA = 3950.0  # Beta constant
+ADC_LSB_MV = 0.1875  # mV per bit at GAIN_TWOTHIRDS (±6.144V)
+
+CSV_HEADER = ['Elapsed Time (min)', 'Date', 'Voltage (V)', 'R_therm (Ohms)',
+              'Temp_SH (K)', 'Temp_SH (F)', 'Temp_SH (C)',
+              'Temp_Beta (K)', 'Temp_Beta (F)', 'Temp_Beta (C)']
+
+# Columns produced by convert_batch, in CSV order
+CONVERTED_COLUMNS = CSV_HEADER[2:]
+
+
+def adc_to_voltage(adc_values):
+    return np.asarray(adc_values, dtype=np.float64) * ADC_LSB_MV / 1000.0
+
+
+def voltage_to_R_therm(voltage, r_fixed=R_FIXED, vcc=Vcc):
+    # Voltage at or above the supply means an open thermistor -> R is infinite
+    voltage = np.asarray(voltage, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(voltage < vcc, (r_fixed * voltage) / (vcc - voltage), np.inf)
+
+
+def _kelvin_to_KFC(T_K):
+    T_C = T_K - 273.15
+    T_F = T_C * 9.0 / 5.0 + 32.0
+    return T_K, T_F, T_C
+
+
+def R_therm_to_temps(R_therm, a=A, b=B, c=C, r0=R0, t0=T0, beta=BETA):
+    # Returns (SH_K, SH_F, SH_C, Beta_K, Beta_F, Beta_C) arrays.
+    # inf and non-positive resistances come out as NaN instead of 0 K / errors.
+    R_therm = np.asarray(R_therm, dtype=np.float64)
+    valid = np.isfinite(R_therm) & (R_therm > 0)
+    logR = np.log(np.where(valid, R_therm, np.nan))
+
+    T_SH = 1.0 / (a + b * logR + c * logR**3)
+    T_Beta = 1.0 / ((1.0 / t0) + (1.0 / beta) * (logR - np.log(r0)))
+    return _kelvin_to_KFC(T_SH) + _kelvin_to_KFC(T_Beta)
+
+
+def convert_batch(adc_values, r_fixed=R_FIXED, vcc=Vcc, a=A, b=B, c=C,
+                  r0=R0, t0=T0, beta=BETA):
+    # Convert an array of raw ADC counts in one vectorized pass.
+    # Returns a dict keyed by the CSV column names (CONVERTED_COLUMNS),
+    # so it can go straight into pd.DataFrame or a csv writer.
+    voltage = adc_to_voltage(adc_values)
+    R_therm = voltage_to_R_therm(voltage, r_fixed, vcc)
+    temps = R_therm_to_temps(R_therm, a, b, c, r0, t0, beta)
+    return dict(zip(CONVERTED_COLUMNS, (voltage, R_therm) + temps))
+
+
+# --- Lookup-table mode ---
+# The ADS1115 only ever returns int16 codes, so the whole code -> (V, R_therm,
+# T_SH, T_Beta) mapping fits in a 65536-entry table (~4 MB). Conversion is then
+# a single fancy-index per batch. Tables are keyed on the constants, so changing
+# any of them builds (and optionally caches) a fresh table.
+
+ADC_MIN = -32768
+ADC_MAX = 32767
+
+_lut_tables = {}  # constants tuple -> table, shape (len(CONVERTED_COLUMNS), 65536)
+
+
+def _lut_key(r_fixed, vcc, a, b, c, r0, t0, beta):
+    return (r_fixed, vcc, a, b, c, r0, t0, beta, ADC_LSB_MV)
+
+
+def lut_filename(cache_dir, key):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f"thermistor_lut_{digest}.npy")
+
+
+def get_lut(r_fixed=R_FIXED, vcc=Vcc, a=A, b=B, c=C, r0=R0, t0=T0, beta=BETA, cache_dir=None):
+    key = _lut_key(r_fixed, vcc, a, b, c, r0, t0, beta)
+    table = _lut_tables.get(key)
+    if table is not None:
+        return table
+
+    filename = lut_filename(cache_dir, key) if cache_dir else None
+    if filename and os.path.exists(filename):
+        table = np.load(filename)
+    else:
+        codes = np.arange(ADC_MIN, ADC_MAX + 1)
+        converted = convert_batch(codes, r_fixed, vcc, a, b, c, r0, t0, beta)
+        table = np.vstack([converted[col] for col in CONVERTED_COLUMNS])
+        if filename:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(filename, table)
+
+    _lut_tables[key] = table
+    return table
+
+
+def convert_lut(adc_values, r_fixed=R_FIXED, vcc=Vcc, a=A, b=B, c=C,
+                r0=R0, t0=T0, beta=BETA, cache_dir=None):
+    # Same output as convert_batch, but by table lookup.
+    table = get_lut(r_fixed, vcc, a, b, c, r0, t0, beta, cache_dir)
+    idx = np.asarray(adc_values, dtype=np.int64) - ADC_MIN
+    rows = table[:, idx]
+    return dict(zip(CONVERTED_COLUMNS, rows))